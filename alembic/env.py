@@ -25,6 +25,15 @@ from app.db.base import Base
 from app.models import user, music, playlist # Важно импортировать все модели!
 target_metadata = Base.metadata
 
+
+def include_name(name, type_, parent_names):
+    # FTS5-таблицы (и их служебные *_fts_* таблицы) создаются вручную в миграции
+    # и не описаны в моделях, autogenerate не должен предлагать их удалить
+    if type_ == "table" and name and "_fts" in name:
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -49,7 +58,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
-        render_as_batch=True
+        render_as_batch=True,
+        include_name=include_name
     )
 
     with context.begin_transaction():
@@ -71,7 +81,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata, render_as_batch=True
+            connection=connection, target_metadata=target_metadata, render_as_batch=True,
+            include_name=include_name
         )
 
         with context.begin_transaction():
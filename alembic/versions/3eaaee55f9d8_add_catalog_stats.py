@@ -0,0 +1,45 @@
+"""Add catalog stats
+
+Revision ID: 3eaaee55f9d8
+Revises: b19e9e379289
+Create Date: 2026-02-03 11:42:17.305218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3eaaee55f9d8'
+down_revision: Union[str, Sequence[str], None] = 'b19e9e379289'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('catalog_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recordings', sa.Integer(), nullable=False),
+    sa.Column('compositions', sa.Integer(), nullable=False),
+    sa.Column('works', sa.Integer(), nullable=False),
+    sa.Column('composers', sa.Integer(), nullable=False),
+    sa.Column('duration', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Начальные значения — по текущему каталогу
+    op.execute(
+        "INSERT INTO catalog_stats (id, recordings, compositions, works, composers, duration) VALUES (1, "
+        "(SELECT COUNT(*) FROM recordings), "
+        "(SELECT COUNT(*) FROM compositions), "
+        "(SELECT COUNT(*) FROM works WHERE name_ru != 'Без сборника'), "
+        "(SELECT COUNT(*) FROM composers), "
+        "(SELECT COALESCE(SUM(duration), 0) FROM recordings))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_stats')
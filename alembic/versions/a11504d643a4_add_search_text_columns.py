@@ -0,0 +1,43 @@
+"""Add search_text columns
+
+Revision ID: a11504d643a4
+Revises: bbe314582f21
+Create Date: 2026-01-19 14:03:27.550169
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a11504d643a4'
+down_revision: Union[str, Sequence[str], None] = 'bbe314582f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('composers', 'works', 'compositions', 'recordings')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Обычный ALTER TABLE ADD COLUMN (без batch-пересоздания таблиц),
+    # чтобы не потерять FTS-триггеры на этих таблицах.
+    # Значения заполняются командой: python -m app.tools.backfill_search_text
+    for table in TABLES:
+        op.add_column(table, sa.Column('search_text', sa.Text(), nullable=True))
+        op.add_column(table, sa.Column('search_text_compact', sa.Text(), nullable=True))
+
+    op.create_index('ix_works_composer_id_search_text', 'works', ['composer_id', 'search_text'], unique=False)
+    op.create_index('ix_compositions_work_id_search_text', 'compositions', ['work_id', 'search_text'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_compositions_work_id_search_text', table_name='compositions')
+    op.drop_index('ix_works_composer_id_search_text', table_name='works')
+
+    for table in TABLES:
+        op.drop_column(table, 'search_text_compact')
+        op.drop_column(table, 'search_text')
@@ -0,0 +1,40 @@
+"""Add image LQIP columns
+
+Revision ID: b19e9e379289
+Revises: d7b638d1c978
+Create Date: 2026-01-24 11:42:17.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b19e9e379289'
+down_revision: Union[str, Sequence[str], None] = 'd7b638d1c978'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    ('composers', 'portrait_lqip'),
+    ('works', 'cover_art_lqip'),
+    ('compositions', 'cover_art_lqip'),
+    ('playlists', 'cover_image_lqip'),
+    ('posts', 'cover_image_lqip'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Обычный ALTER TABLE ADD/DROP COLUMN (без batch-пересоздания таблиц),
+    # чтобы не потерять FTS-триггеры на composers, works и compositions
+    for table, column in COLUMNS:
+        op.add_column(table, sa.Column(column, sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in reversed(COLUMNS):
+        op.drop_column(table, column)
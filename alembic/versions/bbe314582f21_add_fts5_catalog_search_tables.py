@@ -0,0 +1,97 @@
+"""Add FTS5 catalog search tables
+
+Revision ID: bbe314582f21
+Revises: 6cf470f74f95
+Create Date: 2026-01-15 10:12:41.318904
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bbe314582f21'
+down_revision: Union[str, Sequence[str], None] = '6cf470f74f95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# FTS-таблица -> (базовая таблица, {колонка FTS: выражение над строкой базовой таблицы})
+FTS_TABLES = {
+    'composers_fts': ('composers', {
+        'name_ru': '{row}.name_ru',
+        'original_name': '{row}.original_name',
+    }),
+    'works_fts': ('works', {
+        'name_ru': '{row}.name_ru',
+        'original_name': '{row}.original_name',
+        'nickname': '{row}.nickname',
+        'catalog_number': '{row}.catalog_number',
+        # Каталожный номер без пробелов: "KV 525" находится по "kv525"
+        'catalog_compact': "replace({row}.catalog_number, ' ', '')",
+        'publication_year': 'CAST({row}.publication_year AS TEXT)',
+    }),
+    'compositions_fts': ('compositions', {
+        'title_ru': '{row}.title_ru',
+        'title_original': '{row}.title_original',
+    }),
+    'recordings_fts': ('recordings', {
+        'performers': '{row}.performers',
+        'conductor': '{row}.conductor',
+        'lead_performer': '{row}.lead_performer',
+        'publisher': '{row}.publisher',
+    }),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for fts_table, (base_table, columns) in FTS_TABLES.items():
+        col_names = ", ".join(columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+            f"{col_names}, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+        def values(row: str) -> str:
+            return ", ".join(expr.format(row=row) for expr in columns.values())
+
+        # Пересчитываем FTS только при изменении исходных колонок (не при смене обложки и т.п.)
+        source_cols = sorted({
+            col for expr in columns.values() for col in re.findall(r'\{row\}\.(\w+)', expr)
+        })
+
+        # Первичное заполнение
+        op.execute(
+            f"INSERT INTO {fts_table} (rowid, {col_names}) "
+            f"SELECT id, {values(base_table)} FROM {base_table}"
+        )
+
+        # Триггеры синхронизации
+        op.execute(
+            f"CREATE TRIGGER {fts_table}_ai AFTER INSERT ON {base_table} BEGIN "
+            f"INSERT INTO {fts_table} (rowid, {col_names}) VALUES (new.id, {values('new')}); "
+            f"END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts_table}_ad AFTER DELETE ON {base_table} BEGIN "
+            f"DELETE FROM {fts_table} WHERE rowid = old.id; "
+            f"END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts_table}_au AFTER UPDATE OF {', '.join(source_cols)} ON {base_table} BEGIN "
+            f"DELETE FROM {fts_table} WHERE rowid = old.id; "
+            f"INSERT INTO {fts_table} (rowid, {col_names}) VALUES (new.id, {values('new')}); "
+            f"END"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for fts_table in FTS_TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {fts_table}")
@@ -0,0 +1,41 @@
+"""Add scan manifest
+
+Revision ID: d7b638d1c978
+Revises: 6ccd164894be
+Create Date: 2026-01-23 18:05:41.902613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b638d1c978'
+down_revision: Union[str, Sequence[str], None] = '6ccd164894be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scan_manifest',
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+    sa.Column('file_hash', sa.String(), nullable=False),
+    sa.Column('recording_id', sa.Integer(), nullable=True),
+    sa.Column('scanned_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('path')
+    )
+    with op.batch_alter_table('scan_manifest', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_scan_manifest_file_hash'), ['file_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('scan_manifest', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scan_manifest_file_hash'))
+
+    op.drop_table('scan_manifest')
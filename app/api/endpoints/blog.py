@@ -1,9 +1,10 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, status
 from sqlalchemy.orm import Session
 from app import crud, models, schemas, utils
 from app.api import deps
 from app.db.session import get_db
+from app.services import image_uploads
 
 router = APIRouter()
 
@@ -48,19 +49,27 @@ def delete_post(post_id: int, db: Session = Depends(get_db), u: models.User = De
     crud.crud_blog.delete_post(db, post_id)
     return {"status": "ok"}
 
-@router.post("/{post_id}/cover", response_model=schemas.Post)
-def upload_cover(post_id: int, file: UploadFile = File(...), db: Session = Depends(get_db), u: models.User = Depends(deps.get_current_active_admin)):
+@router.post("/{post_id}/cover", response_model=schemas.Post, status_code=status.HTTP_202_ACCEPTED)
+def upload_cover(post_id: int, response: Response, file: UploadFile = File(...), db: Session = Depends(get_db), u: models.User = Depends(deps.get_current_active_admin)):
     post = crud.crud_blog.get_post(db, post_id)
     if not post:
         raise HTTPException(404, "Post not found")
-    url = utils.save_upload_file(file, "blog", f"post_{post_id}")
-    return crud.crud_blog.update_cover(db, post_id, url)
+    # Обложка сменится, когда закончится задача обработки (Location)
+    try:
+        job = image_uploads.save_upload_file(db, file, "post", post_id)
+    except utils.ImageRejected as e:
+        raise HTTPException(400, str(e))
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return post
 
 @router.post("/upload-image", response_model=dict)
-def upload_blog_image(
+async def upload_blog_image(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
     u: models.User = Depends(deps.get_current_active_admin)
 ):
-    url = utils.save_upload_file(file, "blog_images", "img")
+    # URL сразу вставляется в текст поста, поэтому ждем обработку (в пуле, без слота threadpool)
+    try:
+        url = await image_uploads.save_upload_file_now(file, "blog_images", "img")
+    except utils.ImageRejected as e:
+        raise HTTPException(400, str(e))
     return {"url": url}
\ No newline at end of file
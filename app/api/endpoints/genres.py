@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-import Levenshtein
 
 from app import models, schemas
 from app.api import deps
 from app.db.session import get_db
+from app.services import name_index
 
 router = APIRouter()
 
@@ -33,23 +33,22 @@ def check_and_create_genre(
     if existing_genre:
         return existing_genre
 
-    # 2. Поиск опечаток (расстояние Левенштейна)
-    all_genres = db.query(models.music.Genre).all()
-    for genre in all_genres:
-        distance = Levenshtein.distance(clean_name.lower(), genre.name.lower())
-        # Если слово короткое, нужна 1 опечатка, если длинное - 2
-        threshold = 1 if len(clean_name) < 8 else 2
-        if distance <= threshold:
-            raise HTTPException(
-                status_code=409, # Conflict
-                detail=f"Жанр '{clean_name}' очень похож на существующий: '{genre.name}'. Возможно, это опечатка."
-            )
+    # 2. Поиск опечаток (расстояние Левенштейна) по BK-дереву
+    # Если слово короткое, допускается 1 опечатка, если длинное - 2
+    genres_index = name_index.get_index(db, name_index.GENRE)
+    similar = genres_index.find_similar(clean_name, include_exact=True, limit=1)
+    if similar:
+        raise HTTPException(
+            status_code=409, # Conflict
+            detail=f"Жанр '{clean_name}' очень похож на существующий: '{similar[0]}'. Возможно, это опечатка."
+        )
 
     # 3. Если все проверки пройдены - создаем
     new_genre = models.music.Genre(name=clean_name)
     db.add(new_genre)
     db.commit()
     db.refresh(new_genre)
+    genres_index.add(new_genre.name)
     return new_genre
 
 
@@ -65,16 +64,6 @@ def check_genre_typo(
     if not clean_name:
         return {"similar": None}
 
-    # Поиск опечаток
-    all_genres = db.query(models.music.Genre).all()
-    for genre in all_genres:
-        # Игнорируем точное совпадение (без учета регистра)
-        if clean_name.lower() == genre.name.lower():
-            continue
-
-        distance = Levenshtein.distance(clean_name.lower(), genre.name.lower())
-        threshold = 1 if len(clean_name) < 8 else 2
-        if distance <= threshold:
-            return {"similar": genre.name}
-
-    return {"similar": None}
\ No newline at end of file
+    # Поиск опечаток (точное совпадение без учета регистра игнорируется)
+    similar = name_index.get_index(db, name_index.GENRE).find_similar(clean_name, limit=1)
+    return {"similar": similar[0] if similar else None}
\ No newline at end of file
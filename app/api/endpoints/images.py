@@ -0,0 +1,44 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+from app.services import image_resize, media_stream
+
+router = APIRouter()
+
+# Имена файлов в static/covers уникальны (uuid), поэтому ответ по URL не меняется
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.get("/{path:path}")
+async def resize_image(
+        path: str,
+        w: Optional[int] = Query(None, ge=1, le=image_resize.MAX_DIMENSION),
+        h: Optional[int] = Query(None, ge=1, le=image_resize.MAX_DIMENSION),
+        fmt: str = Query("jpeg", pattern="^(jpeg|webp|png)$"),
+):
+    """
+    Картинка из static/covers (путь относительно него), уменьшенная в рамку w x h.
+    Первый запрос считает результат в пуле процессов, дальше он отдается из кэша на диске.
+    """
+    if not w and not h:
+        raise HTTPException(400, "w or h is required")
+    # stat и хэш — в threadpool, не в цикле событий
+    found = await run_in_threadpool(image_resize.locate, path, w, h, fmt)
+    if found is None:
+        raise HTTPException(404, "Image not found")
+
+    src, dest, ready = found
+    if not ready:
+        try:
+            await asyncio.wrap_future(image_resize.submit(src, dest, w, h, fmt))
+        except Exception as e:
+            print(f"[ERROR] Could not resize {path}: {e}")
+            raise HTTPException(422, "Cannot process image")
+
+    return media_stream.MediaFileResponse(
+        dest, etag=f'"{dest.stem}"', media_type=image_resize.MEDIA_TYPES[fmt],
+        headers={"Cache-Control": IMMUTABLE},
+    )
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.api import deps
+from app.db.session import get_db
+from app.services import jobs, scrubber
+
+router = APIRouter()
+
+
+@router.get("/{job_id}", response_model=schemas.job.Job)
+def get_job_status(
+        job_id: str,
+        db: Session = Depends(get_db),
+        u: models.User = Depends(deps.get_current_active_admin)
+):
+    """
+    Состояние фоновой задачи (загрузка аудио и т.п.): статус, прогресс 0..1, результат или ошибка.
+    """
+    job = jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return jobs.serialize(job)
+
+
+@router.post("/scrub", response_model=schemas.job.Job, status_code=status.HTTP_202_ACCEPTED)
+def start_storage_scrub(
+        response: Response,
+        quarantine: bool = False,
+        restart: bool = False,
+        db: Session = Depends(get_db),
+        u: models.User = Depends(deps.get_current_active_admin)
+):
+    """
+    Проверка хранилища в фоне: пропавшие/поврежденные файлы и осиротевшие файлы
+    (quarantine=true переносит их в карантин). Сводка — в result задачи.
+    """
+    job = scrubber.submit(db, quarantine=quarantine, restart=restart)
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return jobs.serialize(job)
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from app import crud, models, schemas, utils
 from app.api import deps
 from app.db.session import get_db
+from app.services import image_uploads
 
 router = APIRouter()
 
@@ -230,9 +231,10 @@ def reorder_playlist(
 
 # --- УПРАВЛЕНИЕ ОБЛОЖКАМИ ---
 
-@router.post("/{playlist_id}/cover", response_model=schemas.Playlist)
+@router.post("/{playlist_id}/cover", response_model=schemas.Playlist, status_code=status.HTTP_202_ACCEPTED)
 def upload_playlist_cover(
         playlist_id: int,
+        response: Response,
         file: UploadFile = File(...),
         db: Session = Depends(get_db),
         current_user: models.User = Depends(deps.get_current_user)
@@ -254,16 +256,14 @@ def upload_playlist_cover(
         if playlist.owner_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    # Удаляем старую, если была
-    if playlist.cover_image_url:
-        utils.delete_file_by_url(playlist.cover_image_url)
-
-    # Сохраняем новую (папка static/covers/playlists)
-    url = utils.save_upload_file(file, "playlists", f"pl_{playlist_id}")
+    # Обрабатываем в фоне (папка static/covers/playlists): старая обложка остается,
+    # пока новая не готова, задача по ссылке из Location
+    try:
+        job = image_uploads.save_upload_file(db, file, "playlist", playlist_id)
+    except utils.ImageRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    playlist.cover_image_url = url
-    db.commit()
-    db.refresh(playlist)
+    response.headers["Location"] = f"/api/jobs/{job.id}"
     return playlist
 
 
@@ -291,6 +291,7 @@ def delete_playlist_cover(
     if playlist.cover_image_url:
         utils.delete_file_by_url(playlist.cover_image_url)
         playlist.cover_image_url = None
+        playlist.cover_image_lqip = None
         db.commit()
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
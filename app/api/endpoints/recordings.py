@@ -1,12 +1,13 @@
 import app.utils as utils
 import uuid
 from typing import List, Any, Optional, Literal, Union
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status, Form, Response, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status, Form, Response, Query, Request, Header
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
 from sqlalchemy.orm import Session, joinedload, contains_eager
 from sqlalchemy import func, or_, and_
 import os
-import shutil
+import mimetypes
 from pathlib import Path
 import re
 import random
@@ -14,7 +15,7 @@ import random
 from app import crud, models, schemas
 from app.api import deps
 from app.db.session import get_db
-from app.services import audio_processor
+from app.services import audio_processor, catalog_fts, result_cache, name_index, media_stream, media_registry, resumable_upload, jobs, bulk_import, audio_tags, image_uploads, random_works
 
 router = APIRouter()
 
@@ -55,10 +56,101 @@ def create_new_composition(
     return crud.music.create_composition_for_work(db, comp_in=comp_in, work_id=work_id)
 
 
-@router.post("/compositions/{composition_id}/upload", response_model=schemas.music.Recording,
-             status_code=status.HTTP_201_CREATED)
+def _ingest_audio_file(
+        db: Session, composition_id: int, temp_path: Path, file_hash: str, rec_data: schemas.RecordingCreate,
+        duration: int
+) -> models.music.Recording:
+    """
+    Общий финал загрузки: проверки дубликатов, запись в БД и перенос файла
+    из INCOMING_DIR на постоянное место. Временный файл удаляет вызывающий.
+    """
+    if crud.music.get_recording_by_hash(db, file_hash):
+        raise HTTPException(409, "Duplicate file (hash match)")
+
+    performers = rec_data.performers
+    if crud.music.find_near_duplicate_recording(db, composition_id, performers, duration):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Possible duplicate performance by {performers} found (duration match)."
+        )
+
+    new_rec = crud.music.create_recording_for_composition(
+        db, rec_in=rec_data, composition_id=composition_id, duration=duration, file_path="temp",
+        file_hash=file_hash
+    )
+
+    final_path = audio_processor.move_into_library(temp_path, new_rec.id, file_hash)
+
+    new_rec.file_path = f"/{final_path.as_posix()}"
+    db.commit()
+    db.refresh(new_rec)
+    media_registry.register(new_rec.id, new_rec.file_path, new_rec.file_hash)
+    result_cache.bump_generation()
+    return new_rec
+
+
+# --- ОБРАБОТКА ЗАГРУЗКИ В ФОНЕ ---
+# Хэш/длительность/теги/обложка считаются в пуле процессов (audio_processor.probe_audio),
+# запись в БД и перенос файла — в _finish_audio_ingest. Клиент получает 202 и опрашивает /api/jobs/{id}.
+# С extract_tags пустые поля записи заполняются из тегов, встроенная обложка идет в обложку части.
+
+AUDIO_INGEST = "audio_ingest"
+
+
+def _finish_audio_ingest(db: Session, job_id: str, payload: dict, result: dict) -> dict:
+    composition_id = payload["composition_id"]
+    proposed = audio_tags.propose(result.get("tags"))
+    values = payload["recording"]
+    if payload.get("extract_tags"):
+        values = audio_tags.fill_missing(values, proposed)
+    rec_data = schemas.RecordingCreate(**values)
+    try:
+        new_rec = _ingest_audio_file(
+            db, composition_id, Path(payload["temp_path"]), result["file_hash"], rec_data, result["duration"]
+        )
+    except HTTPException as e:
+        raise jobs.JobError(e.detail)
+
+    # Встроенная обложка становится обложкой части, если своей у нее еще нет
+    composition = crud.music.get_composition(db, composition_id)
+    # Запись уже сохранена: негодная картинка или пропавший кэш не должны ронять задачу
+    if payload.get("extract_tags") and result.get("has_cover") and composition and not composition.cover_art_url:
+        try:
+            with audio_tags.cover_path(new_rec.file_hash).open("rb") as f:
+                url = utils.save_image_file(f, "compositions", f"part_{composition_id}")
+        except Exception as e:
+            print(f"[ERROR] Could not use embedded cover of recording {new_rec.id}: {e}")
+        else:
+            crud.music.update_composition_cover(db, composition_id, url)
+
+    return {"recording_id": new_rec.id, "duration": new_rec.duration, "tags": result.get("tags", {}),
+            "proposed": proposed}
+
+
+def _cleanup_audio_ingest(job_id: str, payload: dict):
+    Path(payload["temp_path"]).unlink(missing_ok=True)
+    if payload.get("upload_id"):
+        session = resumable_upload.load(payload["upload_id"])
+        if session:
+            resumable_upload.discard(session)
+            resumable_upload.release(session)
+
+
+jobs.register(AUDIO_INGEST, work=audio_processor.probe_audio, finish=_finish_audio_ingest,
+              cleanup=_cleanup_audio_ingest)
+
+
+def _submit_audio_ingest(db: Session, response: Response, payload: dict) -> dict:
+    job = jobs.submit(db, AUDIO_INGEST, payload)
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return jobs.serialize(job)
+
+
+@router.post("/compositions/{composition_id}/upload", response_model=schemas.job.Job,
+             status_code=status.HTTP_202_ACCEPTED)
 def upload_audio_recording(
         composition_id: int,
+        response: Response,
         file: UploadFile = File(...),
         performers: Optional[str] = Form(None),
         lead_performer: Optional[str] = Form(None),
@@ -68,6 +160,7 @@ def upload_audio_recording(
         publisher: Optional[str] = Form(None),
         source_text: Optional[str] = Form(None),
         source_url: Optional[str] = Form(None),
+        extract_tags: bool = Form(False),
         db: Session = Depends(get_db),
         u: models.User = Depends(deps.get_current_active_admin)
 ):
@@ -77,26 +170,15 @@ def upload_audio_recording(
     if not file.content_type or not file.content_type.startswith("audio/"):
         raise HTTPException(400, "Invalid file type. Only audio files are allowed.")
 
-    temp_path, duration, file_hash = audio_processor.save_and_process_audio(db, upload_file=file)
+    # Один проход: запись во временный файл рядом с MUSIC_DIR + SHA-256 на лету
+    temp_path, file_hash = audio_processor.receive_upload(file)
 
+    submitted = False
     try:
+        # Дубликат по хэшу видно сразу, до постановки в очередь
         if crud.music.get_recording_by_hash(db, file_hash):
             raise HTTPException(409, "Duplicate file (hash match)")
 
-        if performers and duration > 0:
-            potential_duplicate = db.query(models.music.Recording).filter(
-                and_(
-                    models.music.Recording.composition_id == composition_id,
-                    func.lower_utf8(models.music.Recording.performers) == performers.lower(),
-                    models.music.Recording.duration.between(duration - 2, duration + 2)
-                )
-            ).first()
-            if potential_duplicate:
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"Possible duplicate performance by {performers} found (duration match)."
-                )
-
         rec_data = schemas.RecordingCreate(
             performers=performers,
             lead_performer=lead_performer,
@@ -107,22 +189,191 @@ def upload_audio_recording(
             source_text=source_text,
             source_url=source_url
         )
+        job = _submit_audio_ingest(db, response, {
+            "composition_id": composition_id, "temp_path": str(temp_path), "file_hash": file_hash,
+            "recording": rec_data.dict(), "extract_tags": extract_tags,
+        })
+        submitted = True
+        return job
+    finally:
+        # После постановки в очередь временный файл удалит сама задача
+        if not submitted and os.path.exists(temp_path): os.remove(temp_path)
 
-        new_rec = crud.music.create_recording_for_composition(
-            db, rec_in=rec_data, composition_id=composition_id, duration=duration, file_path="temp",
-            file_hash=file_hash
-        )
 
-        ext = Path(file.filename).suffix.lower() or ".mp3"
-        final_path = audio_processor.MUSIC_DIR / f"{new_rec.id}{ext}"
-        shutil.move(str(temp_path), str(final_path))
+@router.post("/works/{work_id}/import", response_model=schemas.job.Job, status_code=status.HTTP_202_ACCEPTED)
+def import_work_recordings(
+        work_id: int,
+        response: Response,
+        files: List[UploadFile] = File(...),
+        match: Literal["auto", "order", "track"] = Form("auto"),
+        performers: Optional[str] = Form(None),
+        lead_performer: Optional[str] = Form(None),
+        conductor: Optional[str] = Form(None),
+        recording_year: Optional[int] = Form(None),
+        license: Optional[str] = Form(None),
+        publisher: Optional[str] = Form(None),
+        source_text: Optional[str] = Form(None),
+        source_url: Optional[str] = Form(None),
+        extract_tags: bool = Form(False),
+        db: Session = Depends(get_db),
+        u: models.User = Depends(deps.get_current_active_admin)
+):
+    """
+    Пакетный импорт: много аудиофайлов или ZIP для произведения.
+    Файлы сопоставляются с частями по порядку имен или по номеру трека (match).
+    Отчет по каждому файлу — в result задачи.
+    """
+    if not crud.music.get_work(db, work_id):
+        raise HTTPException(404, "Work not found")
+
+    try:
+        entries = bulk_import.receive_files(files)
+    except ValueError as e:
+        raise HTTPException(413, str(e))
+    if not any(e.get("temp_path") for e in entries):
+        raise HTTPException(400, "No audio files found")
+
+    rec_data = schemas.RecordingCreate(
+        performers=performers,
+        lead_performer=lead_performer,
+        conductor=conductor,
+        recording_year=recording_year,
+        license=license,
+        publisher=publisher,
+        source_text=source_text,
+        source_url=source_url
+    )
+    job = bulk_import.submit(db, work_id, entries, match, rec_data, extract_tags)
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return jobs.serialize(job)
+
+
+# --- ВОЗОБНОВЛЯЕМАЯ ЗАГРУЗКА (ТОЛЬКО АДМИН) ---
+# POST создает сессию, PATCH дописывает блок по смещению (заголовок Upload-Offset),
+# HEAD сообщает текущее смещение для продолжения, POST .../finalize создает запись.
+
+def _get_upload_session(upload_id: str) -> resumable_upload.UploadSession:
+    session = resumable_upload.load(upload_id)
+    if not session:
+        raise HTTPException(404, "Upload not found")
+    return session
+
+
+def _upload_headers(session: resumable_upload.UploadSession, offset: int) -> dict:
+    return {"Upload-Offset": str(offset), "Upload-Length": str(session.length), "Cache-Control": "no-store"}
+
+
+@router.post("/compositions/{composition_id}/uploads", response_model=schemas.music.ResumableUploadStatus,
+             status_code=status.HTTP_201_CREATED)
+def create_resumable_upload(
+        composition_id: int,
+        upload_in: schemas.music.ResumableUploadCreate,
+        response: Response,
+        db: Session = Depends(get_db),
+        u: models.User = Depends(deps.get_current_active_admin)
+):
+    if not db.query(models.music.Composition).get(composition_id):
+        raise HTTPException(404, "Composition not found")
+
+    content_type = mimetypes.guess_type(upload_in.filename)[0]
+    if not content_type or not content_type.startswith("audio/"):
+        raise HTTPException(400, "Invalid file type. Only audio files are allowed.")
+    if not 0 < upload_in.length <= resumable_upload.MAX_UPLOAD_LENGTH:
+        raise HTTPException(413, "Invalid upload length")
+
+    metadata = upload_in.dict(exclude={"filename", "length"})
+    session = resumable_upload.create(composition_id, upload_in.length, upload_in.filename, metadata)
+    response.headers.update(_upload_headers(session, 0))
+    response.headers["Location"] = f"/api/recordings/uploads/{session.id}"
+    return {"id": session.id, "offset": 0, "length": session.length}
+
+
+@router.head("/uploads/{upload_id}")
+def get_resumable_upload_offset(upload_id: str, u: models.User = Depends(deps.get_current_active_admin)):
+    session = _get_upload_session(upload_id)
+    return Response(status_code=200, headers=_upload_headers(session, session.offset))
+
 
-        new_rec.file_path = f"/{final_path.as_posix()}"
-        db.commit()
-        db.refresh(new_rec)
-        return new_rec
+@router.patch("/uploads/{upload_id}", status_code=204)
+async def upload_chunk(
+        upload_id: str,
+        request: Request,
+        upload_offset: int = Header(...),
+        u: models.User = Depends(deps.get_current_active_admin)
+):
+    session = _get_upload_session(upload_id)
+    if not resumable_upload.acquire(session):
+        raise HTTPException(409, "Upload is already in progress")
+
+    offset = upload_offset
+    try:
+        if offset != session.offset:
+            raise HTTPException(409, "Offset mismatch", headers=_upload_headers(session, session.offset))
+
+        # Тело читается потоком, на диск пишется блоками по HASH_CHUNK_SIZE
+        buffer = bytearray()
+        try:
+            async for data in request.stream():
+                buffer += data
+                if len(buffer) >= audio_processor.HASH_CHUNK_SIZE:
+                    offset = await run_in_threadpool(resumable_upload.append, session, offset, bytes(buffer))
+                    buffer.clear()
+        except ClientDisconnect:
+            # Принятое целиком сохраним, клиент продолжит с Upload-Offset из HEAD
+            pass
+        if buffer:
+            offset = await run_in_threadpool(resumable_upload.append, session, offset, bytes(buffer))
+    except resumable_upload.OffsetMismatch as e:
+        raise HTTPException(409, "Offset mismatch", headers=_upload_headers(session, e.expected))
+    except ValueError as e:
+        raise HTTPException(413, str(e))
     finally:
-        if os.path.exists(temp_path): os.remove(temp_path)
+        resumable_upload.release(session)
+
+    return Response(status_code=204, headers=_upload_headers(session, offset))
+
+
+@router.post("/uploads/{upload_id}/finalize", response_model=schemas.job.Job,
+             status_code=status.HTTP_202_ACCEPTED)
+def finalize_resumable_upload(
+        upload_id: str,
+        response: Response,
+        db: Session = Depends(get_db),
+        u: models.User = Depends(deps.get_current_active_admin)
+):
+    session = _get_upload_session(upload_id)
+    if session.offset != session.length:
+        raise HTTPException(409, "Upload is not complete", headers=_upload_headers(session, session.offset))
+    if not db.query(models.music.Composition).get(session.composition_id):
+        raise HTTPException(404, "Composition not found")
+    if not resumable_upload.acquire(session):
+        raise HTTPException(409, "Upload is already in progress")
+
+    try:
+        # Хэш посчитан по мере приема блоков; после рестарта сервера его досчитает задача
+        file_hash = resumable_upload.cached_digest(session)
+        if file_hash and crud.music.get_recording_by_hash(db, file_hash):
+            resumable_upload.discard(session)
+            raise HTTPException(409, "Duplicate file (hash match)")
+        # Сессия остается занятой до конца задачи, ее удалит _cleanup_audio_ingest
+        return _submit_audio_ingest(db, response, {
+            "composition_id": session.composition_id, "temp_path": str(session.data_path),
+            "file_hash": file_hash, "upload_id": session.id,
+            "recording": {k: v for k, v in session.metadata.items() if k != "extract_tags"},
+            "extract_tags": session.metadata.get("extract_tags", False),
+        })
+    except Exception:
+        resumable_upload.release(session)
+        raise
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+def cancel_resumable_upload(upload_id: str, u: models.User = Depends(deps.get_current_active_admin)):
+    session = _get_upload_session(upload_id)
+    if not resumable_upload.acquire(session):
+        raise HTTPException(409, "Upload is already in progress")
+    resumable_upload.discard(session)
+    return Response(status_code=204)
 
 
 @router.post("/compositions/{composition_id}/add-video", response_model=schemas.music.Recording,
@@ -309,34 +560,14 @@ def get_random_playable_work(
     Возвращает одно случайное произведение, обогащенное записями
     ТОЛЬКО ОДНОГО случайного исполнения.
     """
-    random_func = func.random()
-    if db.bind.dialect.name == 'mysql':
-        random_func = func.rand()
-
-    # 1. Находим случайное произведение, у которого есть аудиозаписи
-    query = (
-        db.query(models.music.Work)
-        .join(models.music.Work.compositions)
-        .join(models.music.Composition.recordings)
-        .filter(models.music.Recording.duration > 0)
-    )
-
-    if exclude_ids:
-        query = query.filter(models.music.Work.id.notin_(exclude_ids))
-
-    work = query.order_by(random_func).first()
+    # 1. Случайное произведение, у которого есть аудиозаписи (без сортировки, см. random_works)
+    work_id = random_works.choice(db, random_works.PLAYABLE, exclude_ids)
 
     # Если с исключением ничего не нашлось, ищем без исключения
-    if not work:
-        work = (
-            db.query(models.music.Work)
-            .join(models.music.Work.compositions)
-            .join(models.music.Composition.recordings)
-            .filter(models.music.Recording.duration > 0)
-            .order_by(random_func).first()
-        )
+    if work_id is None and exclude_ids:
+        work_id = random_works.choice(db, random_works.PLAYABLE)
 
-    if not work:
+    if work_id is None:
         raise HTTPException(status_code=404, detail="No playable works found")
 
     # 2. Загружаем это произведение со всеми его аудиозаписями
@@ -347,9 +578,11 @@ def get_random_playable_work(
             joinedload(models.music.Work.compositions)
             .joinedload(models.music.Composition.recordings)
         )
-        .filter(models.music.Work.id == work.id)
+        .filter(models.music.Work.id == work_id)
         .first()
     )
+    if not full_work:
+        raise HTTPException(status_code=404, detail="No playable works found")
 
     # 3. В Python группируем записи по исполнению (исполнитель + год)
     performances = {}
@@ -394,14 +627,33 @@ def list_recordings(
         sort_by: Optional[Literal["newest", "oldest"]] = "newest",
         db: Session = Depends(get_db)
 ):
+    # Поколение читаем ДО запросов: если каталог изменится по ходу, запись не попадет в кэш как свежая
+    cache_gen = result_cache.generation()
+
     # РЕЖИМ 1: ГРУППИРОВКА ПО ПРОИЗВЕДЕНИЯМ (Только для Аудио/Медиатеки)
     if group_by == "work" and (media_type == "audio" or media_type is None):
+        cache_key = ("library", result_cache.normalize_query(q), composer_id, genre, epoch, skip, limit)
+        cached = result_cache.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         # <--- 2. ПЕРЕДАЕМ EPOCH В CRUD
         # ВНИМАНИЕ: Если файл app/crud/music.py не обновлен, здесь будет ошибка!
         # Вам нужно будет скинуть мне app/crud/music.py следующим сообщением.
-        return crud.music.get_library_works(
+        page = crud.music.get_library_works(
             db, skip=skip, limit=limit, q=q, composer_id=composer_id, genre=genre, epoch=epoch
         )
+        # В кэше храним уже сериализованную Pydantic-модель, а не ORM-объекты сессии
+        page = schemas.music.LibraryPage.model_validate(page, from_attributes=True)
+        result_cache.cache.set(cache_key, page, cache_gen)
+        return page
+
+    cache_key = (
+        "recordings", result_cache.normalize_query(q), media_type, composer_id, genre, epoch, sort_by, skip, limit
+    )
+    cached = result_cache.cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     # РЕЖИМ 2: ПЛОСКИЙ СПИСОК (Старая логика)
     query = (
@@ -422,17 +674,6 @@ def list_recordings(
     elif media_type == "video":
         query = query.filter(models.music.Recording.duration == 0)
 
-    if q:
-        search_term = q.lower()
-        query = query.filter(
-            or_(
-                func.lower_utf8(models.music.Recording.performers).contains(search_term),
-                func.lower_utf8(models.music.Composition.title_ru).contains(search_term),
-                func.lower_utf8(models.music.Work.name_ru).contains(search_term),
-                func.lower_utf8(models.music.Composer.name_ru).contains(search_term)
-            )
-        )
-
     if composer_id:
         query = query.filter(models.music.Work.composer_id == composer_id)
 
@@ -443,6 +684,28 @@ def list_recordings(
     if epoch:
         query = query.filter(models.music.Composer.epoch == epoch)
 
+    if q:
+        ranked = None
+        if catalog_fts.is_available(db):
+            # Полнотекстовый поиск по FTS5: сначала самые релевантные (bm25)
+            fts_match = catalog_fts.match_subquery(q, catalog_fts.RECORDING)
+            if fts_match is None:
+                return {"total": 0, "recordings": [], "items": []}
+            ranked = query.join(fts_match, fts_match.c.id == models.music.Recording.id).order_by(fts_match.c.score)
+        if ranked is not None and db.query(ranked.exists()).scalar():
+            query = ranked
+        else:
+            # FTS ищет слова по началу; подстроку в середине слова находит только LIKE
+            search_term = utils.normalize_text_smart(q)
+            query = query.filter(
+                or_(
+                    models.music.Recording.search_text.contains(search_term),
+                    models.music.Composition.search_text.contains(search_term),
+                    models.music.Work.search_text.contains(search_term),
+                    models.music.Composer.search_text.contains(search_term)
+                )
+            )
+
     if sort_by == "newest":
         query = query.order_by(models.music.Recording.id.desc())
     elif sort_by == "oldest":
@@ -451,15 +714,45 @@ def list_recordings(
     total = query.count()
     items = query.offset(skip).limit(limit).all()
 
-    return {"total": total, "recordings": items, "items": []}
+    page = schemas.music.RecordingPage.model_validate({"total": total, "recordings": items}, from_attributes=True)
+    result_cache.cache.set(cache_key, page, cache_gen)
+    return page
 
 
 # --- ПРОЧЕЕ ---
 @router.get("/stream/{rid}")
-def stream(rid: int, db: Session = Depends(get_db)):
-    rec = crud.music.get_recording(db, rid)
-    if not rec or not os.path.exists(rec.file_path.lstrip('/')): raise HTTPException(404, "Not found")
-    return FileResponse(rec.file_path.lstrip('/'))
+async def stream(rid: int):
+    # Путь берется из карты в памяти: без БД и без слота в threadpool
+    media = media_registry.get(rid)
+    if not media or not await media_stream.is_file(media.path):
+        # Запись добавлена другим процессом (scan) или файл перенесен (migrate_storage)
+        media = await run_in_threadpool(media_registry.load, rid)
+    if not media: raise HTTPException(404, "Not found")
+    # Range/206, ETag из хэша файла, 304 по If-None-Match
+    return media_stream.MediaFileResponse(
+        media.path, etag=media_stream.make_etag(media.file_hash), stat_result=media.stat
+    )
+
+
+def _check_name_typo(db: Session, kind: str, name: str) -> dict:
+    candidates = name_index.get_index(db, kind).find_similar(name)
+    return {"similar": candidates[0] if candidates else None, "candidates": candidates}
+
+
+@router.post("/performers/check-typo", response_model=schemas.music.NameTypoCheck)
+def check_performer_typo(name_in: schemas.music.NameCheck, db: Session = Depends(get_db)):
+    """
+    Проверяет исполнителя на опечатки: возвращает похожие написания из базы.
+    """
+    return _check_name_typo(db, name_index.PERFORMER, name_in.name)
+
+
+@router.post("/publishers/check-typo", response_model=schemas.music.NameTypoCheck)
+def check_publisher_typo(name_in: schemas.music.NameCheck, db: Session = Depends(get_db)):
+    """
+    Проверяет издателя на опечатки: возвращает похожие написания из базы.
+    """
+    return _check_name_typo(db, name_index.PUBLISHER, name_in.name)
 
 
 @router.post("/{rid}/favorite", status_code=204)
@@ -473,41 +766,61 @@ def fav_del(rid: int, db: Session = Depends(get_db), u=Depends(deps.get_current_
 
 
 # --- ЗАГРУЗКА ОБЛОЖЕК ---
+# Картинка обрабатывается в задаче image_upload (app.services.image_uploads): ответ 202
+# с прежней обложкой, новая появится, когда задача из Location закончится.
 
-@router.post("/composers/{id}/cover", response_model=schemas.music.Composer)
+@router.post("/composers/{id}/cover", response_model=schemas.music.Composer, status_code=status.HTTP_202_ACCEPTED)
 def upload_composer_cover(
         id: int,
+        response: Response,
         file: UploadFile = File(...),
         db: Session = Depends(get_db),
         u: models.User = Depends(deps.get_current_active_admin)
 ):
-    if not crud.music.get_composer(db, id): raise HTTPException(404, "Composer not found")
-    url = utils.save_upload_file(file, "composers", f"comp_{id}")
-    return crud.music.update_composer_portrait(db, id, url)
+    obj = crud.music.get_composer(db, id)
+    if not obj: raise HTTPException(404, "Composer not found")
+    try:
+        job = image_uploads.save_upload_file(db, file, "composer", id)
+    except utils.ImageRejected as e:
+        raise HTTPException(400, str(e))
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return obj
 
 
-@router.post("/works/{id}/cover", response_model=schemas.music.Work)
+@router.post("/works/{id}/cover", response_model=schemas.music.Work, status_code=status.HTTP_202_ACCEPTED)
 def upload_work_cover(
         id: int,
+        response: Response,
         file: UploadFile = File(...),
         db: Session = Depends(get_db),
         u: models.User = Depends(deps.get_current_active_admin)
 ):
-    if not crud.music.get_work(db, id): raise HTTPException(404, "Work not found")
-    url = utils.save_upload_file(file, "works", f"work_{id}")
-    return crud.music.update_work_cover(db, id, url)
+    obj = crud.music.get_work(db, id)
+    if not obj: raise HTTPException(404, "Work not found")
+    try:
+        job = image_uploads.save_upload_file(db, file, "work", id)
+    except utils.ImageRejected as e:
+        raise HTTPException(400, str(e))
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return obj
 
 
-@router.post("/compositions/{id}/cover", response_model=schemas.music.Composition)
+@router.post("/compositions/{id}/cover", response_model=schemas.music.Composition, status_code=status.HTTP_202_ACCEPTED)
 def upload_composition_cover(
         id: int,
+        response: Response,
         file: UploadFile = File(...),
         db: Session = Depends(get_db),
         u: models.User = Depends(deps.get_current_active_admin)
 ):
-    if not crud.music.get_composition(db, id): raise HTTPException(404, "Composition not found")
-    url = utils.save_upload_file(file, "compositions", f"part_{id}")
-    return crud.music.update_composition_cover(db, id, url)
+    obj = crud.music.get_composition(db, id)
+    if not obj: raise HTTPException(404, "Composition not found")
+    try:
+        job = image_uploads.save_upload_file(db, file, "composition", id)
+    except utils.ImageRejected as e:
+        raise HTTPException(400, str(e))
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return obj
 
 
 @router.put("/works/{work_id}/reorder-compositions", status_code=200)
@@ -527,20 +840,9 @@ def get_random_work_for_interactive(db: Session = Depends(get_db)):
     Возвращает одно случайное произведение со всеми его аудиозаписями
     для интерактивного блока "Случайный выбор".
     """
-    random_func = func.random()
-    if db.bind.dialect.name == 'mysql':
-        random_func = func.rand()
-
-    # 1. Находим случайное произведение, у которого есть хоть одна аудиозапись
-    work = (
-        db.query(models.music.Work)
-        .join(models.music.Work.compositions)
-        .join(models.music.Composition.recordings)
-        .filter(models.music.Recording.duration > 0)
-        .order_by(random_func)
-        .first()
-    )
-    if not work:
+    # 1. Случайное произведение, у которого есть хоть одна аудиозапись
+    work_id = random_works.choice(db, random_works.PLAYABLE)
+    if work_id is None:
         raise HTTPException(status_code=404, detail="No playable works found")
 
     # 2. Загружаем это произведение со всеми его данными, включая записи
@@ -551,8 +853,10 @@ def get_random_work_for_interactive(db: Session = Depends(get_db)):
             joinedload(models.music.Work.compositions)
             .joinedload(models.music.Composition.recordings)
         )
-        .filter(models.music.Work.id == work.id)
+        .filter(models.music.Work.id == work_id)
         .first()
     )
+    if not full_work:
+        raise HTTPException(status_code=404, detail="No playable works found")
 
     return full_work
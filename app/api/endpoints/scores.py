@@ -6,6 +6,7 @@ from app import models, schemas
 from app.api import deps
 from app.db.session import get_db
 from app.models.score import Score
+from app.services import result_cache
 
 router = APIRouter()
 
@@ -26,6 +27,7 @@ def create_score(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    result_cache.bump_generation()
     return db_obj
 
 
@@ -60,6 +62,7 @@ def update_score(
     db.add(score)
     db.commit()
     db.refresh(score)
+    result_cache.bump_generation()
     return score
 
 
@@ -75,4 +78,5 @@ def delete_score(
 
     db.delete(score)
     db.commit()
+    result_cache.bump_generation()
     return
\ No newline at end of file
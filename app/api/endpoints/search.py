@@ -5,60 +5,19 @@ from app import models, schemas
 from app.api import deps
 from app.db.session import get_db
 from typing import List, Optional
-from sqlalchemy import func
-import re
-from thefuzz import fuzz
-from app.utils import switch_keyboard_layout
+from app.utils import switch_keyboard_layout, normalize_text_smart
+from app.services import search_index, suggest_index, result_cache, duplicate_index
 
 router = APIRouter()
 
 
-def normalize_text_smart(text: Optional[str]) -> str:
-    """
-    1. Приводит к нижнему регистру.
-    2. Вставляет пробелы между буквами и цифрами (kv525 -> kv 525).
-    3. Удаляет лишние спецсимволы.
-    """
-    if not text:
-        return ""
-    text = text.lower()
-    # Вставляем пробел между буквой и цифрой (kv525 -> kv 525)
-    text = re.sub(r'([a-zа-яё])(\d)', r'\1 \2', text)
-    # Вставляем пробел между цифрой и буквой (525kv -> 525 kv)
-    text = re.sub(r'(\d)([a-zа-яё])', r'\1 \2', text)
-    # Заменяем все не-буквы и не-цифры на пробелы
-    text = re.sub(r'[^\w\d]+', ' ', text)
-    return text.strip()
-
-
-def is_fuzzy_match(target_text: str, query_tokens: List[str]) -> bool:
-    """
-    Проверяет нечеткое вхождение токенов.
-    Позволяет опечатки (ratio > 80).
-    """
-    if not target_text:
-        return False
-
-    # Нормализуем цель (разбиваем kv525 -> kv 525)
-    norm_target = normalize_text_smart(target_text)
-
-    for token in query_tokens:
-        # 1. Точное вхождение (быстро и надежно)
-        if token in norm_target:
-            continue
-
-        # 2. Нечеткое вхождение (для опечаток: сната -> соната)
-        # partial_ratio ищет лучшее вхождение подстроки
-        score = fuzz.partial_ratio(token, norm_target)
-
-        # Если слово короткое (< 4 букв), требуем точного совпадения или очень высокого скора
-        if len(token) < 4:
-            if score < 100: return False
-        # Для длинных слов допускаем опечатки (порог 80/100)
-        elif score < 80:
-            return False
-
-    return True
+def _load_in_order(db: Session, model, ids: List[int], *options) -> list:
+    """Загружает только найденные строки, сохраняя порядок ID."""
+    if not ids:
+        return []
+    objs = db.query(model).options(*options).filter(model.id.in_(ids)).all()
+    by_id = {o.id: o for o in objs}
+    return [by_id[i] for i in ids if i in by_id]
 
 
 @router.get("/", response_model=schemas.search.SearchResults)
@@ -66,6 +25,15 @@ def universal_search(q: str, db: Session = Depends(get_db)):
     if not q or len(q) < 2:
         return schemas.search.SearchResults(query=q)
 
+    cache_gen = result_cache.generation()
+    cache_key = ("search", result_cache.normalize_query(q))
+    cached = result_cache.cache.get(cache_key)
+    if cached is not None:
+        # В ответе эхом возвращается исходный запрос, а не нормализованный ключ
+        return cached.model_copy(update={"query": q})
+
+    search_index.ensure_built(db)
+
     # 1. Подготовка запроса
     original_q = q.strip()
     switched_q = switch_keyboard_layout(original_q)
@@ -74,88 +42,70 @@ def universal_search(q: str, db: Session = Depends(get_db)):
     tokens_orig = normalize_text_smart(original_q).split()
     tokens_switched = normalize_text_smart(switched_q).split()
 
-    # Функция-хелпер
-    def check_obj(obj_texts: List[Optional[str]]) -> bool:
-        full_text = " ".join([t for t in obj_texts if t])
-
-        if is_fuzzy_match(full_text, tokens_orig):
-            return True
-        if tokens_orig != tokens_switched and is_fuzzy_match(full_text, tokens_switched):
-            return True
-        return False
-
-    # 2. Поиск Композиторов
-    all_composers = db.query(models.music.Composer).all()
-    found_composers = [
-                          c for c in all_composers
-                          if check_obj([c.name_ru, c.original_name])
-                      ][:10]
-
-    # 3. Поиск Произведений (Расширенные поля)
-    all_works = db.query(models.music.Work).options(joinedload(models.music.Work.composer)).all()
-    found_works = [
-                      w for w in all_works
-                      if check_obj([
-            w.name_ru, w.original_name, w.nickname,
-            w.catalog_number, str(w.publication_year or ''),
-            w.composer.name_ru  # Ищем и по композитору тоже
-        ])
-                  ][:20]
-
-    # 4. Поиск Частей
-    all_compositions = db.query(models.music.Composition).options(
+    token_variants = [tokens_orig]
+    if tokens_orig != tokens_switched:
+        token_variants.append(tokens_switched)
+
+    # 2. Поиск по индексу: получаем только ID совпавших сущностей
+    composer_ids = search_index.index.search(search_index.COMPOSER, token_variants, limit=10)
+    work_ids = search_index.index.search(search_index.WORK, token_variants, limit=20)
+    composition_ids = search_index.index.search(search_index.COMPOSITION, token_variants, limit=20)
+    recording_ids = search_index.index.search(search_index.RECORDING, token_variants, limit=50)
+
+    # 3. Загружаем из БД только найденные строки
+    found_composers = _load_in_order(db, models.music.Composer, composer_ids)
+
+    found_works = _load_in_order(
+        db, models.music.Work, work_ids,
+        joinedload(models.music.Work.composer)
+    )
+
+    found_compositions = _load_in_order(
+        db, models.music.Composition, composition_ids,
         joinedload(models.music.Composition.work).joinedload(models.music.Work.composer)
-    ).all()
-
-    found_compositions = [
-                             c for c in all_compositions
-                             if check_obj([
-            c.title_ru, c.title_original, c.catalog_number,
-            c.work.name_ru  # Контекст произведения
-        ])
-                         ][:20]
-
-    # 5. Поиск Записей
-    all_recordings = db.query(models.music.Recording).options(
+    )
+
+    found_recordings = _load_in_order(
+        db, models.music.Recording, recording_ids,
         joinedload(models.music.Recording.composition)
         .joinedload(models.music.Composition.work)
         .joinedload(models.music.Work.composer)
-    ).all()
-
-    found_recordings = [
-                           r for r in all_recordings
-                           if check_obj([
-            r.performers, r.conductor, r.lead_performer,
-            r.publisher,
-            str(r.recording_year or ''),
-            r.composition.title_ru,  # Название части
-            r.composition.work.name_ru,  # Название произведения
-            r.composition.work.nickname  # Прозвище
-        ])
-                       ][:50]
-
-    return schemas.search.SearchResults(
+    )
+
+    results = schemas.search.SearchResults(
         query=q,
         composers=found_composers,
         works=found_works,
         compositions=found_compositions,
         recordings=found_recordings
     )
+    result_cache.cache.set(cache_key, results, cache_gen)
+    return results
 
 
-def normalize_for_comparison(text: str) -> str:
-    """Очищает строку для сравнения, удаляя лишние символы и слова."""
-    if not text:
-        return ""
-    text = text.lower()
-    text = text.replace('ё', 'е')
-    text = re.sub(r'\(.*?\)', '', text)
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+@router.get("/suggest", response_model=List[schemas.search.SuggestItem])
+def suggest(
+        q: str = Query(..., min_length=1, description="Начало имени, названия или каталожного номера"),
+        limit: int = Query(10, ge=1, le=suggest_index.MAX_LIMIT),
+        db: Session = Depends(get_db)
+):
+    # Отвечает из памяти процесса: без запросов к БД (кроме первой сборки индекса)
+    suggest_index.ensure_built(db)
+    return suggest_index.index.suggest(q, limit)
+
+
+def _duplicate_scope(entity_type: str, composer_id: Optional[int], work_id: Optional[int]):
+    """Набор для сравнения: (тип, ID родителя) или None, если параметров не хватает."""
+    if entity_type == "composer":
+        return duplicate_index.COMPOSER, None
+    if entity_type == "work" and composer_id:
+        return duplicate_index.WORK, composer_id
+    if entity_type == "composition" and work_id:
+        return duplicate_index.COMPOSITION, work_id
+    return None
 
 
-@router.get("/check-duplicates", response_model=List[schemas.music.WorkSimple])
+@router.get("/check-duplicates", response_model=List[schemas.search.DuplicateMatch])
 def check_for_duplicates(
         entity_type: str = Query(..., description="Тип сущности: composer, work, composition"),
         query: str = Query(..., min_length=3, description="Поисковый запрос"),
@@ -163,34 +113,28 @@ def check_for_duplicates(
         work_id: Optional[int] = Query(None),
         db: Session = Depends(get_db),
 ):
-    """Ищет похожие сущности для проверки на дубликаты, используя нечеткий поиск."""
-    normalized_query = normalize_for_comparison(query)
-    if not normalized_query:
+    """
+    Ищет похожие сущности для проверки на дубликаты, используя нечеткий поиск.
+    Кандидаты отбираются по общим триграммам, результаты отсортированы по сходству.
+    """
+    scope = _duplicate_scope(entity_type, composer_id, work_id)
+    if scope is None or not duplicate_index.normalize_for_comparison(query):
         return []
 
-    duplicates = []
+    return duplicate_index.find_duplicates(db, scope[0], [query], scope_id=scope[1])[0]
 
-    SIMILARITY_THRESHOLD = 85
 
-    if entity_type == "composer":
-        all_items = db.query(models.music.Composer).all()
-        for c in all_items:
-            score = fuzz.partial_ratio(normalized_query, normalize_for_comparison(c.name_ru))
-            if score >= SIMILARITY_THRESHOLD:
-                duplicates.append({"id": c.id, "name_ru": c.name_ru, "slug": c.slug})
-
-    elif entity_type == "work" and composer_id:
-        all_items = db.query(models.music.Work).filter(models.music.Work.composer_id == composer_id).all()
-        for w in all_items:
-            score = fuzz.partial_ratio(normalized_query, normalize_for_comparison(w.name_ru))
-            if score >= SIMILARITY_THRESHOLD:
-                duplicates.append({"id": w.id, "name_ru": w.name_ru, "slug": w.slug})
-
-    elif entity_type == "composition" and work_id:
-        all_items = db.query(models.music.Composition).filter(models.music.Composition.work_id == work_id).all()
-        for c in all_items:
-            score = fuzz.partial_ratio(normalized_query, normalize_for_comparison(c.title_ru))
-            if score >= SIMILARITY_THRESHOLD:
-                duplicates.append({"id": c.id, "name_ru": c.title_ru, "slug": c.slug})
-
-    return duplicates[:5]
\ No newline at end of file
+@router.post("/check-duplicates/bulk", response_model=List[schemas.search.DuplicateCheckResult])
+def check_for_duplicates_bulk(
+        check_in: schemas.search.DuplicateCheckBulk,
+        db: Session = Depends(get_db),
+):
+    """
+    Та же проверка для списка названий (например, при импорте таблицы) за один запрос.
+    """
+    scope = _duplicate_scope(check_in.entity_type, check_in.composer_id, check_in.work_id)
+    if scope is None:
+        return [{"query": name, "matches": []} for name in check_in.names]
+
+    matches = duplicate_index.find_duplicates(db, scope[0], check_in.names, scope_id=scope[1])
+    return [{"query": name, "matches": m} for name, m in zip(check_in.names, matches)]
@@ -1,10 +1,11 @@
 from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response
 from sqlalchemy.orm import Session
 
 from app import models, schemas, crud, utils
 from app.api import deps
 from app.security import get_password_hash, verify_password
+from app.services import image_uploads, image_variants
 
 router = APIRouter()
 
@@ -100,8 +101,9 @@ def read_user_favorite_recordings(
     return current_user.favorite_recordings
 
 
-@router.post("/me/avatar")
+@router.post("/me/avatar", status_code=status.HTTP_202_ACCEPTED)
 def upload_user_avatar(
+        response: Response,
         file: UploadFile = File(...),
         db: Session = Depends(deps.get_db),
         current_user: models.User = Depends(deps.get_current_user),
@@ -109,21 +111,16 @@ def upload_user_avatar(
     """
     Upload or replace user avatar.
     """
-    # 1. Удаляем старый аватар, если он есть
-    if current_user.avatar_url:
-        utils.delete_file_by_url(current_user.avatar_url)
-
-    # 2. Сохраняем новый через утилиту (она сама сожмет и сгенерирует имя)
-    # Файлы будут лежать в static/covers/avatars (единый стиль с обложками)
-    url = utils.save_upload_file(file, "avatars", f"user_{current_user.id}")
-
-    # 3. Обновляем БД
-    current_user.avatar_url = url
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-
-    return {"avatar_url": current_user.avatar_url}
+    # Обработка идет в фоне (файлы в static/covers/avatars, единый стиль с обложками).
+    # Старый аватар заменяется и удаляется, только когда новый готов; до тех пор
+    # отдаем текущий, а задачу — в Location
+    try:
+        job = image_uploads.save_upload_file(db, file, "avatar", current_user.id)
+    except utils.ImageRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response.headers["Location"] = f"/api/jobs/{job.id}"
+    return {"avatar_url": current_user.avatar_url, "avatar_srcset": image_variants.srcset(current_user.avatar_url)}
 
 
 @router.delete("/me/avatar")
@@ -6,4 +6,15 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 43200))
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 43200))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 2048))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", 300))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+AUDIO_STORAGE = os.getenv("AUDIO_STORAGE", "flat")  # flat | cas, см. app.services.storage
+SCRUB_INTERVAL_HOURS = float(os.getenv("SCRUB_INTERVAL_HOURS", 0))  # 0 = только вручную
+SCRUB_MAX_MB_PER_SEC = float(os.getenv("SCRUB_MAX_MB_PER_SEC", 50))
+SCRUB_WORKERS = int(os.getenv("SCRUB_WORKERS", 1))  # свой пул проверки хранилища, не общий JOB_WORKERS
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))  # пул уменьшения картинок (/api/img)
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", 1024))  # кэш уменьшенных картинок (data/img_cache)
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 60_000_000))  # бюджет пикселей одной загружаемой картинки
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", 60))  # пересчет ответа главной, см. dashboard_cache
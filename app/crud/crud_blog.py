@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from app.models.blog import Post, Tag
 from app.schemas.blog import PostCreate, PostUpdate
 from app.utils import delete_file_by_url
+from app.services import image_variants
 
 def _get_or_create_tags(db: Session, tag_names: list[str]) -> list[Tag]:
     """Находит теги по именам или создает новые, если их нет."""
@@ -73,6 +74,7 @@ def update_cover(db: Session, post_id: int, url: str):
         if post.cover_image_url:
             delete_file_by_url(post.cover_image_url)
         post.cover_image_url = url
+        post.cover_image_lqip = image_variants.lqip_for_url(url)
         db.commit()
         db.refresh(post)
     return post
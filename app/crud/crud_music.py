@@ -1,12 +1,13 @@
-from app.utils import generate_unique_slug, delete_file_by_url
+from app.utils import generate_unique_slug, delete_file_by_url, switch_keyboard_layout, normalize_text_smart
 
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func, String, and_
+from sqlalchemy import or_, func, and_
 
 from app import models, schemas
+from app.services import search_index, catalog_fts, catalog_stats, random_works, search_text, suggest_index, result_cache, name_index, media_registry, storage, image_variants
 
 
 # --- Helper ---
@@ -16,7 +17,7 @@ def _delete_physical_files(file_paths: List[str]):
     """
     for path in file_paths:
         try:
-            clean_path = path.lstrip("/")
+            clean_path = storage.resolve(path)
             if os.path.exists(clean_path):
                 os.remove(clean_path)
                 print(f"Deleted file: {clean_path}")
@@ -24,6 +25,44 @@ def _delete_physical_files(file_paths: List[str]):
             print(f"Error deleting file {path}: {e}")
 
 
+def _library_like_filter(q: str):
+    """
+    Запасной вариант поиска библиотеки (если FTS-таблицы не созданы):
+    LIKE по готовому search_text произведения, композитора и записей.
+    """
+    search_terms = [q]
+    switched = switch_keyboard_layout(q)
+    if switched != q:
+        search_terms.append(switched)
+
+    # Собираем фильтры для каждого варианта раскладки (обычно их 1 или 2):
+    # все слова запроса (AND) должны найтись хотя бы в одном из текстов
+    or_filters = []
+
+    for term in search_terms:
+        # "Умная" нормализация, как у search_text ("Op.55" -> ["op", "55"])
+        tokens = normalize_text_smart(term).split()
+        token_filters = [
+            or_(
+                models.music.Work.search_text.contains(token),
+                models.music.Composer.search_text.contains(token),
+                models.music.Recording.search_text.contains(token),
+            )
+            for token in tokens
+        ]
+
+        # "Безпробельный" поиск всего запроса (для каталогов и номеров: kv 525 == kv525)
+        compact_term = search_text.compact(normalize_text_smart(term))
+        if compact_term:
+            token_filters = [or_(and_(*token_filters), models.music.Work.search_text_compact.contains(compact_term))]
+
+        if token_filters:
+            or_filters.append(and_(*token_filters))
+
+    # Объединяем варианты раскладок через OR
+    return or_(*or_filters)
+
+
 def get_library_works(
         db: Session,
         skip: int = 0,
@@ -47,72 +86,6 @@ def get_library_works(
         .filter(models.music.Recording.duration > 0)
     )
 
-    if q:
-        from app.utils import switch_keyboard_layout  # Импорт внутри, чтобы избежать цикличности, если нужно
-
-        search_terms = [q.lower()]
-        switched = switch_keyboard_layout(q)
-        if switched != q:
-            search_terms.append(switched.lower())
-
-        # Логика:
-        # 1. Разбиваем запрос на слова (токенизация).
-        # 2. Ищем совпадение ВСЕХ слов (AND) в ОДНОМ из полей или комбинации.
-        # Для SQL LIKE это сложно сделать одним выражением, поэтому делаем упрощенно:
-        # Ищем записи, где конкатенация всех полей содержит запрос.
-
-        # Но для точности и поддержки "№11" vs "№ 11", лучше просто искать вхождение
-        # хотя бы одного варианта (оригинал или свитч) в конкатенированной строке полей.
-
-        # Собираем фильтры для каждого варианта раскладки (обычно их 1 или 2)
-        or_filters = []
-
-        for term in search_terms:
-            # Разбиваем "sonata 14" -> ["sonata", "14"]
-            tokens = term.split()
-            token_filters = []
-
-            for term in search_terms:
-                # Разбиваем запрос на слова
-                raw_tokens = term.split()
-                token_filters = []
-
-                for token in raw_tokens:
-                    # Очищаем токен от пробелов (хотя split их уже убрал, но для гарантии логики)
-                    clean_token = token.replace(" ", "")
-
-                    # --- ЛОГИКА: Сравниваем строки БЕЗ ПРОБЕЛОВ ---
-                    # func.replace(Field, ' ', '') превращает "Op. 55" в базе в "Op.55"
-                    # И мы ищем там "Op.55". Это решает проблему пробелов.
-
-                    token_filters.append(
-                        or_(
-                            # Обычный поиск (для текста)
-                            func.lower_utf8(models.music.Work.name_ru).contains(token),
-                            func.lower_utf8(models.music.Work.original_name).contains(token),
-                            func.lower_utf8(models.music.Work.nickname).contains(token),
-                            func.lower_utf8(models.music.Composer.name_ru).contains(token),
-                            func.lower_utf8(models.music.Recording.performers).contains(token),
-                            func.lower_utf8(models.music.Recording.publisher).contains(token),
-
-                            # "Безпробельный" поиск (для каталогов и номеров: kv 525 == kv525)
-                            func.lower_utf8(func.replace(models.music.Work.catalog_number, ' ', '')).contains(
-                                clean_token),
-                            func.lower_utf8(func.replace(models.music.Work.name_ru, ' ', '')).contains(clean_token),
-                            # Помогает найти "Симфония№5"
-
-                            # Поиск по году
-                            func.cast(models.music.Work.publication_year, String).contains(token)
-                        )
-                    )
-
-                if token_filters:
-                    or_filters.append(and_(*token_filters))
-
-        # Объединяем варианты раскладок через OR
-        if or_filters:
-            query = query.filter(or_(*or_filters))
-
     if composer_id:
         query = query.filter(models.music.Work.composer_id == composer_id)
 
@@ -122,9 +95,27 @@ def get_library_works(
     if epoch:
         query = query.filter(models.music.Composer.epoch == epoch)
 
-    query = query.group_by(models.music.Work.id).order_by(models.music.Work.id.desc())
-
-    total = query.count()
+    query = query.group_by(models.music.Work.id)
+    total = 0
+    if q and catalog_fts.is_available(db):
+        # Полнотекстовый поиск по FTS5 с ранжированием bm25
+        fts_match = catalog_fts.match_subquery(q, catalog_fts.WORK)
+        if fts_match is None:
+            return {"total": 0, "items": []}
+        ranked = (
+            query.join(fts_match, fts_match.c.id == models.music.Work.id)
+            .order_by(func.min(fts_match.c.score), models.music.Work.id.desc())
+        )
+        total = ranked.count()
+        if total:
+            query = ranked
+    if not total:
+        if q:
+            # Без FTS или FTS ничего не нашел: FTS ищет слова по началу,
+            # подстроку в середине слова находит только LIKE
+            query = query.filter(_library_like_filter(q))
+        query = query.order_by(models.music.Work.id.desc())
+        total = query.count()
     work_ids_tuples = query.offset(skip).limit(limit).all()
     work_ids = [t[0] for t in work_ids_tuples]
 
@@ -140,9 +131,11 @@ def get_library_works(
             joinedload(models.music.Work.compositions).joinedload(models.music.Composition.recordings)
         )
         .filter(models.music.Work.id.in_(work_ids))
-        .order_by(models.music.Work.id.desc())
         .all()
     )
+    # Сохраняем порядок первого запроса (по релевантности или по новизне)
+    position = {work_id: i for i, work_id in enumerate(work_ids)}
+    works.sort(key=lambda w: position[w.id])
 
     # 3. Подготовка данных для Pydantic с дополнительной фильтрацией
     result_items = []
@@ -181,9 +174,14 @@ def create_composer(db: Session, composer_in: schemas.music.ComposerCreate) -> m
         latitude=composer_in.latitude,
         longitude=composer_in.longitude
     )
+    search_text.fill(db_obj)
     db.add(db_obj)
+    catalog_stats.adjust(db, composers=1)
     db.commit()
     db.refresh(db_obj)
+    search_index.index_composer(db_obj)
+    suggest_index.refresh_composer(db, db_obj.id)
+    result_cache.bump_generation()
     return db_obj
 
 
@@ -194,9 +192,15 @@ def create_work_for_composer(db: Session, work_in: schemas.music.WorkCreate, com
 
     db_obj = models.music.Work(**work_in.dict(), composer_id=composer_id)
     db_obj.slug = slug  # <--
+    search_text.fill(db_obj)
     db.add(db_obj)
+    catalog_stats.adjust(db, works=int(catalog_stats.counts_as_work(db_obj.name_ru)))
     db.commit()
     db.refresh(db_obj)
+    search_index.index_work(db_obj)
+    suggest_index.refresh_work(db, db_obj.id)
+    random_works.refresh_work(db, db_obj.id)
+    result_cache.bump_generation()
     return db_obj
 
 
@@ -208,9 +212,13 @@ def create_composition_for_work(db: Session, comp_in: schemas.music.CompositionC
 
     db_obj = models.music.Composition(**comp_in.dict(), work_id=work_id)
     db_obj.slug = slug  # <--
+    search_text.fill(db_obj)
     db.add(db_obj)
+    catalog_stats.adjust(db, compositions=1)
     db.commit()
     db.refresh(db_obj)
+    search_index.index_composition(db_obj)
+    result_cache.bump_generation()
     return db_obj
 
 
@@ -230,6 +238,21 @@ def get_recording_by_hash(db: Session, file_hash: str) -> Optional[models.music.
     return db.query(models.music.Recording).filter(models.music.Recording.file_hash == file_hash).first()
 
 
+def find_near_duplicate_recording(
+        db: Session, composition_id: int, performers: Optional[str], duration: int
+) -> Optional[models.music.Recording]:
+    """Та же часть, те же исполнители и длительность в пределах 2 секунд."""
+    if not performers or duration <= 0:
+        return None
+    return db.query(models.music.Recording).filter(
+        and_(
+            models.music.Recording.composition_id == composition_id,
+            func.lower_utf8(models.music.Recording.performers) == performers.lower(),
+            models.music.Recording.duration.between(duration - 2, duration + 2)
+        )
+    ).first()
+
+
 def create_recording_for_composition(
         db: Session, rec_in: schemas.RecordingCreate, composition_id: int, duration: int, file_path: str, file_hash: str
 ) -> models.music.Recording:
@@ -248,12 +271,75 @@ def create_recording_for_composition(
         source_text = rec_in.source_text,
         source_url = rec_in.source_url
     )
+    search_text.fill(db_obj)
     db.add(db_obj)
+    catalog_stats.adjust(db, recordings=1, duration=duration)
     db.commit()
     db.refresh(db_obj)
+    search_index.index_recording(db_obj)
+    work = db_obj.composition.work
+    suggest_index.refresh_popularity(db, work.id, work.composer_id)
+    random_works.refresh_work(db, work.id)
+    name_index.add_recording(db_obj.performers, db_obj.publisher)
+    result_cache.bump_generation()
     return db_obj
 
 
+def create_recordings_bulk(
+        db: Session, items: List[dict], place_file: Callable[[models.music.Recording, dict], str]
+) -> List[models.music.Recording]:
+    """
+    Создает записи одной транзакцией (пакетный импорт).
+    items: dict с composition_id, rec_in, duration, file_hash.
+    place_file(recording, item) вызывается после flush (ID уже известен),
+    переносит файл и возвращает file_path. При ошибке транзакция откатывается,
+    перенесенные файлы возвращает вызывающий.
+    """
+    objs = []
+    for item in items:
+        rec_in = item["rec_in"]
+        db_obj = models.music.Recording(
+            performers=rec_in.performers,
+            recording_year=rec_in.recording_year,
+            duration=item["duration"],
+            file_path=f"temp:{item['file_hash']}",  # file_path уникален, настоящий путь — после flush
+            file_hash=item["file_hash"],
+            composition_id=item["composition_id"],
+            lead_performer=rec_in.lead_performer,
+            conductor=rec_in.conductor,
+            license=rec_in.license,
+            publisher=rec_in.publisher,
+            source_text=rec_in.source_text,
+            source_url=rec_in.source_url
+        )
+        search_text.fill(db_obj)
+        db.add(db_obj)
+        objs.append(db_obj)
+
+    try:
+        db.flush()
+        for db_obj, item in zip(objs, items):
+            db_obj.file_path = place_file(db_obj, item)
+        catalog_stats.adjust(db, recordings=len(objs), duration=sum(item["duration"] for item in items))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    works = {}
+    for db_obj in objs:
+        db.refresh(db_obj)
+        search_index.index_recording(db_obj)
+        name_index.add_recording(db_obj.performers, db_obj.publisher)
+        work = db_obj.composition.work
+        works[work.id] = work.composer_id
+    for work_id, composer_id in works.items():
+        suggest_index.refresh_popularity(db, work_id, composer_id)
+        random_works.refresh_work(db, work_id)
+    result_cache.bump_generation()
+    return objs
+
+
 def get_recording(db: Session, recording_id: int) -> Optional[models.music.Recording]:
     return db.query(models.music.Recording).get(recording_id)
 
@@ -271,12 +357,18 @@ def remove_recording_from_favorites(db: Session, user: models.User, recording: m
 
 
 def update_full_details(db: Session, recording: models.music.Recording, d: schemas.music.FullRecordingDetailsUpdate):
+    old_names = (recording.performers, recording.publisher)
     if d.performers: recording.performers = d.performers
     if d.recording_year: recording.recording_year = d.recording_year
     if d.youtube_url is not None: recording.youtube_url = d.youtube_url
     if d.publisher is not None: recording.publisher = d.publisher
+    search_text.fill(recording)
     db.commit()
     db.refresh(recording)
+    search_index.index_recording(recording)
+    name_index.discard_recording(*old_names)
+    name_index.add_recording(recording.performers, recording.publisher)
+    result_cache.bump_generation()
     return recording
 
 
@@ -287,10 +379,21 @@ def delete_recording(db: Session, recording_id: int) -> bool:
     if not rec: return False
 
     path = rec.file_path
+    names = (rec.performers, rec.publisher)
+    index_ids = search_index.collect_ids(rec)
+    work = rec.composition.work
+    work_id, composer_id = work.id, work.composer_id
     db.delete(rec)
+    catalog_stats.adjust(db, recordings=-1, duration=-(rec.duration or 0))
     db.commit()
+    search_index.remove_ids(index_ids)
+    media_registry.unregister(index_ids[search_index.RECORDING])
+    suggest_index.refresh_popularity(db, work_id, composer_id)
+    random_works.refresh_work(db, work_id)
+    name_index.discard_recording(*names)
 
     _delete_physical_files([path])
+    result_cache.bump_generation()
     return True
 
 
@@ -299,11 +402,23 @@ def delete_composition(db: Session, composition_id: int) -> bool:
     if not comp: return False
 
     files = [r.file_path for r in comp.recordings]
+    names = [(r.performers, r.publisher) for r in comp.recordings]
+    index_ids = search_index.collect_ids(comp)
+    work_id, composer_id = comp.work.id, comp.work.composer_id
+    totals = catalog_stats.recording_totals(db, models.music.Recording.composition_id == composition_id)
 
     db.delete(comp)
+    catalog_stats.adjust(db, compositions=-1, recordings=-totals["recordings"], duration=-totals["duration"])
     db.commit()
+    search_index.remove_ids(index_ids)
+    media_registry.unregister(index_ids[search_index.RECORDING])
+    suggest_index.refresh_popularity(db, work_id, composer_id)
+    random_works.refresh_work(db, work_id)
+    for performers, publisher in names:
+        name_index.discard_recording(performers, publisher)
 
     _delete_physical_files(files)
+    result_cache.bump_generation()
     return True
 
 
@@ -312,14 +427,34 @@ def delete_work(db: Session, work_id: int) -> bool:
     if not work: return False
 
     files = []
+    names = []
     for comp in work.compositions:
         for rec in comp.recordings:
             files.append(rec.file_path)
+            names.append((rec.performers, rec.publisher))
+    index_ids = search_index.collect_ids(work)
+    composer_id = work.composer_id
+    totals = catalog_stats.recording_totals(
+        db, models.music.Recording.composition_id.in_([c.id for c in work.compositions])
+    )
+    deltas = dict(
+        works=-int(catalog_stats.counts_as_work(work.name_ru)), compositions=-len(work.compositions),
+        recordings=-totals["recordings"], duration=-totals["duration"]
+    )
 
     db.delete(work)
+    catalog_stats.adjust(db, **deltas)
     db.commit()
+    search_index.remove_ids(index_ids)
+    media_registry.unregister(index_ids[search_index.RECORDING])
+    suggest_index.remove(suggest_index.WORK, [work_id])
+    random_works.remove([work_id])
+    suggest_index.refresh_composer(db, composer_id)
+    for performers, publisher in names:
+        name_index.discard_recording(performers, publisher)
 
     _delete_physical_files(files)
+    result_cache.bump_generation()
     return True
 
 
@@ -335,11 +470,27 @@ def delete_composer(db: Session, composer_id: int) -> bool:
         .all()
     )
     files = [r.file_path for r in recordings]
+    names = [(r.performers, r.publisher) for r in recordings]
+    index_ids = search_index.collect_ids(composer)
+    deltas = dict(
+        composers=-1, works=-sum(catalog_stats.counts_as_work(w.name_ru) for w in composer.works),
+        compositions=-sum(len(w.compositions) for w in composer.works),
+        recordings=-len(recordings), duration=-sum(r.duration or 0 for r in recordings)
+    )
 
     db.delete(composer)
+    catalog_stats.adjust(db, **deltas)
     db.commit()
+    search_index.remove_ids(index_ids)
+    media_registry.unregister(index_ids[search_index.RECORDING])
+    suggest_index.remove(suggest_index.COMPOSER, index_ids[search_index.COMPOSER])
+    suggest_index.remove(suggest_index.WORK, index_ids[search_index.WORK])
+    random_works.remove(index_ids[search_index.WORK])
+    for performers, publisher in names:
+        name_index.discard_recording(performers, publisher)
 
     _delete_physical_files(files)
+    result_cache.bump_generation()
     return True
 
 
@@ -360,10 +511,14 @@ def update_composer(db: Session, db_obj: models.music.Composer,
     update_data = obj_in.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_obj, field, value)
+    search_text.fill(db_obj)
 
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    search_index.index_composer(db_obj, cascade=True)
+    suggest_index.refresh_composer(db, db_obj.id, with_works=True)
+    result_cache.bump_generation()
     return db_obj
 
 
@@ -374,13 +529,21 @@ def update_work(db: Session, db_obj: models.music.Work, obj_in: schemas.music.Wo
         for comp in db_obj.compositions:
             comp.is_no_catalog = True
             comp.catalog_number = None
+            search_text.fill(comp)
 
+    was_counted = catalog_stats.counts_as_work(db_obj.name_ru)
     for field, value in update_data.items():
         setattr(db_obj, field, value)
+    search_text.fill(db_obj)
 
     db.add(db_obj)
+    catalog_stats.adjust(db, works=catalog_stats.counts_as_work(db_obj.name_ru) - was_counted)
     db.commit()
     db.refresh(db_obj)
+    search_index.index_work(db_obj, cascade=True)
+    suggest_index.refresh_work(db, db_obj.id)
+    random_works.refresh_work(db, db_obj.id)
+    result_cache.bump_generation()
     return db_obj
 
 
@@ -389,20 +552,29 @@ def update_composition(db: Session, db_obj: models.music.Composition,
     update_data = obj_in.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_obj, field, value)
+    search_text.fill(db_obj)
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    search_index.index_composition(db_obj, cascade=True)
+    result_cache.bump_generation()
     return db_obj
 
 
 def update_recording(db: Session, db_obj: models.music.Recording,
                      obj_in: schemas.music.RecordingUpdate) -> models.music.Recording:
+    old_names = (db_obj.performers, db_obj.publisher)
     update_data = obj_in.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_obj, field, value)
+    search_text.fill(db_obj)
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    search_index.index_recording(db_obj)
+    name_index.discard_recording(*old_names)
+    name_index.add_recording(db_obj.performers, db_obj.publisher)
+    result_cache.bump_generation()
     return db_obj
 
 
@@ -416,8 +588,10 @@ def update_composer_portrait(db: Session, composer_id: int, url: str):
         delete_file_by_url(comp.portrait_url)
 
     comp.portrait_url = url
+    comp.portrait_lqip = image_variants.lqip_for_url(url)
     db.commit()
     db.refresh(comp)
+    result_cache.bump_generation()
     return comp
 
 
@@ -431,15 +605,18 @@ def update_work_cover(db: Session, work_id: int, url: str):
         delete_file_by_url(old_work_url)
 
     work.cover_art_url = url
+    work.cover_art_lqip = image_variants.lqip_for_url(url)
 
     for comp in work.compositions:
         if comp.cover_art_url and comp.cover_art_url != old_work_url:
             delete_file_by_url(comp.cover_art_url)
 
         comp.cover_art_url = url
+        comp.cover_art_lqip = work.cover_art_lqip
 
     db.commit()
     db.refresh(work)
+    result_cache.bump_generation()
     return work
 
 
@@ -452,8 +629,10 @@ def update_composition_cover(db: Session, comp_id: int, url: str):
         delete_file_by_url(comp.cover_art_url)
 
     comp.cover_art_url = url
+    comp.cover_art_lqip = image_variants.lqip_for_url(url)
     db.commit()
     db.refresh(comp)
+    result_cache.bump_generation()
     return comp
 
 
@@ -468,4 +647,5 @@ def reorder_compositions(db: Session, work_id: int, new_order_ids: List[int]):
             comp_map[comp_id].sort_order = index + 1
 
     db.commit()
+    result_cache.bump_generation()
     return True
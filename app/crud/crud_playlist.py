@@ -6,6 +6,7 @@ from app.schemas.playlist import PlaylistCreate
 from app.db.base import PlaylistRecording
 
 from app.utils import delete_file_by_url
+from app.services import image_variants
 
 def get_playlist(db: Session, playlist_id: int) -> Optional[playlist.Playlist]:
     return db.query(playlist.Playlist).filter(playlist.Playlist.id == playlist_id).first()
@@ -137,4 +138,18 @@ def clone_playlist(db: Session, original_playlist_id: int, new_owner_id: int) ->
         db.add(new_assoc)
 
     db.commit()
-    return new_playlist
\ No newline at end of file
+    return new_playlist
+
+def update_cover(db: Session, playlist_id: int, url: str) -> Optional[playlist.Playlist]:
+    db_playlist = get_playlist(db, playlist_id)
+    if not db_playlist:
+        return None
+
+    if db_playlist.cover_image_url:
+        delete_file_by_url(db_playlist.cover_image_url)
+
+    db_playlist.cover_image_url = url
+    db_playlist.cover_image_lqip = image_variants.lqip_for_url(url)
+    db.commit()
+    db.refresh(db_playlist)
+    return db_playlist
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdateProfile
 from app.security import get_password_hash
+from app.utils import delete_file_by_url
 
 
 def get_user_by_email(db: Session, email: str) -> User | None:
@@ -32,4 +33,18 @@ def update_user(db: Session, db_obj: User, obj_in: UserUpdateProfile) -> User:
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
-    return db_obj
\ No newline at end of file
+    return db_obj
+
+
+def update_avatar(db: Session, user_id: int, url: str) -> User | None:
+    db_user = db.query(User).filter(User.id == user_id).first()
+    if not db_user:
+        return None
+
+    if db_user.avatar_url:
+        delete_file_by_url(db_user.avatar_url)
+
+    db_user.avatar_url = url
+    db.commit()
+    db.refresh(db_user)
+    return db_user
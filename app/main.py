@@ -5,7 +5,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 from app.api.endpoints import scores
 
-from app.api.endpoints import auth, recordings, playlists, users, dashboard, search, genres, blog, feedback
+from app.api.endpoints import auth, recordings, playlists, users, dashboard, search, genres, blog, feedback, jobs, images
+from app.db.session import SessionLocal
+from app.services import search_index, search_text, suggest_index, media_registry, random_works
+from app.services import jobs as job_queue, scrubber, image_resize, image_uploads, dashboard_cache
+from app.core.config import SCRUB_INTERVAL_HOURS, DASHBOARD_REFRESH_SECONDS
 
 ROOT_DIR = Path(__file__).resolve().parent
 
@@ -20,6 +24,57 @@ app.add_middleware(
     allow_methods=["*"], allow_headers=["*"],
 )
 
+
+@app.on_event("startup")
+def build_search_index():
+    # Индекс поиска строится один раз, дальше обновляется из crud_music.
+    # Строки без search_text (добавленные до миграции) дозаполняются здесь.
+    db = SessionLocal()
+    try:
+        search_text.backfill(db, only_missing=True)
+        search_index.build(db)
+        suggest_index.build(db)
+        random_works.build(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def load_media_registry():
+    # Пути к файлам для /stream держим в памяти, чтобы стриминг не ходил в БД
+    db = SessionLocal()
+    try:
+        media_registry.build(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def start_dashboard_refresh():
+    # Первый запрос собирает ответ главной сам, фон только обновляет "В центре внимания"
+    dashboard_cache.start_schedule(DASHBOARD_REFRESH_SECONDS)
+
+
+@app.on_event("startup")
+def recover_jobs():
+    # Задачи прошлого процесса уже никто не выполнит: помечаем их как failed
+    # (у картинок в колонках остались прежние URL), временные загрузки удаляем
+    db = SessionLocal()
+    try:
+        job_queue.fail_interrupted(db)
+    finally:
+        db.close()
+    image_uploads.remove_stale_incoming()
+    if SCRUB_INTERVAL_HOURS > 0:
+        scrubber.start_schedule(SCRUB_INTERVAL_HOURS)
+
+
+@app.on_event("shutdown")
+def stop_jobs():
+    job_queue.shutdown()
+    image_resize.shutdown()
+
+
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(recordings.router, prefix="/api/recordings", tags=["Recordings"])
 app.include_router(playlists.router, prefix="/api/playlists", tags=["Playlists"])
@@ -30,6 +85,8 @@ app.include_router(genres.router, prefix="/api/genres", tags=["Genres"])
 app.include_router(blog.router, prefix="/api/blog", tags=["Blog"])
 app.include_router(feedback.router, prefix="/api/feedback", tags=["Feedback"])
 app.include_router(scores.router, prefix="/api/scores", tags=["Scores"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(images.router, prefix="/api/img", tags=["Images"])
 
 STATIC_DIR = ROOT_DIR.parent / "static"
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
@@ -3,4 +3,7 @@ from .music import Composition, Work, Composer, Genre
 from .playlist import Playlist
 from .blog import Post, Tag
 from .feedback import FeedbackMessage
-from .score import Score
\ No newline at end of file
+from .score import Score
+from .job import Job
+from .scan import ScanManifestEntry
+from .stats import CatalogStats
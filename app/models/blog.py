@@ -30,6 +30,7 @@ class Post(Base):
     meta_description = Column(String, nullable=True)
     meta_keywords = Column(String, nullable=True)
     cover_image_url = Column(String, nullable=True)
+    cover_image_lqip = Column(String, nullable=True)  # 16px WebP data URI для первой отрисовки (см. image_variants.lqip)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    tags = relationship("Tag", secondary=post_tags_association, back_populates="posts")
\ No newline at end of file
+    tags = relationship("Tag", secondary=post_tags_association, back_populates="posts")
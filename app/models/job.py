@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Text, Float, func
+from sqlalchemy.sql.sqltypes import DateTime
+from app.db.base import Base
+
+
+class Job(Base):
+    """Фоновая задача (обработка загрузки и т.п.), см. app.services.jobs"""
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)  # uuid4 hex
+    kind = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued | running | done | failed
+    progress = Column(Float, nullable=False, default=0.0)  # 0..1
+    message = Column(String, nullable=True)
+    payload = Column(Text, nullable=True)  # JSON
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean, select, func, Float, case, and_
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean, select, func, Float, case, and_, Index
 from sqlalchemy.orm import relationship, column_property
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -22,10 +22,14 @@ class Composer(Base):
     year_born = Column(Integer, nullable=True)
     year_died = Column(Integer, nullable=True)
     portrait_url = Column(String, nullable=True)
+    portrait_lqip = Column(String, nullable=True)  # 16px WebP data URI для первой отрисовки (см. image_variants.lqip)
     notes = Column(Text, nullable=True)
     place_of_birth = Column(String, nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    # Нормализованный текст для поиска (заполняется в crud_music)
+    search_text = Column(Text, nullable=True)
+    search_text_compact = Column(Text, nullable=True)
     works = relationship("Work", back_populates="composer", cascade="all, delete-orphan")
 
     @hybrid_property
@@ -75,6 +79,10 @@ class Composer(Base):
 
 class Work(Base):
     __tablename__ = "works"
+    __table_args__ = (
+        # Проверка дубликатов читает search_text прямо из индекса по composer_id
+        Index("ix_works_composer_id_search_text", "composer_id", "search_text"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     slug = Column(String, unique=True, index=True, nullable=True)
     name = Column(String, index=True, nullable=True)
@@ -90,6 +98,9 @@ class Work(Base):
     publication_year_end = Column(Integer, nullable=True)
     notes = Column(Text, nullable=True)
     cover_art_url = Column(String, nullable=True)
+    cover_art_lqip = Column(String, nullable=True)  # 16px WebP data URI для первой отрисовки (см. image_variants.lqip)
+    search_text = Column(Text, nullable=True)
+    search_text_compact = Column(Text, nullable=True)
     composer_id = Column(Integer, ForeignKey("composers.id"), nullable=False)
     composer = relationship("Composer", back_populates="works")
     compositions = relationship("Composition", back_populates="work", cascade="all, delete-orphan")
@@ -113,6 +124,8 @@ class Recording(Base):
     source_text = Column(String, nullable=True)
     source_url = Column(String, nullable=True)
     lead_performer = Column(String, nullable=True)
+    search_text = Column(Text, nullable=True)
+    search_text_compact = Column(Text, nullable=True)
     composition = relationship("Composition", back_populates="recordings")
 
     playlist_associations = relationship(
@@ -131,6 +144,9 @@ class Recording(Base):
 
 class Composition(Base):
     __tablename__ = "compositions"
+    __table_args__ = (
+        Index("ix_compositions_work_id_search_text", "work_id", "search_text"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     slug = Column(String, unique=True, index=True, nullable=True)
 
@@ -159,7 +175,10 @@ class Composition(Base):
     composition_year = Column(Integer, nullable=True)
     notes = Column(Text, nullable=True)
     cover_art_url = Column(String, nullable=True)
+    cover_art_lqip = Column(String, nullable=True)  # 16px WebP data URI для первой отрисовки (см. image_variants.lqip)
+    search_text = Column(Text, nullable=True)
+    search_text_compact = Column(Text, nullable=True)
     work_id = Column(Integer, ForeignKey("works.id"), nullable=False)
     work = relationship("Work", back_populates="compositions")
     recordings = relationship("Recording", back_populates="composition", cascade="all, delete-orphan")
-    scores = relationship("Score", back_populates="composition", cascade="all, delete-orphan")
\ No newline at end of file
+    scores = relationship("Score", back_populates="composition", cascade="all, delete-orphan")
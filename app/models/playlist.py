@@ -10,6 +10,7 @@ class Playlist(Base):
     name = Column(String, index=True, nullable=False)
     description = Column(Text, nullable=True)
     cover_image_url = Column(String, nullable=True)
+    cover_image_lqip = Column(String, nullable=True)  # 16px WebP data URI для первой отрисовки (см. image_variants.lqip)
     is_system = Column(Boolean, default=False, index=True)
     is_from_collection = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -23,4 +24,4 @@ class Playlist(Base):
         order_by="PlaylistRecording.recording_order"
     )
 
-    recordings = association_proxy("recording_associations", "recording")
\ No newline at end of file
+    recordings = association_proxy("recording_associations", "recording")
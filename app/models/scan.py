@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Integer, BigInteger, func
+from sqlalchemy.sql.sqltypes import DateTime
+from app.db.base import Base
+
+
+class ScanManifestEntry(Base):
+    """Файл, увиденный сканером библиотеки (python -m app.tools.scan)"""
+    __tablename__ = "scan_manifest"
+
+    path = Column(String, primary_key=True)  # абсолютный путь
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    file_hash = Column(String, nullable=False, index=True)
+    recording_id = Column(Integer, nullable=True)
+    scanned_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, BigInteger
+from app.db.base import Base
+
+
+class CatalogStats(Base):
+    """
+    Счетчики каталога для главной страницы (одна строка, id = 1).
+    Обновляются в тех же транзакциях, что и каталог (app.services.catalog_stats),
+    пересчитываются python -m app.tools.rebuild_catalog_stats.
+    """
+    __tablename__ = "catalog_stats"
+
+    id = Column(Integer, primary_key=True)
+    recordings = Column(Integer, nullable=False, default=0)
+    compositions = Column(Integer, nullable=False, default=0)
+    works = Column(Integer, nullable=False, default=0)  # без служебных "Без сборника"
+    composers = Column(Integer, nullable=False, default=0)
+    duration = Column(BigInteger, nullable=False, default=0)  # сумма длительностей записей, сек
@@ -20,4 +20,4 @@ class User(Base):
         "Recording",
         secondary=recording_favorites_association,
         back_populates="favorited_by"
-    )
\ No newline at end of file
+    )
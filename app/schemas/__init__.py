@@ -10,6 +10,7 @@ from .playlist import Playlist, PlaylistCreate, PlaylistUpdate
 from .token import Token, TokenData
 from .dashboard import DashboardSummary, DashboardStats
 from . import search
+from . import job
 from .blog import Post, PostCreate, PostUpdate, Tag, TagCreate, TagBase
 from .feedback import Feedback, FeedbackCreate
 from .score import Score, ScoreCreate, ScoreUpdate
\ No newline at end of file
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+from .image import srcset_from
 
 class TagBase(BaseModel):
     name: str
@@ -34,6 +35,8 @@ class PostUpdate(BaseModel):
 class Post(PostBase):
     id: int
     cover_image_url: Optional[str] = None
+    cover_image_srcset = srcset_from("cover_image_url")
+    cover_image_lqip: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     tags: List[Tag] = []
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from .playlist import Playlist
+from .image import srcset_from
 
 class DashComposer(BaseModel):
     id: int
@@ -8,6 +9,8 @@ class DashComposer(BaseModel):
     name: Optional[str] = None
     name_ru: Optional[str] = None
     portrait_url: Optional[str] = None
+    portrait_srcset = srcset_from("portrait_url")
+    portrait_lqip: Optional[str] = None
     class Config:
         from_attributes = True
 
@@ -17,6 +20,8 @@ class DashWork(BaseModel):
     name: Optional[str] = None
     name_ru: Optional[str] = None
     cover_art_url: Optional[str] = None
+    cover_art_srcset = srcset_from("cover_art_url")
+    cover_art_lqip: Optional[str] = None
     publication_year: Optional[int] = None
     publication_year_end: Optional[int] = None
     composer: DashComposer
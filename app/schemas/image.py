@@ -0,0 +1,21 @@
+from typing import Optional
+
+from pydantic import BaseModel, computed_field
+
+from app.services import image_variants
+
+
+class ImageSrcset(BaseModel):
+    """Оригинал и строки srcset уменьшенных копий (см. app.services.image_variants)."""
+    src: str
+    jpeg: str
+    webp: str
+
+
+def srcset_from(url_field: str):
+    """Вычисляемое поле схемы: ImageSrcset картинки из поля url_field (None, если копий нет)."""
+    def srcset(self) -> Optional[ImageSrcset]:
+        value = image_variants.srcset(getattr(self, url_field))
+        return ImageSrcset(**value) if value else None
+
+    return computed_field(property(srcset), return_type=Optional[ImageSrcset])
@@ -1,6 +1,7 @@
 from typing import List, Optional
 from pydantic import BaseModel
 from .score import Score
+from .image import srcset_from
 
 class GenreBase(BaseModel):
     name: str
@@ -18,6 +19,15 @@ class GenreTypoCheck(BaseModel):
     similar: Optional[str] = None
 
 
+class NameCheck(BaseModel):
+    name: str
+
+
+class NameTypoCheck(BaseModel):
+    similar: Optional[str] = None
+    candidates: List[str] = []
+
+
 class ComposerBase(BaseModel):
     name: Optional[str] = None
     name_ru: Optional[str] = None
@@ -96,6 +106,18 @@ class RecordingCreate(RecordingBase):
     performers: Optional[str] = None
 
 
+class ResumableUploadCreate(RecordingCreate):
+    filename: str
+    length: int  # полный размер файла в байтах
+    extract_tags: bool = False  # заполнить пустые поля и обложку из тегов файла
+
+
+class ResumableUploadStatus(BaseModel):
+    id: str
+    offset: int
+    length: int
+
+
 class ComposerUpdate(ComposerBase):
     pass
 
@@ -158,6 +180,8 @@ class ComposerSimple(ComposerBase):
     id: int
     slug: Optional[str] = None
     portrait_url: Optional[str] = None
+    portrait_srcset = srcset_from("portrait_url")
+    portrait_lqip: Optional[str] = None
     epoch: str
     class Config:
         from_attributes = True
@@ -195,6 +219,8 @@ class WorkWithComposer(WorkBase):
     slug: Optional[str] = None
     composer_id: int
     cover_art_url: Optional[str] = None
+    cover_art_srcset = srcset_from("cover_art_url")
+    cover_art_lqip: Optional[str] = None
     composer: ComposerSimple
     genre: Optional[Genre] = None
     class Config:
@@ -205,6 +231,8 @@ class Composer(ComposerBase):
     id: int
     slug: Optional[str] = None
     portrait_url: Optional[str] = None
+    portrait_srcset = srcset_from("portrait_url")
+    portrait_lqip: Optional[str] = None
     epoch: str
 
     class Config:
@@ -216,6 +244,8 @@ class Work(WorkBase):
     slug: Optional[str] = None
     composer_id: int
     cover_art_url: Optional[str] = None
+    cover_art_srcset = srcset_from("cover_art_url")
+    cover_art_lqip: Optional[str] = None
     composer: Composer
     compositions: List[CompositionSimple] = []
     genre: Optional[Genre] = None
@@ -230,6 +260,8 @@ class Composition(CompositionBase):
     slug: Optional[str] = None
     work_id: int
     cover_art_url: Optional[str] = None
+    cover_art_srcset = srcset_from("cover_art_url")
+    cover_art_lqip: Optional[str] = None
     work: Work
     scores: List[Score] = []
 
@@ -290,6 +322,8 @@ class WorkLibraryItem(WorkBase):
     id: int
     slug: Optional[str] = None
     cover_art_url: Optional[str] = None
+    cover_art_srcset = srcset_from("cover_art_url")
+    cover_art_lqip: Optional[str] = None
     composer: ComposerSimple
     recordings: List[RecordingForLibrary] = []
     genre: Optional[Genre] = None
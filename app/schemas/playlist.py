@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from .music import Recording
+from .image import srcset_from
 
 class PlaylistBase(BaseModel):
     name: str
@@ -20,6 +21,8 @@ class Playlist(PlaylistBase):
     is_system: Optional[bool] = False
     is_from_collection: bool = False
     cover_image_url: Optional[str] = None
+    cover_image_srcset = srcset_from("cover_image_url")
+    cover_image_lqip: Optional[str] = None
     recordings: List[Recording] = []
 
     class Config:
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import List
-from .music import Composer, WorkWithComposer, Recording, Composition
+from typing import List, Optional
+from .music import Composer, WorkWithComposer, Recording, Composition, WorkSimple
 
 
 class SearchResults(BaseModel):
@@ -11,4 +11,32 @@ class SearchResults(BaseModel):
     recordings: List[Recording] = []
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class SuggestItem(BaseModel):
+    kind: str  # "composer" | "work"
+    id: int
+    slug: Optional[str] = None
+    title: str
+    subtitle: Optional[str] = None
+    popularity: int = 0
+
+    class Config:
+        from_attributes = True
+
+
+class DuplicateCheckBulk(BaseModel):
+    entity_type: str  # composer | work | composition
+    names: List[str]
+    composer_id: Optional[int] = None
+    work_id: Optional[int] = None
+
+
+class DuplicateMatch(WorkSimple):
+    score: int  # partial_ratio лучшего из названий, 85..100
+
+
+class DuplicateCheckResult(BaseModel):
+    query: str
+    matches: List[DuplicateMatch] = []
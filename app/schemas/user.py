@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime
+from .image import srcset_from
 
 class UserStats(BaseModel):
     favorites_count: int
@@ -10,6 +11,7 @@ class UserAccount(BaseModel):
     email: EmailStr
     display_name: Optional[str] = None
     avatar_url: Optional[str] = None
+    avatar_srcset = srcset_from("avatar_url")
     is_admin: bool
     created_at: datetime
     stats: UserStats
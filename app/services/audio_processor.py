@@ -1,53 +1,106 @@
-import shutil
+import os
+import uuid
 from pathlib import Path
+from typing import Optional, Tuple
 from fastapi import UploadFile
 from mutagen import File as MutagenFile
-from sqlalchemy.orm import Session
 import hashlib
 
-from app.schemas.music import RecordingCreate
-from app import crud
+from app.services import audio_tags, jobs, storage
 
-MUSIC_DIR = Path("static/music")
+MUSIC_DIR = storage.MUSIC_DIR
 COVERS_DIR = Path("static/covers/recordings")
 WORKS_COVERS_DIR = Path("static/covers/works")
-MUSIC_DIR.mkdir(parents=True, exist_ok=True)
 COVERS_DIR.mkdir(parents=True, exist_ok=True)
 WORKS_COVERS_DIR.mkdir(parents=True, exist_ok=True)
 
 
+HASH_CHUNK_SIZE = 1024 * 1024
+# Временные файлы лежат внутри MUSIC_DIR (та же файловая система),
+# поэтому перенос в библиотеку — атомарный os.replace без копирования
+INCOMING_DIR = MUSIC_DIR / ".incoming"
+INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+
+
 def calculate_file_hash(file_path: Path) -> str:
     sha256_hash = hashlib.sha256()
     with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
+        for byte_block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
             sha256_hash.update(byte_block)
     return sha256_hash.hexdigest()
 
 
-def save_and_process_audio(db: Session, upload_file: UploadFile):
+def new_incoming_path(filename: Optional[str]) -> Path:
+    """Уникальный временный путь для одной загрузки (имя клиента не используется)."""
+    ext = Path(filename or "").suffix.lower() or ".mp3"
+    return INCOMING_DIR / f"{uuid.uuid4().hex}{ext}"
+
+
+def receive_upload(upload_file: UploadFile) -> Tuple[Path, str]:
     """
-    Сохраняет аудиофайл, извлекает ТОЛЬКО длительность и хэш.
-    Метаданные полностью игнорируются.
+    Один проход по загруженному файлу: запись во временный файл большими
+    блоками с одновременным подсчетом SHA-256.
+    Возвращает (временный путь, хэш). При ошибке временный файл удаляется.
     """
-    temp_dir = Path("temp_uploads")
-    temp_dir.mkdir(exist_ok=True)
-    temp_path = temp_dir / upload_file.filename
-
+    temp_path = new_incoming_path(upload_file.filename)
+    sha256_hash = hashlib.sha256()
     try:
         with temp_path.open("wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+            for chunk in iter(lambda: upload_file.file.read(HASH_CHUNK_SIZE), b""):
+                sha256_hash.update(chunk)
+                buffer.write(chunk)
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        upload_file.file.close()
+    return temp_path, sha256_hash.hexdigest()
 
-        file_hash = calculate_file_hash(temp_path)
 
-        duration = 0
-        try:
-            audio = MutagenFile(temp_path)
-            if audio:
-                duration = int(audio.info.length)
-        except Exception as e:
-            print(f"[ERROR] Could not read duration for {upload_file.filename}: {e}")
+def read_duration(path: Path) -> int:
+    """Длительность в секундах (mutagen читает только заголовки), 0 если не удалось."""
+    try:
+        audio = MutagenFile(path)
+        # У файла без тегов объект пустой (ложный), но info с длительностью есть
+        if audio is not None:
+            return int(audio.info.length)
+    except Exception as e:
+        print(f"[ERROR] Could not read duration for {path.name}: {e}")
+    return 0
 
-        return temp_path, duration, file_hash
 
-    finally:
-        upload_file.file.close()
\ No newline at end of file
+def move_into_library(temp_path: Path, recording_id: int, file_hash: str) -> Path:
+    """Атомарно переносит временный файл на постоянное место (см. app.services.storage)."""
+    return storage.get_storage().store(temp_path, recording_id, file_hash)
+
+
+def copy_into_library(src: Path, recording_id: int, file_hash: str) -> Path:
+    """
+    Копирует внешний файл (например, со сканируемого диска) на постоянное место
+    через временный файл, так что в библиотеке не бывает недописанных файлов.
+    Жесткая ссылка не используется: правка исходника изменила бы файл записи.
+    """
+    return storage.get_storage().store(src, recording_id, file_hash, move=False)
+
+
+def probe_file(path: str, file_hash: Optional[str] = None) -> dict:
+    """Хэш (если не передан), длительность, теги и наличие обложки (см. audio_tags.extract)."""
+    path = Path(path)
+    file_hash = file_hash or calculate_file_hash(path)
+    meta = audio_tags.extract(path, file_hash)
+    return {"file_hash": file_hash, "duration": read_duration(path), **meta}
+
+
+def probe_audio(job_id: str, payload: dict) -> dict:
+    """
+    Тяжелая часть обработки загрузки (выполняется в пуле задач, см. app.services.jobs):
+    хэш (если не посчитан при приеме), длительность, теги и встроенная обложка.
+    """
+    path = Path(payload["temp_path"])
+    file_hash = payload.get("file_hash")
+    if not file_hash:
+        jobs.report_progress(job_id, 0.1, "hashing")
+        file_hash = calculate_file_hash(path)
+
+    jobs.report_progress(job_id, 0.5, "reading tags")
+    return probe_file(path, file_hash)
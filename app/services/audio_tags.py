@@ -0,0 +1,239 @@
+"""
+Чтение тегов и встроенных обложек аудиофайлов (ID3, Vorbis/FLAC, MP4) через mutagen.
+
+Теги приводятся к общим ключам (artist, performer, conductor, date, label,
+tracknumber, ...) и превращаются в предлагаемые значения полей RecordingCreate.
+Результат кэшируется на диске по file_hash (TAGS_CACHE_DIR/ab/<hash>.json,
+картинка рядом — <hash>.cover), поэтому повторная обработка того же файла
+(повторный импорт, скан после переименования) не открывает его снова.
+Кэш — обычные файлы, им одинаково пользуются процессы пула и веб-процесс.
+Записи файлов, которых нет в библиотеке (запись удалена, импорт отклонил файл
+как дубликат), удаляет проверка хранилища (app.services.scrubber, prune_cache).
+"""
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Collection, Optional
+
+from mutagen import File as MutagenFile
+
+TAGS_CACHE_DIR = Path("data/tag_cache")
+# Меняется при изменении набора читаемых тегов: старые записи кэша перечитываются
+TAGS_CACHE_VERSION = 2
+
+# Общий ключ -> ключи Vorbis-комментариев / easy-интерфейса mutagen (EasyMP4), по приоритету
+TAG_KEYS = {
+    "title": ("title",),
+    "artist": ("artist",),
+    "albumartist": ("albumartist",),
+    "performer": ("performer",),
+    "conductor": ("conductor",),
+    "date": ("date", "originaldate", "year"),
+    "label": ("organization", "label", "publisher"),
+    "tracknumber": ("tracknumber",),
+    "tracktotal": ("tracktotal", "totaltracks"),
+    "discnumber": ("discnumber",),
+}
+
+# То же для ID3 (MP3, а также WAV/AIFF с ID3-чанком)
+ID3_FRAMES = {
+    "title": ("TIT2",),
+    "artist": ("TPE1",),
+    "albumartist": ("TPE2",),
+    "conductor": ("TPE3",),
+    "date": ("TDRC", "TDOR", "TYER"),
+    "label": ("TPUB",),
+    "tracknumber": ("TRCK",),
+    "discnumber": ("TPOS",),
+}
+
+
+def _first(values) -> Optional[str]:
+    if not values:
+        return None
+    value = str(values[0]).strip()
+    return value or None
+
+
+def _collect(lookup, mapping: dict) -> dict:
+    tags = {}
+    for name, keys in mapping.items():
+        for key in keys:
+            try:
+                value = _first(lookup(key))
+            except (KeyError, ValueError):
+                value = None
+            if value:
+                tags[name] = value
+                break
+    return tags
+
+
+def _id3_tags(id3) -> dict:
+    tags = _collect(lambda frame_id: [f.text[0] for f in id3.getall(frame_id) if f.text], ID3_FRAMES)
+    # Солист: список музыкантов TMCL (пары роль/имя) или TXXX:PERFORMER
+    for frame in id3.getall("TMCL"):
+        if frame.people:
+            tags.setdefault("performer", frame.people[0][1])
+    for frame in id3.getall("TXXX:PERFORMER"):
+        tags.setdefault("performer", _first(frame.text))
+    return {k: v for k, v in tags.items() if v}
+
+
+def _open(path: Path):
+    try:
+        return MutagenFile(path)
+    except Exception as e:
+        print(f"[ERROR] Could not read tags for {Path(path).name}: {e}")
+        return None
+
+
+def read_tags(path: Path, audio=None) -> dict:
+    """Нормализованные текстовые теги (первое значение каждого); пустой словарь, если тегов нет."""
+    audio = audio if audio is not None else _open(path)
+    if audio is None or not audio.tags:
+        return {}
+    if hasattr(audio.tags, "getall"):
+        return _id3_tags(audio.tags)
+    if not hasattr(audio.tags, "as_dict"):
+        # Не Vorbis-комментарии (MP4-атомы и т.п.): имена переводит easy-интерфейс
+        try:
+            audio = MutagenFile(path, easy=True)
+        except Exception:
+            return {}
+        if audio is None or not audio.tags:
+            return {}
+    return _collect(audio.tags.get, TAG_KEYS)
+
+
+def read_picture(path: Path, audio=None) -> Optional[bytes]:
+    """Первая встроенная картинка (FLAC/Vorbis picture, ID3 APIC, MP4 covr) или None."""
+    audio = audio if audio is not None else _open(path)
+    if audio is None:
+        return None
+    if getattr(audio, "pictures", None):
+        return audio.pictures[0].data
+    if audio.tags is None:
+        return None
+    if hasattr(audio.tags, "getall"):
+        frames = audio.tags.getall("APIC")
+        return frames[0].data if frames else None
+    if "covr" in audio.tags and audio.tags["covr"]:
+        return bytes(audio.tags["covr"][0])
+    return None
+
+
+def _leading_number(value: Optional[str]) -> Optional[int]:
+    match = re.match(r"\s*(\d+)", value or "")
+    return int(match.group(1)) if match else None
+
+
+def track_number(tags: Optional[dict]) -> Optional[int]:
+    """'3/12' -> 3."""
+    return _leading_number((tags or {}).get("tracknumber"))
+
+
+def track_total(tags: Optional[dict]) -> Optional[int]:
+    """Число треков на диске: '3/12' -> 12 или отдельный тег tracktotal."""
+    tags = tags or {}
+    match = re.match(r"\s*\d+\s*/\s*(\d+)", tags.get("tracknumber", ""))
+    return int(match.group(1)) if match else _leading_number(tags.get("tracktotal"))
+
+
+def disc_number(tags: Optional[dict]) -> int:
+    """'2/3' -> 2; без тега — первый диск."""
+    return _leading_number((tags or {}).get("discnumber")) or 1
+
+
+def propose(tags: Optional[dict]) -> dict:
+    """Предлагаемые значения полей RecordingCreate (только найденные в тегах)."""
+    tags = tags or {}
+    proposed = {}
+    performers = tags.get("albumartist") or tags.get("artist")
+    if performers:
+        proposed["performers"] = performers
+    if tags.get("performer") and tags.get("performer") != performers:
+        proposed["lead_performer"] = tags["performer"]
+    if tags.get("conductor"):
+        proposed["conductor"] = tags["conductor"]
+    year = re.match(r"\s*(\d{4})", tags.get("date", ""))
+    if year:
+        proposed["recording_year"] = int(year.group(1))
+    if tags.get("label"):
+        proposed["publisher"] = tags["label"]
+    return proposed
+
+
+def fill_missing(values: dict, proposed: dict) -> dict:
+    """Значения из тегов только для пустых полей: введенное админом не перезаписывается."""
+    merged = dict(values)
+    for key, value in proposed.items():
+        if merged.get(key) in (None, ""):
+            merged[key] = value
+    return merged
+
+
+# --- Кэш по file_hash ---
+
+def _cache_base(file_hash: str) -> Path:
+    return TAGS_CACHE_DIR / file_hash[:2] / file_hash
+
+
+def cover_path(file_hash: str) -> Path:
+    return _cache_base(file_hash).with_suffix(".cover")
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{uuid.uuid4().hex}")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+def prune_cache(keep: Collection[str], min_age_seconds: float = 0) -> int:
+    """
+    Удаляет записи кэша (json и обложку), чьего хэша нет в keep и которые старше
+    min_age_seconds (свежие нужны идущему импорту). Возвращает число удаленных файлов.
+    """
+    if not TAGS_CACHE_DIR.is_dir():
+        return 0
+    deadline = time.time() - min_age_seconds
+    removed = 0
+    for path in TAGS_CACHE_DIR.glob("*/*"):
+        # Временные файлы _write_atomic (.<uuid>) — тоже, если брошены
+        file_hash = path.stem if not path.name.startswith(".") else None
+        if file_hash in keep:
+            continue
+        try:
+            if path.stat().st_mtime > deadline:
+                continue
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        removed += 1
+    return removed
+
+
+def extract(path: Path, file_hash: str) -> dict:
+    """
+    Теги и наличие обложки для файла с данным хэшем; из кэша, если файл уже
+    разбирался. Картинка (если есть) лежит в cover_path(file_hash).
+    """
+    meta_path = _cache_base(file_hash).with_suffix(".json")
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") == TAGS_CACHE_VERSION:
+            return meta
+    except (FileNotFoundError, ValueError):
+        pass
+
+    audio = _open(path)
+    picture = read_picture(path, audio)
+    if picture:
+        _write_atomic(cover_path(file_hash), picture)
+    meta = {"tags": read_tags(path, audio), "has_cover": bool(picture), "version": TAGS_CACHE_VERSION}
+    _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+    return meta
@@ -0,0 +1,310 @@
+"""
+Пакетный импорт аудио для произведения (альбом, опера): много файлов или один ZIP.
+
+Файлы принимаются во INCOMING_DIR (SHA-256 считается при записи), затем задача
+bulk_import раздает их пробу (длительность, теги) в пул процессов очереди задач,
+сопоставляет с частями произведения (по порядку имен файлов или по номерам
+диска и трека из тегов) и создает все записи одной транзакцией. С extract_tags
+пустые поля каждой записи заполняются из ее тегов, а встроенная обложка
+становится обложкой произведения, если у него и его частей обложек нет.
+Результат задачи — отчет по каждому файлу.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas, utils
+from app.services import audio_processor, audio_tags, jobs, media_registry
+
+BULK_IMPORT = "bulk_import"
+MAX_IMPORT_BYTES = 8 * 1024 ** 3
+
+AUTO = "auto"
+ORDER = "order"
+TRACK = "track"
+
+# Статусы файлов в отчете
+CREATED = "created"
+DUPLICATE = "duplicate"
+UNMATCHED = "unmatched"
+SKIPPED = "skipped"
+ERROR = "error"
+
+
+def _is_audio(filename: str, content_type: Optional[str] = None) -> bool:
+    content_type = content_type or mimetypes.guess_type(filename)[0]
+    return bool(content_type) and content_type.startswith("audio/")
+
+
+def _is_zip(upload_file: UploadFile) -> bool:
+    return (upload_file.content_type in ("application/zip", "application/x-zip-compressed")
+            or (upload_file.filename or "").lower().endswith(".zip"))
+
+
+def _extract_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> dict:
+    name = PurePosixPath(info.filename).name
+    temp_path = audio_processor.new_incoming_path(name)
+    sha256_hash = hashlib.sha256()
+    with archive.open(info) as src, temp_path.open("wb") as dst:
+        for chunk in iter(lambda: src.read(audio_processor.HASH_CHUNK_SIZE), b""):
+            sha256_hash.update(chunk)
+            dst.write(chunk)
+    return {"name": name, "temp_path": str(temp_path), "file_hash": sha256_hash.hexdigest()}
+
+
+def _upload_size(upload_file: UploadFile) -> int:
+    if upload_file.size is not None:
+        return upload_file.size
+    position = upload_file.file.tell()
+    size = upload_file.file.seek(0, os.SEEK_END)
+    upload_file.file.seek(position)
+    return size
+
+
+def _receive_zip(upload_file: UploadFile, budget: int) -> Tuple[List[dict], int]:
+    """Распаковывает архив, если распакованное умещается в budget байт; возвращает (entries, размер)."""
+    entries = []
+    size = 0
+    try:
+        with zipfile.ZipFile(upload_file.file) as archive:
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+                and not PurePosixPath(info.filename).name.startswith(".")
+            ]
+            size = sum(info.file_size for info in members)
+            if size > budget:
+                raise ValueError("Import is too large")
+            for info in members:
+                name = PurePosixPath(info.filename).name
+                if not _is_audio(name):
+                    entries.append({"name": name, "status": SKIPPED, "detail": "Not an audio file"})
+                    continue
+                entries.append(_extract_member(archive, info))
+    except zipfile.BadZipFile:
+        entries.append({"name": upload_file.filename, "status": ERROR, "detail": "Invalid ZIP archive"})
+    finally:
+        upload_file.file.close()
+    return entries, size
+
+
+def receive_files(files: List[UploadFile]) -> List[dict]:
+    """
+    Сохраняет загруженные файлы (ZIP распаковывается) во INCOMING_DIR.
+    Возвращает по записи на файл: name, temp_path, file_hash или status/detail,
+    если файл пропущен. При ошибке уже сохраненные временные файлы удаляются.
+    ValueError, если все файлы вместе (архивы — в распакованном виде)
+    больше MAX_IMPORT_BYTES.
+    """
+    entries = []
+    budget = MAX_IMPORT_BYTES
+    try:
+        for upload_file in files:
+            if _is_zip(upload_file):
+                received, size = _receive_zip(upload_file, budget)
+                entries.extend(received)
+                budget -= size
+            elif _is_audio(upload_file.filename or "", upload_file.content_type):
+                budget -= _upload_size(upload_file)
+                if budget < 0:
+                    raise ValueError("Import is too large")
+                temp_path, file_hash = audio_processor.receive_upload(upload_file)
+                entries.append({"name": upload_file.filename, "temp_path": str(temp_path), "file_hash": file_hash})
+            else:
+                entries.append({"name": upload_file.filename, "status": SKIPPED, "detail": "Not an audio file"})
+    except Exception:
+        _remove_temp_files(entries)
+        raise
+    return entries
+
+
+def _remove_temp_files(entries: List[dict]):
+    for entry in entries:
+        if entry.get("temp_path"):
+            Path(entry["temp_path"]).unlink(missing_ok=True)
+
+
+# --- Сопоставление с частями произведения ---
+
+def _natural_key(name: str):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name or "")]
+
+
+def _track_positions(entries: List[dict]) -> Optional[Dict[int, int]]:
+    """
+    id(entry) -> сквозной номер трека (1..) с учетом дисков: треки диска 2 идут
+    после всех треков диска 1 (их число — из 'N/всего' или наибольший номер).
+    None, если у какого-то файла нет номера трека или номера совпадают.
+    """
+    discs: Dict[int, Dict[int, dict]] = {}
+    totals: Dict[int, int] = {}
+    for entry in entries:
+        tags = entry.get("tags")
+        number = audio_tags.track_number(tags)
+        disc = audio_tags.disc_number(tags)
+        if not number or number in discs.setdefault(disc, {}):
+            return None
+        discs[disc][number] = entry
+        totals[disc] = max(totals.get(disc, 0), audio_tags.track_total(tags) or 0, number)
+
+    positions = {}
+    offset = 0
+    for disc in sorted(discs):
+        for number, entry in discs[disc].items():
+            positions[id(entry)] = offset + number
+        offset += totals[disc]
+    return positions
+
+
+def match_compositions(entries: List[dict], compositions: List[models.music.Composition], mode: str) -> str:
+    """
+    Проставляет entry["composition_id"] для файлов без status.
+    По порядку: N-й файл (естественная сортировка имен) -> N-я часть.
+    По треку: номер трека N (сквозной по дискам) -> N-я часть. Если номера есть
+    не у всех файлов или совпадают (AUTO и TRACK), применяется порядок.
+    Возвращает примененный режим.
+    """
+    # Часть с sort_order 0 — запись произведения целиком; при наличии частей ее не сопоставляем
+    parts = [c for c in compositions if c.sort_order and c.sort_order > 0] or list(compositions)
+    parts.sort(key=lambda c: (c.sort_order or 0, c.id))
+    pending = [e for e in entries if not e.get("status")]
+
+    positions = _track_positions(pending) if pending and mode in (AUTO, TRACK) else None
+    mode = TRACK if positions is not None else ORDER
+
+    if mode == TRACK:
+        for entry in pending:
+            number = positions[id(entry)]
+            if number <= len(parts):
+                entry["composition_id"] = parts[number - 1].id
+    else:
+        for position, entry in enumerate(sorted(pending, key=lambda e: _natural_key(e["name"]))):
+            if position < len(parts):
+                entry["composition_id"] = parts[position].id
+
+    for entry in pending:
+        if "composition_id" not in entry:
+            entry.update(status=UNMATCHED, detail="No matching composition")
+    return mode
+
+
+# --- Задача ---
+
+def _probe_files(job_id: str, payload: dict) -> dict:
+    """driver: проба всех файлов в пуле процессов."""
+    files = [f for f in payload["files"] if f.get("temp_path")]
+    results = jobs.map_in_pool(
+        job_id, audio_processor.probe_file, [(f["temp_path"], f["file_hash"]) for f in files], end=0.9
+    )
+    probes = {}
+    for entry, probe in zip(files, results):
+        probes[entry["temp_path"]] = {"error": str(probe)} if isinstance(probe, Exception) else probe
+    return {"probes": probes}
+
+
+def _finish_bulk_import(db: Session, job_id: str, payload: dict, result: dict) -> dict:
+    work = crud.music.get_work(db, payload["work_id"])
+    if not work:
+        raise jobs.JobError("Work not found")
+
+    entries = [dict(f) for f in payload["files"]]
+    for entry in entries:
+        if entry.get("status"):
+            continue
+        probe = result["probes"].get(entry["temp_path"], {"error": "Not processed"})
+        if "error" in probe:
+            entry.update(status=ERROR, detail=probe["error"])
+        else:
+            entry.update(duration=probe["duration"], tags=probe["tags"], has_cover=probe["has_cover"])
+    mode = match_compositions(entries, work.compositions, payload["match"])
+
+    # Дубликаты: по хэшу (в базе — одним запросом, и внутри самого пакета), затем по длительности
+    pending = [e for e in entries if not e.get("status")]
+    known = {h for (h,) in db.query(models.music.Recording.file_hash).filter(
+        models.music.Recording.file_hash.in_([e["file_hash"] for e in pending]))}
+    items = []
+    for entry in pending:
+        values = payload["recording"]
+        if payload.get("extract_tags"):
+            values = audio_tags.fill_missing(values, audio_tags.propose(entry.get("tags")))
+        rec_in = schemas.RecordingCreate(**values)
+        if entry["file_hash"] in known:
+            entry.update(status=DUPLICATE, detail="Duplicate file (hash match)")
+        elif crud.music.find_near_duplicate_recording(db, entry["composition_id"], rec_in.performers,
+                                                      entry["duration"]):
+            entry.update(status=DUPLICATE, detail="Possible duplicate performance (duration match)")
+        else:
+            known.add(entry["file_hash"])
+            items.append({**entry, "rec_in": rec_in})
+
+    moved = []
+
+    def place_file(recording: models.music.Recording, item: dict) -> str:
+        temp_path = Path(item["temp_path"])
+        final_path = audio_processor.move_into_library(temp_path, recording.id, item["file_hash"])
+        moved.append((final_path, temp_path))
+        return f"/{final_path.as_posix()}"
+
+    jobs.report_progress(job_id, 0.95, "saving")
+    try:
+        created = crud.music.create_recordings_bulk(db, items, place_file)
+    except Exception:
+        # Транзакция откатилась: возвращаем файлы обратно, их удалит cleanup
+        for final_path, temp_path in moved:
+            final_path.replace(temp_path)
+        raise
+
+    for recording in created:
+        media_registry.register(recording.id, recording.file_path, recording.file_hash)
+    by_hash = {r.file_hash: r for r in created}
+    for entry in pending:
+        if not entry.get("status"):
+            entry.update(status=CREATED, recording_id=by_hash[entry["file_hash"]].id)
+
+    if payload.get("extract_tags"):
+        _apply_work_cover(db, work, [e for e in pending if e.get("status") == CREATED])
+
+    report = [
+        {k: entry.get(k) for k in ("name", "status", "detail", "composition_id", "recording_id", "duration")}
+        for entry in entries
+    ]
+    return {"work_id": work.id, "match": mode, "created": len(created), "files": report}
+
+
+def _apply_work_cover(db: Session, work: models.music.Work, created: List[dict]):
+    """Встроенная обложка первого файла -> обложка произведения (если обложек еще нет)."""
+    if work.cover_art_url or any(c.cover_art_url for c in work.compositions):
+        return
+    entry = next((e for e in created if e.get("has_cover")), None)
+    if entry is None:
+        return
+    # Записи уже сохранены: негодная картинка или пропавший кэш не должны ронять импорт
+    try:
+        with audio_tags.cover_path(entry["file_hash"]).open("rb") as f:
+            url = utils.save_image_file(f, "works", f"work_{work.id}")
+    except Exception as e:
+        print(f"[ERROR] Could not use embedded cover of {entry.get('name')}: {e}")
+        return
+    crud.music.update_work_cover(db, work.id, url)
+
+
+def _cleanup_bulk_import(job_id: str, payload: dict):
+    _remove_temp_files(payload["files"])
+
+
+jobs.register(BULK_IMPORT, driver=_probe_files, finish=_finish_bulk_import, cleanup=_cleanup_bulk_import)
+
+
+def submit(db: Session, work_id: int, entries: List[dict], match: str, rec_in: schemas.RecordingCreate,
+           extract_tags: bool = False) -> models.Job:
+    return jobs.submit(db, BULK_IMPORT, {
+        "work_id": work_id, "match": match, "recording": rec_in.dict(), "extract_tags": extract_tags,
+        "files": entries,
+    })
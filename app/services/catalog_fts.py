@@ -0,0 +1,150 @@
+"""
+Полнотекстовый поиск по каталогу через SQLite FTS5.
+
+FTS-таблицы (composers_fts, works_fts, compositions_fts, recordings_fts)
+создаются миграцией bbe314582f21 и синхронизируются триггерами на базовых
+таблицах, поэтому приложению достаточно только читать их.
+Используется в get_library_works и в плоском списке list_recordings
+вместо LIKE по 9 колонкам с Python-функцией lower_utf8 на каждую строку.
+
+Токены ищутся как префиксы слов ("сонат"*), поэтому подстроку в середине
+слова (то, что находил прежний LIKE '%q%') FTS не находит. Если FTS не нашел
+ничего, вызывающие повторяют поиск через LIKE: медленный путь остается только
+для таких запросов.
+"""
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import text, Integer, Float
+from sqlalchemy.orm import Session
+
+from app.utils import switch_keyboard_layout, normalize_text_smart
+
+FTS_TABLES = ("composers_fts", "works_fts", "compositions_fts", "recordings_fts")
+
+WORK = "work"
+RECORDING = "recording"
+
+# Для каждой цели поиска: как от совпавшей строки FTS-таблицы дойти до ID цели
+_BRANCHES = {
+    WORK: {
+        "works_fts": "SELECT works_fts.rowid AS id, bm25(works_fts) AS score "
+                     "FROM works_fts WHERE works_fts MATCH :{p}",
+        "composers_fts": "SELECT w.id AS id, bm25(composers_fts) AS score "
+                         "FROM composers_fts JOIN works w ON w.composer_id = composers_fts.rowid "
+                         "WHERE composers_fts MATCH :{p}",
+        "compositions_fts": "SELECT c.work_id AS id, bm25(compositions_fts) AS score "
+                            "FROM compositions_fts JOIN compositions c ON c.id = compositions_fts.rowid "
+                            "WHERE compositions_fts MATCH :{p}",
+        "recordings_fts": "SELECT c.work_id AS id, bm25(recordings_fts) AS score "
+                          "FROM recordings_fts JOIN recordings r ON r.id = recordings_fts.rowid "
+                          "JOIN compositions c ON c.id = r.composition_id "
+                          "WHERE recordings_fts MATCH :{p}",
+    },
+    RECORDING: {
+        "recordings_fts": "SELECT recordings_fts.rowid AS id, bm25(recordings_fts) AS score "
+                          "FROM recordings_fts WHERE recordings_fts MATCH :{p}",
+        "compositions_fts": "SELECT r.id AS id, bm25(compositions_fts) AS score "
+                            "FROM compositions_fts JOIN recordings r ON r.composition_id = compositions_fts.rowid "
+                            "WHERE compositions_fts MATCH :{p}",
+        "works_fts": "SELECT r.id AS id, bm25(works_fts) AS score "
+                     "FROM works_fts JOIN compositions c ON c.work_id = works_fts.rowid "
+                     "JOIN recordings r ON r.composition_id = c.id "
+                     "WHERE works_fts MATCH :{p}",
+        "composers_fts": "SELECT r.id AS id, bm25(composers_fts) AS score "
+                         "FROM composers_fts JOIN works w ON w.composer_id = composers_fts.rowid "
+                         "JOIN compositions c ON c.work_id = w.id "
+                         "JOIN recordings r ON r.composition_id = c.id "
+                         "WHERE composers_fts MATCH :{p}",
+    },
+}
+
+# Как часто перепроверять отсутствие FTS-таблиц (миграцию могут применить, не перезапуская сервер)
+RECHECK_SECONDS = 60
+
+_available = False
+_checked_at: Optional[float] = None
+
+
+def is_available(db: Session) -> bool:
+    """
+    Проверяет, что миграция с FTS-таблицами применена. Найденные таблицы
+    запоминаются до конца процесса, отсутствие — на RECHECK_SECONDS.
+    """
+    global _available, _checked_at
+    if _available or db.bind.dialect.name != "sqlite":
+        return _available
+    now = time.monotonic()
+    if _checked_at is None or now - _checked_at >= RECHECK_SECONDS:
+        names = {
+            row[0] for row in db.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%_fts'")
+            )
+        }
+        _available = all(t in names for t in FTS_TABLES)
+        _checked_at = now
+    return _available
+
+
+def _fts_token(token: str) -> str:
+    """Токен как префиксный запрос FTS5: "соната"* (кавычки экранируются)."""
+    return '"' + token.replace('"', '""') + '"*'
+
+
+def query_variants(q: str) -> List[List[str]]:
+    """
+    Варианты разбиения запроса на токены (оригинал и переключенная раскладка):
+    - обычное разбиение по пробелам ("op. 27");
+    - "умная" нормализация (kv525 -> kv 525);
+    - весь запрос без пробелов (kv 525 -> kv525).
+    """
+    variants: List[List[str]] = []
+    texts = [q.strip()]
+    switched = switch_keyboard_layout(texts[0])
+    if switched != texts[0]:
+        texts.append(switched)
+
+    for t in texts:
+        plain = t.lower().split()
+        smart = normalize_text_smart(t).split()
+        compact = ["".join(plain)] if len(plain) > 1 else []
+        for tokens in (plain, smart, compact):
+            tokens = [tok for tok in tokens if any(ch.isalnum() for ch in tok)]
+            if tokens and tokens not in variants:
+                variants.append(tokens)
+    return variants
+
+
+def match_subquery(q: str, target: str):
+    """
+    Возвращает подзапрос (id, score) с ID целей (Work или Recording),
+    у которых каждый токен запроса нашелся хотя бы в одной из FTS-таблиц.
+    score — сумма bm25 по токенам (чем меньше, тем релевантнее).
+    Если запрос не дал токенов, возвращает None.
+    """
+    branches = _BRANCHES[target]
+    params: Dict[str, str] = {}
+    variant_sqls = []
+
+    for tokens in query_variants(q):
+        token_sqls = []
+        for token in tokens:
+            name = f"fts_{len(params)}"
+            params[name] = _fts_token(token)
+            union = " UNION ALL ".join(sql.format(p=name) for sql in branches.values())
+            token_sqls.append(f"SELECT id, MIN(score) AS score FROM ({union}) GROUP BY id")
+        variant_sqls.append(
+            f"SELECT id, SUM(score) AS score FROM ({' UNION ALL '.join(token_sqls)}) "
+            f"GROUP BY id HAVING COUNT(*) = {len(token_sqls)}"
+        )
+
+    if not variant_sqls:
+        return None
+
+    sql = f"SELECT id, MIN(score) AS score FROM ({' UNION ALL '.join(variant_sqls)}) GROUP BY id"
+    return (
+        text(sql)
+        .bindparams(**params)
+        .columns(id=Integer, score=Float)
+        .subquery("fts_match")
+    )
@@ -0,0 +1,95 @@
+"""
+Счетчики каталога для главной страницы (таблица catalog_stats, одна строка).
+
+Вместо COUNT/SUM по всему каталогу на каждый просмотр главной: crud_music
+при создании и удалении вызывает adjust() ДО своего commit, поэтому счетчики
+меняются в той же транзакции, что и каталог (UPDATE ... SET x = x + :delta,
+без чтения строки). При откате транзакции откатываются и они.
+
+Если счетчики все же разошлись с каталогом (правка базы вручную, старая
+версия кода), их пересчитывает rebuild():
+python -m app.tools.rebuild_catalog_stats.
+"""
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+
+ROW_ID = 1
+
+# Служебное произведение для частей без сборника: в статистике не считается
+NO_COLLECTION_NAME = "Без сборника"
+
+FIELDS = ("recordings", "compositions", "works", "composers", "duration")
+
+
+def counts_as_work(name_ru: Optional[str]) -> bool:
+    return name_ru is not None and name_ru != NO_COLLECTION_NAME
+
+
+def adjust(db: Session, **deltas: int):
+    """
+    Меняет счетчики на deltas (recordings=1, duration=-300, ...) в текущей
+    транзакции; commit делает вызывающий.
+    """
+    values = {
+        getattr(models.CatalogStats, field): getattr(models.CatalogStats, field) + delta
+        for field, delta in deltas.items() if delta
+    }
+    if not values:
+        return
+    updated = (
+        db.query(models.CatalogStats)
+        .filter(models.CatalogStats.id == ROW_ID)
+        .update(values, synchronize_session=False)
+    )
+    if not updated:
+        # Строки еще нет (пустая база): пересчет уже учтет изменения этой транзакции
+        _store(db, _compute(db))
+
+
+def recording_totals(db: Session, *filters) -> dict:
+    """{"recordings": n, "duration": сек} для записей, подходящих под filters (перед удалением)."""
+    Recording = models.music.Recording
+    count, duration = db.query(func.count(Recording.id), func.sum(Recording.duration)).filter(*filters).one()
+    return {"recordings": count or 0, "duration": int(duration or 0)}
+
+
+def _compute(db: Session) -> dict:
+    music = models.music
+    totals = recording_totals(db)
+    return {
+        "recordings": totals["recordings"],
+        "compositions": db.query(music.Composition).count(),
+        "works": db.query(music.Work).filter(music.Work.name_ru != NO_COLLECTION_NAME).count(),
+        "composers": db.query(music.Composer).count(),
+        "duration": totals["duration"],
+    }
+
+
+def _store(db: Session, values: dict):
+    row = db.query(models.CatalogStats).get(ROW_ID)
+    if row is None:
+        row = models.CatalogStats(id=ROW_ID)
+        db.add(row)
+    for field in FIELDS:
+        setattr(row, field, values[field])
+    db.flush()
+
+
+def rebuild(db: Session) -> dict:
+    """Пересчитывает счетчики по каталогу; возвращает их."""
+    values = _compute(db)
+    _store(db, values)
+    db.commit()
+    return values
+
+
+def get(db: Session) -> dict:
+    """Счетчики одним запросом (первый вызов на пустой таблице — пересчет)."""
+    row = db.query(models.CatalogStats).get(ROW_ID)
+    if row is None:
+        return rebuild(db)
+    return {field: getattr(row, field) for field in FIELDS}
@@ -0,0 +1,141 @@
+"""
+Готовый ответ /api/dashboard/summary (главная страница) в памяти.
+
+Ответ одинаков для всех посетителей, поэтому он не собирается на каждый
+запрос: запрос отдает уже сериализованные байты с ETag (If-None-Match -> 304).
+
+Ответ собирается в потоке запроса, если его еще нет (первый запрос после
+старта) или каталог изменился после сборки (result_cache.add_listener):
+следующий после правки запрос уже видит ее, одновременные запросы ждут одну
+сборку. Фоновый поток пересобирает ответ раз в DASHBOARD_REFRESH_SECONDS
+и заново выбирает "В центре внимания" (random_works); при сборке после
+правки прежний выбор сохраняется, поэтому подборка меняется по расписанию,
+а не на каждое изменение. Изменения, о которых result_cache не узнает
+(системные подборки), видны с задержкой до DASHBOARD_REFRESH_SECONDS.
+"""
+import hashlib
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from app import crud, models, schemas
+from app.db.session import SessionLocal
+from app.services import catalog_stats, random_works, result_cache
+
+RANDOM_WORKS_COUNT = 12
+RECENT_WORKS_COUNT = 10
+COLLECTIONS_COUNT = 10
+
+
+class Snapshot(NamedTuple):
+    body: bytes
+    etag: str
+    generation: int  # _generation на момент сборки
+    random_ids: List[int]
+
+
+_snapshot: Optional[Snapshot] = None
+_refresh_lock = threading.RLock()
+_generation = 0  # растет с каждым изменением каталога
+_generation_lock = threading.Lock()
+
+
+def build_summary(db: Session, random_ids: Optional[List[int]] = None) -> schemas.DashboardSummary:
+    # 1. Статистика (счетчики ведет crud_music, см. app.services.catalog_stats)
+    counters = catalog_stats.get(db)
+    stats = schemas.DashboardStats(
+        total_recordings=counters["recordings"],
+        total_compositions=counters["compositions"],
+        total_works=counters["works"],
+        total_composers=counters["composers"],
+        total_duration=int(counters["duration"])
+    )
+
+    # 2. Недавно добавленные
+    recently_added_works = (
+        db.query(models.music.Work)
+        .options(joinedload(models.music.Work.composer))
+        .filter(models.music.Work.name_ru != catalog_stats.NO_COLLECTION_NAME)
+        .order_by(models.music.Work.id.desc())
+        .limit(RECENT_WORKS_COUNT)
+        .all()
+    )
+
+    # 3. Случайные произведения (для секции "В центре внимания"), см. random_works;
+    # random_ids — прежний выбор (удаленные произведения просто пропадут)
+    if random_ids is None:
+        random_ids = random_works.sample(db, random_works.SPOTLIGHT, RANDOM_WORKS_COUNT)
+    works_by_id = {
+        w.id: w for w in db.query(models.music.Work)
+        .options(joinedload(models.music.Work.composer))
+        .filter(models.music.Work.id.in_(random_ids))
+    }
+
+    # 4. Подборки
+    collections = crud.playlist.get_system_playlists(db, limit=COLLECTIONS_COUNT)
+
+    return schemas.DashboardSummary(
+        stats=stats,
+        recently_added_works=recently_added_works,
+        random_works=[works_by_id[i] for i in random_ids if i in works_by_id],
+        collections=collections
+    )
+
+
+def refresh(resample: bool = True) -> Snapshot:
+    """Пересобирает и подменяет ответ; без resample — с прежним "В центре внимания"."""
+    global _snapshot
+    with _refresh_lock:
+        # Поколение — до сборки: изменение во время нее вызовет еще одну
+        generation = _generation
+        random_ids = None if resample or _snapshot is None else _snapshot.random_ids
+        db = SessionLocal()
+        try:
+            summary = build_summary(db, random_ids)
+        finally:
+            db.close()
+        body = summary.model_dump_json().encode("utf-8")
+        _snapshot = Snapshot(
+            body, f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"', generation,
+            [w.id for w in summary.random_works],
+        )
+        return _snapshot
+
+
+def _fresh(snapshot: Optional[Snapshot]) -> bool:
+    return snapshot is not None and snapshot.generation == _generation
+
+
+def get() -> Snapshot:
+    """Текущий ответ; если его нет или каталог с тех пор изменился — собирается в потоке запроса."""
+    snapshot = _snapshot
+    if not _fresh(snapshot):
+        with _refresh_lock:
+            # Одновременные запросы ждут одну сборку
+            snapshot = _snapshot if _fresh(_snapshot) else refresh(resample=False)
+    return snapshot
+
+
+def notify_changed():
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+
+result_cache.add_listener(notify_changed)
+
+
+def start_schedule(interval_seconds: float):
+    """Фоновый поток: раз в interval_seconds пересобирает ответ с новым "В центре внимания"."""
+    def loop():
+        # Первую сборку делает первый запрос
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                refresh()
+            except Exception as e:
+                print(f"[ERROR] Could not refresh dashboard summary: {e}")
+
+    threading.Thread(target=loop, name="dashboard-refresh", daemon=True).start()
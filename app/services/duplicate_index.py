@@ -0,0 +1,155 @@
+"""
+Проверка дубликатов при создании композиторов, произведений и частей.
+
+Для каждого набора сравнения (все композиторы, произведения композитора,
+части произведения) строится и кэшируется индекс триграмм по названиям
+сущностей. Запрос сначала отбирает кандидатов с наибольшим числом общих
+триграмм, затем только они оцениваются одним пакетным вызовом RapidFuzz
+(partial_ratio), и результаты возвращаются по убыванию оценки.
+
+Как и прежняя проверка, сравнение идет с названиями, а не со всем search_text,
+и строки нормализуются normalize_for_comparison (ё -> е, текст в скобках
+отбрасывается). Каждое название (name_ru, original_name, у произведений и
+nickname) оценивается отдельно, берется лучшее: "Лунная соната" находит
+"Соната №14" с прозвищем "Лунная".
+Кэш привязан к поколению каталога (result_cache.generation), поэтому
+после любой правки каталога набор перестраивается при следующем запросе.
+"""
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import result_cache
+
+COMPOSER = "composer"
+WORK = "work"
+COMPOSITION = "composition"
+
+SIMILARITY_THRESHOLD = 85
+MAX_CANDIDATES = 50
+MAX_RESULTS = 5
+_CACHE_SIZE = 256
+
+
+def normalize_for_comparison(text: Optional[str]) -> str:
+    """Очищает строку для сравнения, удаляя лишние символы и слова."""
+    if not text:
+        return ""
+    text = text.lower()
+    text = text.replace('ё', 'е')
+    text = re.sub(r'\(.*?\)', '', text)
+    text = re.sub(r'[^\w\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def _qgrams(text: str) -> set:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class QGramIndex:
+    def __init__(self, rows: List[tuple]):
+        """rows: (id, название, slug, *названия для сравнения)."""
+        self.ids = [r[0] for r in rows]
+        self.names = [r[1] for r in rows]
+        self.slugs = [r[2] for r in rows]
+        # Нормализованные названия всех строк подряд; fields[pos] — их номера у строки pos
+        self.texts: List[str] = []
+        self.fields: List[List[int]] = []
+        self.postings: Dict[str, List[int]] = {}
+        for pos, row in enumerate(rows):
+            own = []
+            for value in dict.fromkeys(normalize_for_comparison(v) for v in row[3:]):
+                if value:
+                    own.append(len(self.texts))
+                    self.texts.append(value)
+            self.fields.append(own)
+            for gram in set().union(*(_qgrams(self.texts[i]) for i in own)):
+                self.postings.setdefault(gram, []).append(pos)
+
+    def candidates(self, query: str) -> List[int]:
+        """Позиции строк с наибольшим числом общих с запросом триграмм."""
+        shared = Counter()
+        for gram in _qgrams(query):
+            shared.update(self.postings.get(gram, ()))
+        return [pos for pos, _ in shared.most_common(MAX_CANDIDATES)]
+
+    def find(self, queries: List[str]) -> List[List[dict]]:
+        """
+        Для каждого (нормализованного) запроса — до MAX_RESULTS совпадений
+        с оценкой >= SIMILARITY_THRESHOLD, лучшие первыми.
+        """
+        per_query = [self.candidates(q) if q else [] for q in queries]
+        pool = sorted({i for cands in per_query for pos in cands for i in self.fields[pos]})
+        if not pool:
+            return [[] for _ in queries]
+
+        # Одна матрица запросы x названия всех кандидатов
+        column = {i: col for col, i in enumerate(pool)}
+        scores = process.cdist(
+            queries, [self.texts[i] for i in pool],
+            scorer=fuzz.partial_ratio, score_cutoff=SIMILARITY_THRESHOLD, dtype=np.uint8, workers=-1
+        )
+
+        results = []
+        for row, cands in enumerate(per_query):
+            scored = [(max(int(scores[row, column[i]]) for i in self.fields[pos]), pos) for pos in cands]
+            scored = [(s, pos) for s, pos in scored if s >= SIMILARITY_THRESHOLD]
+            scored.sort(key=lambda sp: (-sp[0], sp[1]))
+            results.append([
+                {"id": self.ids[pos], "name_ru": self.names[pos], "slug": self.slugs[pos], "score": s}
+                for s, pos in scored[:MAX_RESULTS]
+            ])
+        return results
+
+
+_cache: "OrderedDict[tuple, Tuple[int, QGramIndex]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _load_rows(db: Session, entity_type: str, scope_id: Optional[int]):
+    if entity_type == COMPOSER:
+        Composer = models.music.Composer
+        return db.query(Composer.id, Composer.name_ru, Composer.slug,
+                        Composer.name_ru, Composer.original_name).all()
+    if entity_type == WORK:
+        Work = models.music.Work
+        return db.query(Work.id, Work.name_ru, Work.slug, Work.name_ru, Work.original_name, Work.nickname).filter(
+            Work.composer_id == scope_id
+        ).all()
+    Composition = models.music.Composition
+    return db.query(Composition.id, Composition.title_ru, Composition.slug,
+                    Composition.title_ru, Composition.title_original).filter(
+        Composition.work_id == scope_id
+    ).all()
+
+
+def get_index(db: Session, entity_type: str, scope_id: Optional[int] = None) -> QGramIndex:
+    key = (entity_type, scope_id)
+    gen = result_cache.generation()
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == gen:
+            _cache.move_to_end(key)
+            return cached[1]
+
+    index = QGramIndex(_load_rows(db, entity_type, scope_id))
+    with _cache_lock:
+        _cache[key] = (gen, index)
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+def find_duplicates(db: Session, entity_type: str, names: List[str],
+                    scope_id: Optional[int] = None) -> List[List[dict]]:
+    index = get_index(db, entity_type, scope_id)
+    return index.find([normalize_for_comparison(name) for name in names])
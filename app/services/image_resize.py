@@ -0,0 +1,235 @@
+"""
+Уменьшение картинок из static/covers по запросу (GET /api/img/{path}?w=&h=&fmt=).
+
+Отдаются только файлы из папок картинок (utils.IMAGE_SUBFOLDERS), без
+скрытых (.incoming с недопроверенными загрузками, временные файлы).
+
+Результат кэшируется на диске: CACHE_DIR/ab/<sha256 оригинала>_<w>x<h>.<fmt>.
+Ключ — хэш содержимого, а не путь, поэтому одинаковые файлы (обложка
+произведения, скопированная в части) уменьшаются один раз. Хэш оригинала
+запоминается в памяти по (путь, размер, mtime). Размер кэша ограничен
+IMAGE_CACHE_MAX_MB: когда новые файлы его превышают, фоновый поток удаляет
+давно не читанные (по atime, при noatime — по времени создания), пока
+не останется CACHE_TRIM_TO от лимита.
+
+Декодирование и уменьшение идут в отдельном пуле процессов (IMAGE_WORKERS,
+им же пользуется app.services.image_uploads):
+JPEG открывается через Image.draft сразу в уменьшенном масштабе (1/2..1/8),
+без декодирования полного размера. Одинаковые одновременные запросы
+объединяются: второй и следующие ждут ту же задачу пула.
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app import utils
+from app.core.config import IMAGE_CACHE_MAX_MB, IMAGE_WORKERS
+
+CACHE_DIR = Path("data/img_cache")  # вне static: отдается только через /api/img
+CACHE_MAX_BYTES = IMAGE_CACHE_MAX_MB * 1024 ** 2
+CACHE_TRIM_TO = 0.9
+
+MAX_DIMENSION = 2000
+# fmt запроса -> (расширение, формат Pillow, параметры сохранения)
+FORMATS = {
+    "jpeg": ("jpg", "JPEG", {"quality": 80, "optimize": True, "progressive": True}),
+    "webp": ("webp", "WEBP", {"quality": 75, "method": 4}),
+    "png": ("png", "PNG", {"optimize": True}),
+}
+MEDIA_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+# EXIF Orientation 5..8 — поворот на 90°: ширина и высота в файле переставлены
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_inflight: Dict[Path, Future] = {}
+_lock = threading.RLock()  # done-колбэк может сработать сразу внутри submit
+
+_cache_bytes: Optional[int] = None  # оценка размера кэша; None — еще не считали
+_trimming = False
+
+
+def source_path(path: str) -> Optional[Path]:
+    """Путь к картинке в папке из utils.IMAGE_SUBFOLDERS или None (другой каталог, скрытый файл, не файл)."""
+    root = utils.COVERS_DIR.resolve()
+    candidate = (root / path).resolve()
+    if not candidate.is_relative_to(root):
+        return None
+    parts = candidate.relative_to(root).parts
+    if len(parts) < 2 or parts[0] not in utils.IMAGE_SUBFOLDERS or any(p.startswith(".") for p in parts):
+        return None
+    if not candidate.is_file():
+        return None
+    return candidate
+
+
+@lru_cache(maxsize=4096)
+def _content_hash(path: str, size: int, mtime_ns: int) -> str:
+    sha256_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256_hash.update(block)
+    return sha256_hash.hexdigest()
+
+
+def content_hash(path: Path) -> str:
+    st = path.stat()
+    return _content_hash(str(path), st.st_size, st.st_mtime_ns)
+
+
+def cache_path(file_hash: str, width: Optional[int], height: Optional[int], fmt: str) -> Path:
+    ext = FORMATS[fmt][0]
+    return CACHE_DIR / file_hash[:2] / f"{file_hash}_{width or 0}x{height or 0}.{ext}"
+
+
+def locate(path: str, width: Optional[int], height: Optional[int], fmt: str) -> Optional[Tuple[Path, Path, bool]]:
+    """
+    Блокирующая часть запроса (stat и хэш, для threadpool): (оригинал, путь в кэше,
+    есть ли он уже) или None, если картинки нет.
+    """
+    src = source_path(path)
+    if src is None:
+        return None
+    dest = cache_path(content_hash(src), width, height, fmt)
+    return src, dest, dest.is_file()
+
+
+def trim_cache(max_bytes: int = CACHE_MAX_BYTES) -> int:
+    """
+    Если кэш больше max_bytes, удаляет давно не читанные файлы, пока не останется
+    CACHE_TRIM_TO от max_bytes. Возвращает число удаленных файлов.
+    """
+    global _cache_bytes
+    files = []
+    for dirpath, _, filenames in os.walk(CACHE_DIR):
+        for name in filenames:
+            if name.startswith("."):
+                continue  # пишется прямо сейчас
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((max(st.st_atime, st.st_mtime), st.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    if total > max_bytes:
+        for _, size, path in sorted(files):
+            if total <= max_bytes * CACHE_TRIM_TO:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+    with _lock:
+        _cache_bytes = total
+    return removed
+
+
+def _trim_in_background():
+    global _trimming
+    try:
+        trim_cache()
+    except Exception as e:
+        print(f"[ERROR] Could not trim image cache: {e}")
+    finally:
+        with _lock:
+            _trimming = False
+
+
+def _account(dest: Path):
+    """Учитывает новый файл кэша; при превышении лимита (или неизвестном размере) — чистка в фоне."""
+    global _cache_bytes, _trimming
+    try:
+        size = dest.stat().st_size
+    except FileNotFoundError:
+        return
+    with _lock:
+        if _cache_bytes is not None:
+            _cache_bytes += size
+            if _cache_bytes <= CACHE_MAX_BYTES:
+                return
+        if _trimming:
+            return
+        _trimming = True
+    threading.Thread(target=_trim_in_background, name="img-cache-trim", daemon=True).start()
+
+
+def render(src: str, dest: str, width: Optional[int], height: Optional[int], fmt: str) -> str:
+    """В процессе пула: уменьшает src в рамку width x height и атомарно пишет dest."""
+    _, pil_format, options = FORMATS[fmt]
+    with utils.open_image(src) as image:
+        box_w = width or image.width * height // image.height
+        box_h = height or image.height * width // image.width
+        if image.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+            box_w, box_h = box_h, box_w
+        # JPEG: декодер сразу уменьшает в 2/4/8 раз, но не меньше рамки
+        image.draft("RGB", (box_w, box_h))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width or MAX_DIMENSION * 4, height or MAX_DIMENSION * 4), Image.Resampling.LANCZOS)
+        if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = dest.with_name(f".{uuid.uuid4().hex}")
+        image.save(temp_path, format=pil_format, **options)
+        os.replace(temp_path, dest)
+    return str(dest)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Пул процессов для работы с картинками (уменьшение по запросу, обработка загрузок)."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: как и пул задач, не копируем в воркеры состояние веб-процесса
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def forget_broken_pool(future: Future):
+    """Done-колбэк: упавший воркер ломает весь пул, следующий запрос создаст новый."""
+    global _pool
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        with _lock:
+            _pool = None
+
+
+def _done(dest: Path, future: Future):
+    with _lock:
+        _inflight.pop(dest, None)
+    forget_broken_pool(future)
+    if not future.cancelled() and future.exception() is None:
+        _account(dest)
+
+
+def submit(src: Path, dest: Path, width: Optional[int], height: Optional[int], fmt: str) -> Future:
+    """Задача пула для dest; если такая уже выполняется — она же."""
+    with _lock:
+        future = _inflight.get(dest)
+        if future is None:
+            future = get_pool().submit(render, str(src), str(dest), width, height, fmt)
+            _inflight[dest] = future
+            future.add_done_callback(lambda f: _done(dest, f))
+        return future
+
+
+def shutdown():
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
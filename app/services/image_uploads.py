@@ -0,0 +1,180 @@
+"""
+Обработка загружаемых картинок (портреты, обложки, аватары, картинки постов)
+вне потока запроса.
+
+Загрузка пишется во INCOMING_DIR (размер ограничен), заголовок проверяется
+сразу (формат, бюджет пикселей IMAGE_MAX_PIXELS), а декодирование, сжатие
+и уменьшенные копии (utils.process_image) выполняются в пуле процессов
+картинок (image_resize.get_pool, IMAGE_WORKERS).
+
+save_upload_file ставит задачу image_upload (app.services.jobs) и возвращает
+ее: эндпоинт сразу отвечает 202 с прежней картинкой, клиент опрашивает
+/api/jobs/{id}. Колонка картинки меняется только в finish задачи, когда
+новый файл уже готов; тогда же удаляется старый. Если Pillow не справился
+с файлом, прошедшим проверку заголовка, сохраняется исходная загрузка как есть
+(как в utils.save_image_file), так что старая картинка не теряется ни в каком
+случае: задача либо ставит новую, либо завершается ошибкой, ничего не трогая.
+Прерванные перезапуском задачи помечает failed jobs.fail_interrupted.
+"""
+import asyncio
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app import crud, models, utils
+from app.services import image_resize, jobs
+
+INCOMING_DIR = utils.COVERS_DIR / ".incoming"
+MAX_IMAGE_BYTES = 40 * 1024 ** 2
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Временные файлы старше этого возраста при старте считаются брошенными
+INCOMING_MAX_AGE_SECONDS = 3600
+
+IMAGE_UPLOAD = "image_upload"
+
+# Куда ставится картинка: target -> (папка в static/covers, префикс имени, функция crud).
+# Функция crud удаляет старый файл, сохраняет новый URL и возвращает объект (None, если его нет)
+TARGETS = {
+    "composer": ("composers", "comp", lambda db, i, url: crud.music.update_composer_portrait(db, i, url)),
+    "work": ("works", "work", lambda db, i, url: crud.music.update_work_cover(db, i, url)),
+    "composition": ("compositions", "part", lambda db, i, url: crud.music.update_composition_cover(db, i, url)),
+    "playlist": ("playlists", "pl", lambda db, i, url: crud.playlist.update_cover(db, i, url)),
+    "post": ("blog", "post", lambda db, i, url: crud.crud_blog.update_cover(db, i, url)),
+    "avatar": ("avatars", "user", lambda db, i, url: crud.user.update_avatar(db, i, url)),
+}
+
+
+def image_columns():
+    """(модель, колонка) всех URL картинок каталога."""
+    return [
+        (models.music.Composer, models.music.Composer.portrait_url),
+        (models.music.Work, models.music.Work.cover_art_url),
+        (models.music.Composition, models.music.Composition.cover_art_url),
+        (models.Playlist, models.Playlist.cover_image_url),
+        (models.User, models.User.avatar_url),
+        (models.Post, models.Post.cover_image_url),
+    ]
+
+
+def lqip_column(model):
+    """Колонка LQIP для модели из image_columns (у аватаров ее нет)."""
+    return {
+        models.music.Composer: models.music.Composer.portrait_lqip,
+        models.music.Work: models.music.Work.cover_art_lqip,
+        models.music.Composition: models.music.Composition.cover_art_lqip,
+        models.Playlist: models.Playlist.cover_image_lqip,
+        models.Post: models.Post.cover_image_lqip,
+    }.get(model)
+
+
+def _receive(upload_file: UploadFile) -> Path:
+    """Загрузка -> INCOMING_DIR с проверкой размера и заголовка картинки."""
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = INCOMING_DIR / uuid.uuid4().hex
+    try:
+        written = 0
+        with temp_path.open("wb") as dst:
+            for chunk in iter(lambda: upload_file.file.read(COPY_CHUNK_SIZE), b""):
+                written += len(chunk)
+                if written > MAX_IMAGE_BYTES:
+                    raise utils.ImageRejected("Image file is too large")
+                dst.write(chunk)
+        utils.open_image(temp_path).close()
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        upload_file.file.close()
+    return temp_path
+
+
+def process_or_copy(temp_path: str, file_path: str, url: str):
+    """
+    В процессе пула: utils.process_image, а если Pillow не справился — исходный
+    файл как есть. utils.ImageRejected пробрасывается.
+    """
+    try:
+        utils.process_image(temp_path, Path(file_path), url)
+    except utils.ImageRejected:
+        raise
+    except Exception as e:
+        print(f"Error compressing image: {e}")
+        shutil.copyfile(temp_path, file_path)
+
+
+# --- Задача ---
+
+def _process_upload(job_id: str, payload: dict) -> dict:
+    """work: в пуле процессов картинок."""
+    try:
+        process_or_copy(payload["temp_path"], payload["file_path"], payload["url"])
+    except utils.ImageRejected as e:
+        raise jobs.JobError(str(e))
+    return {"url": payload["url"]}
+
+
+def _finish_image_upload(db: Session, job_id: str, payload: dict, result: dict) -> dict:
+    apply = TARGETS[payload["target"]][2]
+    if apply(db, payload["target_id"], result["url"]) is None:
+        # Объект удалили, пока картинка обрабатывалась
+        utils.delete_file_by_url(result["url"])
+        raise jobs.JobError("Target not found")
+    return {"url": result["url"]}
+
+
+def _cleanup_image_upload(job_id: str, payload: dict):
+    Path(payload["temp_path"]).unlink(missing_ok=True)
+
+
+jobs.register(IMAGE_UPLOAD, work=_process_upload, finish=_finish_image_upload, cleanup=_cleanup_image_upload,
+              pool=image_resize)
+
+
+def save_upload_file(db: Session, upload_file: UploadFile, target: str, target_id: int) -> models.Job:
+    """
+    Принимает картинку для target (ключ TARGETS) и ставит ее обработку в очередь.
+    Колонка меняется, когда задача закончится. Raises utils.ImageRejected,
+    если файл не картинка или превышает бюджет.
+    """
+    subfolder, prefix, _ = TARGETS[target]
+    temp_path = _receive(upload_file)
+    try:
+        file_path, url = utils.new_image_path(subfolder, f"{prefix}_{target_id}")
+        return jobs.submit(db, IMAGE_UPLOAD, {
+            "target": target, "target_id": target_id,
+            "temp_path": str(temp_path), "file_path": str(file_path), "url": url,
+        })
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+async def save_upload_file_now(upload_file: UploadFile, subfolder: str, prefix: str) -> str:
+    """Дожидается обработки и возвращает итоговый URL (картинки внутри текста поста)."""
+    temp_path = await run_in_threadpool(_receive, upload_file)
+    try:
+        file_path, url = utils.new_image_path(subfolder, prefix)
+        future = image_resize.get_pool().submit(process_or_copy, str(temp_path), str(file_path), url)
+        future.add_done_callback(image_resize.forget_broken_pool)
+        await asyncio.wrap_future(future)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return url
+
+
+def remove_stale_incoming() -> int:
+    """При старте: временные загрузки, брошенные прошлым процессом."""
+    removed = 0
+    if INCOMING_DIR.is_dir():
+        deadline = time.time() - INCOMING_MAX_AGE_SECONDS
+        for path in INCOMING_DIR.iterdir():
+            if path.stat().st_mtime < deadline:
+                path.unlink(missing_ok=True)
+                removed += 1
+    return removed
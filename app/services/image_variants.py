@@ -0,0 +1,182 @@
+"""
+Уменьшенные копии картинок (обложки, портреты, аватары) для адаптивной загрузки.
+
+Для каждой картинки из static/covers рядом с оригиналом лежат копии шириной
+WIDTHS в JPEG и WebP: <имя>_320w.jpg, <имя>_320w.webp и т.д. Имена выводятся
+из URL оригинала, поэтому в базе ничего не хранится: srcset() строит набор
+по одному URL. Копии создает utils.process_image, для старых картинок —
+python -m app.tools.backfill_image_variants. Картинки меньше ширины копии
+не увеличиваются (копия того же размера), поэтому дескриптор ширины
+для них — верхняя граница.
+
+srcset() отдается, только если копии действительно есть (до backfill,
+после неудачного generate или сохранения файла как есть их нет, а клиент
+не возвращается к src, если srcset указывает на несуществующие файлы).
+generate пишет копии от большей к меньшей, самой последней — MARKER_WIDTH
+в последнем формате: ее наличие значит, что набор полный. Оба ответа
+проверки запоминаются в памяти: "есть" — навсегда, "нет" — на
+MISSING_TTL_SECONDS, поэтому сериализация списков не делает stat на каждую
+картинку без копий, а копии от backfill появляются в ответах с этой задержкой.
+
+Там же считается LQIP — крошечная (LQIP_SIZE px) WebP-копия в виде data URI,
+которая хранится в колонках *_lqip и отдается прямо в JSON: клиент рисует
+размытую обложку до загрузки настоящей без дополнительных запросов.
+
+Модуль не зависит от моделей: srcset в ответы добавляют схемы
+(app.schemas.image.srcset_from).
+"""
+import base64
+import io
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from PIL import Image, ImageOps
+
+COVERS_URL_PREFIX = "/static/covers/"
+
+WIDTHS = (96, 320, 800, 1200)
+LQIP_SIZE = 16
+# расширение -> (формат Pillow, параметры сохранения)
+FORMATS = {
+    "jpg": ("JPEG", {"quality": 80, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", {"quality": 75, "method": 4}),
+}
+MARKER_WIDTH = WIDTHS[0]
+MARKER_EXT = list(FORMATS)[-1]
+
+MISSING_TTL_SECONDS = 60
+MISSING_MAX_ENTRIES = 10000
+
+# URL, для которых набор копий уже найден на диске (имена уникальны, файлы не меняются)
+_ready: Set[str] = set()
+# URL -> когда (time.monotonic) копий не нашли
+_missing: Dict[str, float] = {}
+_ready_lock = threading.Lock()
+
+
+def has_variants(url: Optional[str]) -> bool:
+    return bool(url) and url.startswith(COVERS_URL_PREFIX)
+
+
+def variant_url(url: str, width: int, ext: str) -> str:
+    base, _ = os.path.splitext(url)
+    return f"{base}_{width}w.{ext}"
+
+
+def variant_urls(url: str) -> List[str]:
+    return [variant_url(url, width, ext) for width in WIDTHS for ext in FORMATS]
+
+
+def variants_ready(url: Optional[str]) -> bool:
+    """Созданы ли копии картинки (stat не чаще раза в MISSING_TTL_SECONDS, пока ответ "нет")."""
+    if not has_variants(url):
+        return False
+    if url in _ready:
+        return True
+    now = time.monotonic()
+    checked_at = _missing.get(url)
+    if checked_at is not None and now - checked_at < MISSING_TTL_SECONDS:
+        return False
+    ready = _path(variant_url(url, MARKER_WIDTH, MARKER_EXT)).is_file()
+    with _ready_lock:
+        if ready:
+            _ready.add(url)
+            _missing.pop(url, None)
+        else:
+            if len(_missing) >= MISSING_MAX_ENTRIES:
+                _missing.clear()
+            _missing[url] = now
+    return ready
+
+
+def srcset(url: Optional[str]) -> Optional[dict]:
+    """{"src": оригинал, "jpeg": "..._96w.jpg 96w, ...", "webp": "..."} или None, если копий нет."""
+    if not variants_ready(url):
+        return None
+    result = {"src": url}
+    for ext, (fmt, _) in FORMATS.items():
+        result[fmt.lower()] = ", ".join(f"{variant_url(url, width, ext)} {width}w" for width in WIDTHS)
+    return result
+
+
+def _path(url: str) -> Path:
+    return Path(url.lstrip("/"))
+
+
+def generate(url: str, image: Optional[Image.Image] = None, force: bool = False) -> int:
+    """
+    Создает недостающие копии картинки по URL (force — пересоздает все).
+    image — уже открытый и подготовленный оригинал, чтобы не читать файл снова.
+    Возвращает число созданных файлов.
+    """
+    todo = [
+        (width, ext) for width in WIDTHS for ext in FORMATS
+        if force or not _path(variant_url(url, width, ext)).exists()
+    ]
+    if not todo:
+        return 0
+
+    if image is None:
+        with Image.open(_path(url)) as source:
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    # От большей ширины к меньшей: каждая копия уменьшается из предыдущей,
+    # копия MARKER_WIDTH в MARKER_EXT (признак готовности, см. variants_ready) — последней
+    current = image
+    for width in sorted({w for w, _ in todo}, reverse=True):
+        current = current.copy()
+        current.thumbnail((width, width), Image.Resampling.LANCZOS)
+        for w, ext in todo:
+            if w != width:
+                continue
+            fmt, options = FORMATS[ext]
+            dest = _path(variant_url(url, width, ext))
+            temp_path = dest.with_name(f".{uuid.uuid4().hex}")
+            current.save(temp_path, format=fmt, **options)
+            os.replace(temp_path, dest)
+    return len(todo)
+
+
+def delete(url: Optional[str]):
+    if not has_variants(url):
+        return
+    with _ready_lock:
+        _ready.discard(url)
+        _missing.pop(url, None)
+    for variant in variant_urls(url):
+        _path(variant).unlink(missing_ok=True)
+
+
+def lqip(image: Image.Image) -> str:
+    """data:image/webp;base64,... (около сотни символов)."""
+    small = image.copy()
+    small.thumbnail((LQIP_SIZE, LQIP_SIZE), Image.Resampling.BOX)
+    if small.mode not in ("RGB", "RGBA"):
+        small = small.convert("RGB")
+    buffer = io.BytesIO()
+    small.save(buffer, format="WEBP", quality=60)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def lqip_for_url(url: Optional[str]) -> Optional[str]:
+    """LQIP сохраненной картинки (из самой маленькой копии, если она есть) или None."""
+    if not has_variants(url):
+        return None
+    for candidate in (variant_url(url, WIDTHS[0], "jpg"), url):
+        try:
+            with Image.open(_path(candidate)) as image:
+                image.draft("RGB", (LQIP_SIZE * 4, LQIP_SIZE * 4))
+                return lqip(ImageOps.exif_transpose(image))
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            print(f"[ERROR] Could not compute LQIP for {url}: {e}")
+            return None
+    return None
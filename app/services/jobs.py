@@ -0,0 +1,230 @@
+"""
+Локальная очередь фоновых задач.
+
+Тяжелая часть задачи (work) выполняется в пуле процессов, ее завершение
+(finish: записи в БД, перенос файлов) — в одном фоновом потоке основного
+процесса, поэтому изменения каталога выполняются последовательно и
+обновляют индексы в памяти именно этого процесса.
+Состояние задач хранится в таблице jobs (SQLite): воркеры сами пишут туда
+прогресс, а /api/jobs/{id} просто читает строку.
+
+Новый тип задачи регистрируется через register(kind, work=..., finish=...,
+cleanup=...); work должна быть функцией уровня модуля (передается в другой
+процесс по имени) с сигнатурой work(job_id, payload) -> dict;
+finish(db, job_id, payload, result) и cleanup(job_id, payload) вызываются
+в основном процессе. Задача из многих независимых частей (пакетный импорт)
+вместо work задает driver: он выполняется в потоке основного процесса и
+раздает части в пул через map_in_pool. pool — свой пул для work вместо
+общего (модуль или объект с get_pool() и forget_broken_pool(future), как
+app.services.image_resize).
+"""
+import json
+import multiprocessing
+import threading
+import traceback
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.core.config import JOB_WORKERS
+from app.db.session import SessionLocal
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobError(Exception):
+    """Ожидаемая ошибка задачи: текст попадает в Job.error без traceback."""
+
+
+@dataclass
+class JobKind:
+    work: Optional[Callable[[str, dict], dict]] = None  # в процессе пула
+    finish: Optional[Callable[[Session, str, dict, dict], Optional[dict]]] = None  # в основном процессе
+    cleanup: Optional[Callable[[str, dict], None]] = None  # всегда, после успеха или ошибки
+    driver: Optional[Callable[[str, dict], dict]] = None  # в потоке основного процесса, вместо work
+    pool: Optional[Any] = None  # свой пул для work: get_pool(), forget_broken_pool(future)
+
+
+_kinds: Dict[str, JobKind] = {}
+_pool: Optional[ProcessPoolExecutor] = None
+_finisher: Optional[ThreadPoolExecutor] = None
+_drivers: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def register(kind: str, work=None, finish=None, cleanup=None, driver=None, pool=None):
+    _kinds[kind] = JobKind(work=work, finish=finish, cleanup=cleanup, driver=driver, pool=pool)
+
+
+def _executors():
+    global _pool, _finisher
+    with _pool_lock:
+        if _pool is None:
+            # spawn: не копируем в воркеры потоки и соединения веб-процесса
+            _pool = ProcessPoolExecutor(max_workers=JOB_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        if _finisher is None:
+            _finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-finish")
+        return _pool, _finisher
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Общий пул процессов (для driver, которым нужен не map_in_pool, а свой порядок работы)."""
+    return _executors()[0]
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _driver_executor() -> ThreadPoolExecutor:
+    global _drivers
+    with _pool_lock:
+        if _drivers is None:
+            _drivers = ThreadPoolExecutor(max_workers=2, thread_name_prefix="job-driver")
+        return _drivers
+
+
+def shutdown():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        for executor in (_finisher, _drivers):
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+
+def _update(job_id: str, **fields):
+    db = SessionLocal()
+    try:
+        db.query(models.Job).filter(models.Job.id == job_id).update(fields)
+        db.commit()
+    finally:
+        db.close()
+
+
+def report_progress(job_id: str, progress: float, message: Optional[str] = None):
+    """Вызывается из work (в процессе пула) или из finish."""
+    _update(job_id, status=RUNNING, progress=progress, message=message)
+
+
+def _run_work(work, job_id: str, payload: dict) -> dict:
+    report_progress(job_id, 0.0, "started")
+    return work(job_id, payload) or {}
+
+
+def _finish(kind: str, job_id: str, payload: dict, future: Optional[Future]):
+    spec = _kinds[kind]
+    db = SessionLocal()
+    try:
+        result = future.result() if future is not None else {}
+        if spec.finish is not None:
+            result = spec.finish(db, job_id, payload, result) or result
+        _update(job_id, status=DONE, progress=1.0, message=None, result=json.dumps(result, ensure_ascii=False))
+    except JobError as e:
+        _update(job_id, status=FAILED, error=str(e))
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool) and spec.pool is None:
+            _reset_pool()
+        print(f"[ERROR] Job {job_id} ({kind}) failed: {e}")
+        traceback.print_exc()
+        _update(job_id, status=FAILED, error=str(e) or e.__class__.__name__)
+    finally:
+        db.close()
+        if spec.cleanup is not None:
+            try:
+                spec.cleanup(job_id, payload)
+            except Exception as e:
+                print(f"[ERROR] Job {job_id} ({kind}) cleanup failed: {e}")
+
+
+def submit(db: Session, kind: str, payload: dict) -> models.Job:
+    """Сохраняет задачу в БД и ставит в очередь. Возвращает строку Job (status=queued)."""
+    spec = _kinds[kind]
+    job = models.Job(
+        id=uuid.uuid4().hex, kind=kind, status=QUEUED, progress=0.0,
+        payload=json.dumps(payload, ensure_ascii=False)
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    pool, finisher = _executors()
+    if spec.driver is not None:
+        future = _driver_executor().submit(_run_work, spec.driver, job.id, payload)
+        future.add_done_callback(lambda f: finisher.submit(_finish, kind, job.id, payload, f))
+    elif spec.work is None:
+        finisher.submit(_finish, kind, job.id, payload, None)
+    elif spec.pool is not None:
+        # Сломанный пул забывает его владелец, следующая задача создаст новый
+        future = spec.pool.get_pool().submit(_run_work, spec.work, job.id, payload)
+        future.add_done_callback(spec.pool.forget_broken_pool)
+        future.add_done_callback(lambda f: finisher.submit(_finish, kind, job.id, payload, f))
+    else:
+        try:
+            future = pool.submit(_run_work, spec.work, job.id, payload)
+        except BrokenProcessPool:
+            _reset_pool()
+            pool, finisher = _executors()
+            future = pool.submit(_run_work, spec.work, job.id, payload)
+        future.add_done_callback(lambda f: finisher.submit(_finish, kind, job.id, payload, f))
+    return job
+
+
+def map_in_pool(job_id: str, fn, items: Sequence[tuple], start: float = 0.0, end: float = 1.0) -> List:
+    """
+    Выполняет fn(*args) для каждого элемента в пуле процессов (для driver).
+    Возвращает результаты в порядке items; ошибка отдельного элемента
+    возвращается на его месте как объект исключения. Прогресс задачи
+    растет от start до end по мере готовности элементов.
+    """
+    pool, _ = _executors()
+    try:
+        futures = {pool.submit(fn, *args): i for i, args in enumerate(items)}
+    except BrokenProcessPool:
+        _reset_pool()
+        raise
+    results: List = [None] * len(items)
+    for done, future in enumerate(as_completed(futures), 1):
+        try:
+            results[futures[future]] = future.result()
+        except BrokenProcessPool:
+            _reset_pool()
+            raise
+        except Exception as e:
+            results[futures[future]] = e
+        report_progress(job_id, start + (end - start) * done / len(items), f"{done}/{len(items)}")
+    return results
+
+
+def get_job(db: Session, job_id: str) -> Optional[models.Job]:
+    return db.query(models.Job).get(job_id)
+
+
+def serialize(job: models.Job) -> dict:
+    """Строка Job -> словарь для schemas.job.Job (result хранится как JSON-текст)."""
+    return {
+        "id": job.id, "kind": job.kind, "status": job.status, "progress": job.progress,
+        "message": job.message, "result": json.loads(job.result) if job.result else None,
+        "error": job.error, "created_at": job.created_at, "updated_at": job.updated_at,
+    }
+
+
+def fail_interrupted(db: Session) -> int:
+    """При старте: задачи, не завершенные прошлым процессом, помечаются как failed."""
+    count = (
+        db.query(models.Job)
+        .filter(models.Job.status.in_([QUEUED, RUNNING]))
+        .update({"status": FAILED, "error": "Interrupted by server restart"}, synchronize_session=False)
+    )
+    db.commit()
+    return count
@@ -0,0 +1,107 @@
+"""
+Карта ID записи -> файл на диске для стриминга.
+
+Заполняется при старте приложения и обновляется при загрузке и удалении
+записей, поэтому /stream/{id} не обращается к БД и не занимает threadpool.
+Файлы записей после загрузки не меняются (имя = ID записи), поэтому
+размер и mtime из os.stat можно хранить вместе с путем.
+
+Записи, добавленные другим процессом (python -m app.tools.scan), и файлы,
+перенесенные migrate_storage, этот процесс не видит: для них /stream
+один раз читает строку из БД (load) и дополняет карту.
+"""
+import os
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db.session import SessionLocal
+from app.services import storage
+
+
+class MediaFile(NamedTuple):
+    path: str
+    file_hash: Optional[str]
+    stat: os.stat_result
+
+    @property
+    def size(self) -> int:
+        return self.stat.st_size
+
+    @property
+    def mtime(self) -> float:
+        return self.stat.st_mtime
+
+
+_files: Dict[int, MediaFile] = {}
+_lock = threading.Lock()
+
+
+def _make_entry(file_path: str, file_hash: Optional[str]) -> Optional[MediaFile]:
+    path = str(storage.get_storage().resolve(file_path))
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    return MediaFile(path, file_hash, st)
+
+
+def build(db: Session) -> int:
+    """Заполняет карту всеми аудиозаписями, чьи файлы есть на диске."""
+    rows = (
+        db.query(models.music.Recording.id, models.music.Recording.file_path, models.music.Recording.file_hash)
+        .filter(models.music.Recording.duration > 0)
+        .all()
+    )
+    files = {}
+    for rec_id, file_path, file_hash in rows:
+        entry = _make_entry(file_path, file_hash)
+        if entry is not None:
+            files[rec_id] = entry
+
+    global _files
+    with _lock:
+        _files = files
+    return len(files)
+
+
+def get(rec_id: int) -> Optional[MediaFile]:
+    return _files.get(rec_id)
+
+
+def register(rec_id: int, file_path: str, file_hash: Optional[str]):
+    """Вызывается после того, как файл записи перемещен на свое место."""
+    entry = _make_entry(file_path, file_hash)
+    with _lock:
+        if entry is None:
+            _files.pop(rec_id, None)
+        else:
+            _files[rec_id] = entry
+
+
+def load(rec_id: int) -> Optional[MediaFile]:
+    """Промах карты (или файл пропал): берет путь из БД и обновляет карту. Синхронно, с БД."""
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(models.music.Recording.file_path, models.music.Recording.file_hash)
+            .filter(models.music.Recording.id == rec_id, models.music.Recording.duration > 0)
+            .first()
+        )
+    finally:
+        db.close()
+    if row is None:
+        unregister([rec_id])
+        return None
+    register(rec_id, row.file_path, row.file_hash)
+    return get(rec_id)
+
+
+def unregister(rec_ids: Iterable[int]):
+    with _lock:
+        for rec_id in rec_ids:
+            _files.pop(rec_id, None)
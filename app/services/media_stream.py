@@ -0,0 +1,218 @@
+"""
+Отдача аудиофайлов плееру.
+
+MediaFileResponse — самостоятельный Response (не наследник FileResponse:
+его приватные _handle_* меняются от версии к версии Starlette) с тем, что
+нужно плееру:
+- Range/206, несколько диапазонов — multipart/byteranges, If-Range,
+  416 для диапазона за концом файла;
+- сильный ETag из Recording.file_hash (sha256 содержимого), а не из mtime/размера;
+- If-None-Match -> 304 без тела;
+- чтение файла (os.pread) идет в рабочих потоках anyio под собственным
+  лимитом STREAM_IO_THREADS, а не под общим лимитом threadpool, в котором
+  FastAPI выполняет синхронные эндпоинты: стримы не занимают их слоты.
+
+Файл целиком (200 без Range) отдается через ASGI-расширение
+http.response.pathsend, если сервер его поддерживает: тогда файл читает сам
+сервер. uvicorn, на котором работает приложение, этого расширения не
+поддерживает, поэтому с ним все байты проходят через os.pread в потоках.
+"""
+import mimetypes
+import os
+import stat
+from email.utils import formatdate
+from secrets import token_hex
+from typing import List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+STREAM_CHUNK_SIZE = 256 * 1024
+STREAM_IO_THREADS = 16
+
+_io_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+async def _io(func, *args):
+    """Блокирующий файловый вызов в рабочем потоке под лимитом стримов."""
+    global _io_limiter
+    if _io_limiter is None:
+        _io_limiter = anyio.CapacityLimiter(STREAM_IO_THREADS)
+    return await anyio.to_thread.run_sync(func, *args, limiter=_io_limiter)
+
+
+def make_etag(file_hash: Optional[str]) -> Optional[str]:
+    # У YouTube-записей "хэш" искусственный (yt_...), файла у них нет
+    if not file_hash or file_hash.startswith("yt_"):
+        return None
+    return f'"{file_hash}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Слабое сравнение (RFC 9110), как положено для If-None-Match."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+async def is_file(path: str) -> bool:
+    return await _io(os.path.isfile, path)
+
+
+def parse_ranges(value: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Диапазоны [start, end) из заголовка Range, по возрастанию, пересекающиеся слиты.
+    None — заголовок не разобран (отдается весь файл, RFC 9110 это разрешает),
+    [] — ни один диапазон не попадает в файл (416).
+    """
+    units, _, spec = value.partition("=")
+    if units.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges = []
+    for part in spec.split(","):
+        first, dash, last = part.strip().partition("-")
+        first, last = first.strip(), last.strip()
+        if not dash or not (first or last):
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) + 1 if last else size
+                if last and end <= start:
+                    return None
+            else:
+                start, end = max(size - int(last), 0), size
+                if int(last) == 0:
+                    continue
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size)))
+
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class MediaFileResponse(Response):
+    chunk_size = STREAM_CHUNK_SIZE
+
+    def __init__(self, path, etag: Optional[str] = None, stat_result: Optional[os.stat_result] = None,
+                 media_type: Optional[str] = None, headers: Optional[dict] = None):
+        super().__init__(
+            headers=headers,
+            media_type=media_type or mimetypes.guess_type(str(path))[0] or "application/octet-stream",
+        )
+        self.path = path
+        self.stat_result = stat_result
+        self.etag = etag
+
+    def _set_stat_headers(self):
+        st = self.stat_result
+        self.headers["accept-ranges"] = "bytes"
+        self.headers["last-modified"] = formatdate(st.st_mtime, usegmt=True)
+        self.headers["etag"] = self.etag or f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+    def _ranges(self, request_headers: Headers) -> Optional[List[Tuple[int, int]]]:
+        http_range = request_headers.get("range")
+        if not http_range:
+            return None
+        if_range = request_headers.get("if-range")
+        if if_range and if_range not in (self.headers["etag"], self.headers["last-modified"]):
+            # Файл изменился с тех пор, как клиент получил начало: отдаем целиком
+            return None
+        return parse_ranges(http_range, self.stat_result.st_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            try:
+                self.stat_result = await _io(os.stat, self.path)
+            except FileNotFoundError:
+                return await Response(status_code=404)(scope, receive, send)
+            if not stat.S_ISREG(self.stat_result.st_mode):
+                return await Response(status_code=404)(scope, receive, send)
+        self._set_stat_headers()
+        size = self.stat_result.st_size
+
+        request_headers = Headers(scope=scope)
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, self.headers["etag"]):
+            not_modified = {k: self.headers[k] for k in ("etag", "last-modified", "accept-ranges")}
+            return await Response(status_code=304, headers=not_modified)(scope, receive, send)
+
+        header_only = scope["method"].upper() == "HEAD"
+        ranges = self._ranges(request_headers)
+        if ranges == []:
+            return await Response(
+                status_code=416, headers={"content-range": f"bytes */{size}", "accept-ranges": "bytes"}
+            )(scope, receive, send)
+
+        if ranges is None:
+            self.headers["content-length"] = str(size)
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if header_only:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            elif "http.response.pathsend" in scope.get("extensions", {}):
+                await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+            else:
+                await self._send_ranges(send, [(0, size)])
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+            self.headers["content-length"] = str(end - start)
+            await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+            if header_only:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            else:
+                await self._send_ranges(send, ranges)
+        else:
+            await self._send_multipart(send, ranges, size, header_only)
+
+    async def _send_ranges(self, send: Send, ranges: List[Tuple[int, int]], part_headers: Optional[List[bytes]] = None,
+                           footer: bytes = b"") -> None:
+        """Отправляет байты диапазонов (перед каждым — part_headers[i]) и завершает ответ."""
+        file = await _io(open, self.path, "rb")
+        try:
+            fd = file.fileno()
+            for i, (start, end) in enumerate(ranges):
+                if part_headers is not None:
+                    await send({"type": "http.response.body", "body": part_headers[i], "more_body": True})
+                while start < end:
+                    chunk = await _io(os.pread, fd, min(self.chunk_size, end - start), start)
+                    if not chunk:
+                        break
+                    start += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": footer, "more_body": False})
+        finally:
+            file.close()
+
+    async def _send_multipart(self, send: Send, ranges: List[Tuple[int, int]], size: int, header_only: bool) -> None:
+        boundary = token_hex(13)
+        content_type = self.headers["content-type"]
+        # Перед каждой частью, кроме первой, — CRLF, завершающий предыдущую
+        part_headers = [
+            (b"\r\n" if i else b"") + (
+                f"--{boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{end - 1}/{size}\r\n\r\n"
+            ).encode("latin-1")
+            for i, (start, end) in enumerate(ranges)
+        ]
+        footer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        content_length = sum(map(len, part_headers)) + sum(end - start for start, end in ranges) + len(footer)
+
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(content_length)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        if header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        await self._send_ranges(send, ranges, part_headers, footer)
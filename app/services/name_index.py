@@ -0,0 +1,175 @@
+"""
+Поиск опечаток в справочных именах (жанры, исполнители, издатели).
+
+BK-дерево по расстоянию Левенштейна: поиск всех имен на расстоянии <= d
+обходит только ветки, где это расстояние возможно (неравенство треугольника),
+вместо сравнения с каждым именем в базе. Дерево строится лениво при первом
+обращении и пополняется при вставке; для удаленных значений ведется счетчик
+использований, имена с нулевым счетчиком в результатах не возвращаются.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import Levenshtein
+from sqlalchemy.orm import Session
+
+from app import models
+
+GENRE = "genre"
+PERFORMER = "performer"
+PUBLISHER = "publisher"
+
+
+def normalize_name(name: Optional[str]) -> str:
+    return " ".join((name or "").lower().split())
+
+
+def max_distance(name: str) -> int:
+    """Если слово короткое, допускается 1 опечатка, если длинное - 2."""
+    return 1 if len(name) < 8 else 2
+
+
+class BKTree:
+    """BK-дерево: узел = [слово, {расстояние: дочерний узел}]."""
+
+    def __init__(self):
+        self._root: Optional[list] = None
+        self.size = 0
+
+    def add(self, word: str):
+        if self._root is None:
+            self._root = [word, {}]
+            self.size = 1
+            return
+        node = self._root
+        while True:
+            dist = Levenshtein.distance(word, node[0])
+            if dist == 0:
+                return
+            child = node[1].get(dist)
+            if child is None:
+                node[1][dist] = [word, {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, word: str, max_dist: int) -> List[Tuple[int, str]]:
+        """Все слова на расстоянии <= max_dist, по возрастанию расстояния."""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node_word, children = stack.pop()
+            dist = Levenshtein.distance(word, node_word)
+            if dist <= max_dist:
+                found.append((dist, node_word))
+            for d in range(max(1, dist - max_dist), dist + max_dist + 1):
+                child = children.get(d)
+                if child is not None:
+                    stack.append(child)
+        found.sort()
+        return found
+
+
+class NameIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = BKTree()
+        self._counts: Dict[str, int] = {}
+        self._display: Dict[str, str] = {}  # нормализованное -> как написано в базе
+
+    def add(self, name: Optional[str]):
+        key = normalize_name(name)
+        if not key:
+            return
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._display.setdefault(key, name.strip())
+            self._tree.add(key)
+
+    def discard(self, name: Optional[str]):
+        key = normalize_name(name)
+        with self._lock:
+            if self._counts.get(key, 0) > 0:
+                self._counts[key] -= 1
+
+    def find_similar(self, name: str, include_exact: bool = False, limit: int = 5) -> List[str]:
+        """
+        Похожие имена (с учетом порога опечаток), ближайшие первыми.
+        Точное совпадение (без учета регистра) пропускается, если include_exact=False.
+        """
+        key = normalize_name(name)
+        if not key:
+            return []
+        with self._lock:
+            matches = self._tree.search(key, max_distance(key))
+            result = []
+            for dist, word in matches:
+                if self._counts.get(word, 0) <= 0 or (dist == 0 and not include_exact):
+                    continue
+                result.append(self._display[word])
+                if len(result) >= limit:
+                    break
+            return result
+
+
+# --- Реестр индексов ---
+
+def _genre_names(db: Session) -> Iterable[str]:
+    return [name for (name,) in db.query(models.music.Genre.name)]
+
+
+def _performer_names(db: Session) -> Iterable[str]:
+    return [v for (v,) in db.query(models.music.Recording.performers).filter(
+        models.music.Recording.performers.isnot(None))]
+
+
+def _publisher_names(db: Session) -> Iterable[str]:
+    return [v for (v,) in db.query(models.music.Recording.publisher).filter(
+        models.music.Recording.publisher.isnot(None))]
+
+
+_LOADERS = {
+    GENRE: _genre_names,
+    PERFORMER: _performer_names,
+    PUBLISHER: _publisher_names,
+}
+
+_indexes: Dict[str, NameIndex] = {}
+_build_lock = threading.Lock()
+
+
+def get_index(db: Session, kind: str) -> NameIndex:
+    """Возвращает индекс, при первом обращении строит его из БД."""
+    index = _indexes.get(kind)
+    if index is None:
+        with _build_lock:
+            index = _indexes.get(kind)
+            if index is None:
+                index = NameIndex()
+                for name in _LOADERS[kind](db):
+                    index.add(name)
+                _indexes[kind] = index
+    return index
+
+
+def add_name(kind: str, name: Optional[str]):
+    # Еще не построенный индекс прочитает значение из БД сам
+    if kind in _indexes:
+        _indexes[kind].add(name)
+
+
+def discard_name(kind: str, name: Optional[str]):
+    if kind in _indexes:
+        _indexes[kind].discard(name)
+
+
+def add_recording(performers: Optional[str], publisher: Optional[str]):
+    add_name(PERFORMER, performers)
+    add_name(PUBLISHER, publisher)
+
+
+def discard_recording(performers: Optional[str], publisher: Optional[str]):
+    discard_name(PERFORMER, performers)
+    discard_name(PUBLISHER, publisher)
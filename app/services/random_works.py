@@ -0,0 +1,165 @@
+"""
+Случайные произведения без ORDER BY random() (/random-playable,
+/random-interactive, "В центре внимания" на главной).
+
+ID подходящих произведений хранятся в плотном массиве (list) вместе
+с картой ID -> позиция: выбор — random.choice за O(1), добавление в конец,
+удаление — перестановкой последнего элемента на место удаляемого.
+exclude_ids учитываются отбраковкой (повторный выбор); если исключена
+большая часть пула — разностью множеств.
+
+Пулы:
+  PLAYABLE  — есть хотя бы одна аудиозапись (duration > 0);
+  SPOTLIGHT — все произведения, кроме служебных "Без сборника".
+
+Пулы строятся при старте приложения (или при первом обращении) и обновляются
+из crud_music: refresh_work при изменении записей и произведения, remove при
+удалении. Как и остальные индексы в памяти, рассчитаны на один процесс.
+"""
+import random
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.catalog_stats import NO_COLLECTION_NAME
+
+PLAYABLE = "playable"
+SPOTLIGHT = "spotlight"
+
+# Попыток отбраковки, после которых выбор идет по разности множеств
+REJECTION_ATTEMPTS = 16
+
+
+class DenseIdSet:
+    def __init__(self):
+        self._ids: List[int] = []
+        self._pos: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, obj_id: int) -> bool:
+        return obj_id in self._pos
+
+    def add(self, obj_id: int):
+        if obj_id not in self._pos:
+            self._pos[obj_id] = len(self._ids)
+            self._ids.append(obj_id)
+
+    def discard(self, obj_id: int):
+        pos = self._pos.pop(obj_id, None)
+        if pos is None:
+            return
+        last = self._ids.pop()
+        if last != obj_id:
+            self._ids[pos] = last
+            self._pos[last] = pos
+
+    def choice(self, exclude: Optional[set] = None) -> Optional[int]:
+        if not self._ids:
+            return None
+        if not exclude:
+            return random.choice(self._ids)
+        for _ in range(REJECTION_ATTEMPTS):
+            obj_id = random.choice(self._ids)
+            if obj_id not in exclude:
+                return obj_id
+        rest = self._pos.keys() - exclude
+        return random.choice(list(rest)) if rest else None
+
+    def sample(self, k: int) -> List[int]:
+        return random.sample(self._ids, min(k, len(self._ids)))
+
+
+class RandomWorks:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self._pools = {PLAYABLE: DenseIdSet(), SPOTLIGHT: DenseIdSet()}
+
+    def replace_all(self, members: Dict[str, Iterable[int]]):
+        pools = {}
+        for kind, ids in members.items():
+            pools[kind] = DenseIdSet()
+            for obj_id in ids:
+                pools[kind].add(obj_id)
+        with self._lock:
+            self._pools = pools
+            self.ready = True
+
+    def set_member(self, kind: str, obj_id: int, member: bool):
+        with self._lock:
+            if member:
+                self._pools[kind].add(obj_id)
+            else:
+                self._pools[kind].discard(obj_id)
+
+    def choice(self, kind: str, exclude: Optional[Iterable[int]] = None) -> Optional[int]:
+        with self._lock:
+            return self._pools[kind].choice(set(exclude) if exclude else None)
+
+    def sample(self, kind: str, k: int) -> List[int]:
+        with self._lock:
+            return self._pools[kind].sample(k)
+
+
+index = RandomWorks()
+
+
+def _playable_query(db: Session):
+    music = models.music
+    return (
+        db.query(music.Composition.work_id)
+        .join(music.Composition.recordings)
+        .filter(music.Recording.duration > 0)
+        .distinct()
+    )
+
+
+def _spotlight_query(db: Session):
+    return db.query(models.music.Work.id).filter(models.music.Work.name_ru != NO_COLLECTION_NAME)
+
+
+def build(db: Session):
+    index.replace_all({
+        PLAYABLE: [row[0] for row in _playable_query(db)],
+        SPOTLIGHT: [row[0] for row in _spotlight_query(db)],
+    })
+
+
+def ensure_built(db: Session):
+    if not index.ready:
+        build(db)
+
+
+def choice(db: Session, kind: str, exclude: Optional[Iterable[int]] = None) -> Optional[int]:
+    """ID случайного произведения пула (не из exclude) или None, если подходящих нет."""
+    ensure_built(db)
+    return index.choice(kind, exclude)
+
+
+def sample(db: Session, kind: str, k: int) -> List[int]:
+    """До k разных случайных ID пула."""
+    ensure_built(db)
+    return index.sample(kind, k)
+
+
+# --- Инкрементальные обновления (вызываются из crud_music) ---
+
+def refresh_work(db: Session, work_id: int):
+    """Перепроверяет, в каких пулах должно быть произведение (записи, название, удаление)."""
+    if not index.ready:
+        return
+    music = models.music
+    playable = _playable_query(db).filter(music.Composition.work_id == work_id).first() is not None
+    spotlight = _spotlight_query(db).filter(music.Work.id == work_id).first() is not None
+    index.set_member(PLAYABLE, work_id, playable)
+    index.set_member(SPOTLIGHT, work_id, spotlight)
+
+
+def remove(work_ids: List[int]):
+    for work_id in work_ids:
+        index.set_member(PLAYABLE, work_id, False)
+        index.set_member(SPOTLIGHT, work_id, False)
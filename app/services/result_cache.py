@@ -0,0 +1,86 @@
+"""
+Кэш результатов поиска и списков медиатеки (LRU + TTL).
+
+Ключ — нормализованный запрос и фильтры. Каждая запись помнит "поколение"
+каталога, при котором она была посчитана; любое изменение каталога
+(crud_music, загрузка файлов, ноты) вызывает bump_generation(), и все старые
+записи перестают отдаваться. Поэтому TTL лишь ограничивает память,
+а не время устаревания: после правки админом кэш сразу считается пустым.
+
+Счетчик живет в памяти процесса, как и поисковые индексы (search_index,
+suggest_index), т.е. рассчитан на один процесс приложения. Кэши, которые
+пересчитываются заранее, а не по запросу (dashboard_cache), подписываются
+на изменения через add_listener.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+from app.core.config import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SECONDS
+
+_generation = 0
+_generation_lock = threading.Lock()
+_listeners: List[Callable[[], None]] = []
+
+
+def generation() -> int:
+    return _generation
+
+
+def bump_generation():
+    """Вызывается после каждого изменения каталога (после commit)."""
+    global _generation
+    with _generation_lock:
+        _generation += 1
+    for listener in _listeners:
+        listener()
+
+
+def add_listener(listener: Callable[[], None]):
+    """listener() вызывается после каждого bump_generation (должен быть быстрым: в потоке запроса)."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def normalize_query(q: Optional[str]) -> str:
+    """Регистр и лишние пробелы не влияют на результат поиска, поэтому не входят в ключ."""
+    return " ".join((q or "").lower().split())
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, ttl: float = RESULT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            gen, expires_at, value = item
+            if gen != _generation or expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, gen: int):
+        """
+        gen — поколение, прочитанное ДО вычисления value: если каталог успел
+        измениться во время запроса, запись сразу окажется устаревшей.
+        """
+        with self._lock:
+            self._data[key] = (gen, time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+cache = ResultCache()
@@ -0,0 +1,170 @@
+"""
+Возобновляемая загрузка больших аудиофайлов (в стиле протокола tus).
+
+Сессия = файл данных <id><ext> и описание <id>.json в INCOMING_DIR
+(та же файловая система, что и MUSIC_DIR, поэтому финальный перенос —
+атомарный os.replace). Текущее смещение — это размер файла данных,
+так что после рестарта сервера клиент продолжает с того же места.
+
+SHA-256 считается по мере поступления блоков; состояние хэша хранится
+в памяти процесса, а если его нет (рестарт), уже принятая часть файла
+однократно дочитывается с диска.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.services.audio_processor import INCOMING_DIR, HASH_CHUNK_SIZE
+
+MAX_UPLOAD_LENGTH = 8 * 1024 ** 3
+SESSION_TTL_SECONDS = 7 * 24 * 3600
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class OffsetMismatch(Exception):
+    def __init__(self, expected: int):
+        self.expected = expected
+
+
+@dataclass
+class UploadSession:
+    id: str
+    composition_id: int
+    length: int
+    filename: str
+    ext: str
+    metadata: dict = field(default_factory=dict)
+    created_at: float = 0.0
+
+    @property
+    def data_path(self) -> Path:
+        return INCOMING_DIR / f"{self.id}{self.ext}"
+
+    @property
+    def meta_path(self) -> Path:
+        return INCOMING_DIR / f"{self.id}.json"
+
+    @property
+    def offset(self) -> int:
+        try:
+            return self.data_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+
+# upload_id -> (хэш, сколько байт уже учтено)
+_hashers: Dict[str, Tuple["hashlib._Hash", int]] = {}
+_busy = set()
+_lock = threading.Lock()
+
+
+def create(composition_id: int, length: int, filename: str, metadata: dict) -> UploadSession:
+    expire_stale()
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        composition_id=composition_id,
+        length=length,
+        filename=filename,
+        ext=Path(filename).suffix.lower() or ".mp3",
+        metadata=metadata,
+        created_at=time.time(),
+    )
+    session.data_path.touch()
+    session.meta_path.write_text(json.dumps(asdict(session), ensure_ascii=False), encoding="utf-8")
+    with _lock:
+        _hashers[session.id] = (hashlib.sha256(), 0)
+    return session
+
+
+def load(upload_id: str) -> Optional[UploadSession]:
+    if not _ID_RE.match(upload_id):
+        return None
+    meta_path = INCOMING_DIR / f"{upload_id}.json"
+    try:
+        return UploadSession(**json.loads(meta_path.read_text(encoding="utf-8")))
+    except (FileNotFoundError, ValueError, TypeError):
+        return None
+
+
+def acquire(session: UploadSession) -> bool:
+    """Один PATCH/finalize на сессию одновременно."""
+    with _lock:
+        if session.id in _busy:
+            return False
+        _busy.add(session.id)
+        return True
+
+
+def release(session: UploadSession):
+    with _lock:
+        _busy.discard(session.id)
+
+
+def _hasher_at(session: UploadSession, offset: int) -> "hashlib._Hash":
+    with _lock:
+        hasher, hashed = _hashers.get(session.id, (None, -1))
+    if hasher is None or hashed != offset:
+        # Состояние потеряно (рестарт): дочитываем уже принятую часть
+        hasher = hashlib.sha256()
+        with session.data_path.open("rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                hasher.update(block)
+    return hasher
+
+
+def append(session: UploadSession, offset: int, chunk: bytes) -> int:
+    """
+    Дописывает блок по смещению offset (должно совпадать с текущим).
+    Возвращает новое смещение.
+    """
+    current = session.offset
+    if offset != current:
+        raise OffsetMismatch(current)
+    if current + len(chunk) > session.length:
+        raise ValueError("Chunk exceeds declared upload length")
+
+    hasher = _hasher_at(session, current)
+    with session.data_path.open("ab") as f:
+        f.write(chunk)
+    hasher.update(chunk)
+    new_offset = current + len(chunk)
+    with _lock:
+        _hashers[session.id] = (hasher, new_offset)
+    return new_offset
+
+
+def digest(session: UploadSession) -> str:
+    return _hasher_at(session, session.offset).hexdigest()
+
+
+def cached_digest(session: UploadSession) -> Optional[str]:
+    """Хэш без чтения с диска: None, если состояние хэша потеряно (рестарт)."""
+    with _lock:
+        hasher, hashed = _hashers.get(session.id, (None, -1))
+    if hasher is None or hashed != session.offset:
+        return None
+    return hasher.hexdigest()
+
+
+def discard(session: UploadSession):
+    with _lock:
+        _hashers.pop(session.id, None)
+    session.data_path.unlink(missing_ok=True)
+    session.meta_path.unlink(missing_ok=True)
+
+
+def expire_stale():
+    """Удаляет брошенные сессии старше SESSION_TTL_SECONDS."""
+    deadline = time.time() - SESSION_TTL_SECONDS
+    for meta_path in INCOMING_DIR.glob("*.json"):
+        session = load(meta_path.stem)
+        if session is not None and session.created_at < deadline:
+            discard(session)
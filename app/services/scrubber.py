@@ -0,0 +1,275 @@
+"""
+Проверка целостности хранилища и поиск осиротевших файлов.
+
+- missing: Recording.file_path или URL картинки (портреты, обложки, аватары,
+  обложки и картинки в тексте постов) указывает на несуществующий файл;
+- corrupt: содержимое аудиофайла не совпадает с Recording.file_hash;
+- orphaned: файл в MUSIC_DIR или static/covers, на который ничего не ссылается.
+
+Заодно из кэша тегов (audio_tags.TAGS_CACHE_DIR) удаляются записи хэшей,
+которых нет среди записей библиотеки.
+
+Хэши пересчитываются в отдельном пуле процессов (у фоновой задачи —
+SCRUB_WORKERS, не общий пул задач), чтение каждого процесса ограничено
+по скорости (общий бюджет SCRUB_MAX_MB_PER_SEC делится между процессами),
+чтобы проверка не забирала диск у стриминга. Записи проверяются пачками по ID,
+после каждой пачки состояние сохраняется в checkpoint.json — прерванный
+прогон продолжается с того же места. Осиротевшие файлы можно перенести
+в карантин (STATE_DIR/quarantine, с сохранением относительного пути).
+
+Запуск: python -m app.tools.scrub, POST /api/jobs/scrub или по расписанию
+(SCRUB_INTERVAL_HOURS).
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app import models, utils
+from app.core.config import SCRUB_MAX_MB_PER_SEC, SCRUB_WORKERS
+from app.db.session import SessionLocal
+from app.services import audio_processor, audio_tags, image_uploads, image_variants, jobs, storage
+
+STATE_DIR = Path("data/scrub")  # вне static: каталог не отдается наружу
+CHECKPOINT_PATH = STATE_DIR / "checkpoint.json"
+REPORT_PATH = STATE_DIR / "report.json"
+QUARANTINE_DIR = STATE_DIR / "quarantine"
+
+BATCH_SIZE = 200
+REPORT_LIMIT = 100  # сколько путей каждого вида попадает в результат задачи
+# Свежие файлы не считаем осиротевшими: загрузка могла еще не закоммитить запись
+ORPHAN_MIN_AGE_SECONDS = 3600
+
+MISSING = "missing"
+CORRUPT = "corrupt"
+ORPHANED = "orphaned"
+
+SCRUB = "storage_scrub"
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+_IMAGE_URL_RE = re.compile(r"/static/covers/[^\s\"'()<>]+")
+
+
+def verify_file(path: str, expected_hash: str, max_bytes_per_sec: float) -> Optional[str]:
+    """В процессе пула: None, если хэш совпал, иначе MISSING/CORRUPT."""
+    sha256_hash = hashlib.sha256()
+    started = time.monotonic()
+    read = 0
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(audio_processor.HASH_CHUNK_SIZE), b""):
+                sha256_hash.update(block)
+                read += len(block)
+                if max_bytes_per_sec:
+                    ahead = read / max_bytes_per_sec - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+    except FileNotFoundError:
+        return MISSING
+    return None if sha256_hash.hexdigest() == expected_hash else CORRUPT
+
+
+# --- Состояние (checkpoint) ---
+
+def _empty_state() -> dict:
+    return {"last_id": 0, "checked": 0, MISSING: [], CORRUPT: []}
+
+
+def _load_state() -> dict:
+    try:
+        return json.loads(CHECKPOINT_PATH.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return _empty_state()
+
+
+def _write_json(path: Path, data: dict):
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+# --- Проверки ---
+
+def _verify_recordings(db: Session, pool: Executor, workers: int, max_mb_per_sec: float, state: dict,
+                       progress: Optional[Callable[[float], None]]):
+    Recording = models.music.Recording
+    library = Recording.file_path.startswith(storage.to_file_path(storage.MUSIC_DIR) + "/")
+    total = db.query(Recording.id).filter(library).count()
+    per_worker_rate = max_mb_per_sec * 1024 * 1024 / max(1, workers)
+
+    while True:
+        batch = (
+            db.query(Recording.id, Recording.file_path, Recording.file_hash)
+            .filter(library, Recording.id > state["last_id"])
+            .order_by(Recording.id)
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        if not batch:
+            break
+
+        futures = []
+        for rec_id, file_path, file_hash in batch:
+            path = storage.resolve(file_path)
+            if file_hash and _HASH_RE.match(file_hash):
+                futures.append((rec_id, file_path, pool.submit(verify_file, str(path), file_hash, per_worker_rate)))
+            elif not path.is_file():
+                # Без настоящего хэша проверяем только наличие файла
+                state[MISSING].append({"recording_id": rec_id, "path": file_path})
+        for rec_id, file_path, future in futures:
+            status = future.result()
+            if status:
+                state[status].append({"recording_id": rec_id, "path": file_path})
+
+        state["last_id"] = batch[-1][0]
+        state["checked"] += len(batch)
+        _write_json(CHECKPOINT_PATH, state)
+        if progress and total:
+            progress(min(0.9, 0.9 * state["checked"] / total))
+
+
+def _image_references(db: Session) -> Dict[str, str]:
+    """URL картинки -> владелец ("Work#12"), включая картинки внутри текста постов."""
+    refs = {}
+    for model, column in image_uploads.image_columns():
+        for obj_id, url in db.query(model.id, column).filter(column.isnot(None), column != ""):
+            refs.setdefault(url, f"{model.__name__}#{obj_id}")
+    for post_id, content in db.query(models.Post.id, models.Post.content):
+        for url in _IMAGE_URL_RE.findall(content or ""):
+            refs.setdefault(url, f"Post#{post_id}")
+    return refs
+
+
+def _library_files(root: Path) -> List[Path]:
+    found = []
+    if not root.is_dir():
+        return found
+    for dirpath, dirnames, filenames in os.walk(root):
+        # .incoming (временные загрузки), скрытые временные файлы хранилища
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        found.extend(Path(dirpath) / name for name in filenames if not name.startswith("."))
+    return found
+
+
+def _find_orphans(referenced: Set[str]) -> List[Path]:
+    deadline = time.time() - ORPHAN_MIN_AGE_SECONDS
+    orphans = []
+    for root in (storage.MUSIC_DIR, utils.COVERS_DIR):
+        for path in _library_files(root):
+            if os.path.normpath(path) in referenced:
+                continue
+            try:
+                if path.stat().st_mtime > deadline:
+                    continue
+            except FileNotFoundError:
+                continue
+            orphans.append(path)
+    return orphans
+
+
+def _quarantine(path: Path):
+    dest = QUARANTINE_DIR / path
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(path), dest)
+
+
+def scrub(pool: Executor, workers: int, max_mb_per_sec: float = SCRUB_MAX_MB_PER_SEC,
+          quarantine: bool = False, restart: bool = False,
+          progress: Optional[Callable[[float], None]] = None) -> dict:
+    """
+    Полный прогон. Возвращает сводку (счетчики и до REPORT_LIMIT путей каждого вида);
+    полный отчет пишется в REPORT_PATH.
+    """
+    state = _empty_state() if restart else _load_state()
+    db = SessionLocal()
+    try:
+        _verify_recordings(db, pool, workers, max_mb_per_sec, state, progress)
+
+        image_refs = _image_references(db)
+        recording_paths = [p for (p,) in db.query(models.music.Recording.file_path)]
+        recording_hashes = {h for (h,) in db.query(models.music.Recording.file_hash)}
+    finally:
+        db.close()
+
+    tags_pruned = audio_tags.prune_cache(recording_hashes, ORPHAN_MIN_AGE_SECONDS)
+
+    missing_images = [
+        {"owner": owner, "path": url} for url, owner in image_refs.items()
+        if not storage.resolve(url).is_file()
+    ]
+    # Уменьшенные копии картинок принадлежат оригиналу
+    variants = [v for url in image_refs if image_variants.has_variants(url) for v in image_variants.variant_urls(url)]
+    referenced = {os.path.normpath(storage.resolve(p)) for p in recording_paths + list(image_refs) + variants}
+    orphans = _find_orphans(referenced)
+    if quarantine:
+        for path in orphans:
+            try:
+                _quarantine(path)
+            except OSError as e:
+                print(f"[ERROR] Could not quarantine {path}: {e}")
+
+    report = {
+        "checked": state["checked"],
+        MISSING: state[MISSING] + missing_images,
+        CORRUPT: state[CORRUPT],
+        ORPHANED: [p.as_posix() for p in orphans],
+        "quarantined": quarantine,
+        "tag_cache_pruned": tags_pruned,
+    }
+    _write_json(REPORT_PATH, report)
+    CHECKPOINT_PATH.unlink(missing_ok=True)
+
+    summary = {key: len(value) if isinstance(value, list) else value for key, value in report.items()}
+    for key in (MISSING, CORRUPT, ORPHANED):
+        summary[f"{key}_files"] = report[key][:REPORT_LIMIT]
+    return summary
+
+
+# --- Фоновая задача и расписание ---
+
+def _scrub_job(job_id: str, payload: dict) -> dict:
+    # Свой небольшой пул: в общем пуле задач (JOB_WORKERS) медленное хэширование
+    # с ограничением скорости задерживало бы пробы загрузок и пакетного импорта
+    with ProcessPoolExecutor(max_workers=SCRUB_WORKERS, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return scrub(
+            pool, SCRUB_WORKERS, quarantine=payload.get("quarantine", False),
+            restart=payload.get("restart", False),
+            progress=lambda value: jobs.report_progress(job_id, value, "verifying"),
+        )
+
+
+jobs.register(SCRUB, driver=_scrub_job)
+
+
+def submit(db: Session, quarantine: bool = False, restart: bool = False) -> models.Job:
+    return jobs.submit(db, SCRUB, {"quarantine": quarantine, "restart": restart})
+
+
+def start_schedule(interval_hours: float):
+    """Фоновый поток, ставящий проверку в очередь раз в interval_hours (если прошлая уже закончилась)."""
+    def loop():
+        while True:
+            time.sleep(interval_hours * 3600)
+            db = SessionLocal()
+            try:
+                active = db.query(models.Job).filter(
+                    models.Job.kind == SCRUB, models.Job.status.in_([jobs.QUEUED, jobs.RUNNING])
+                ).first()
+                if not active:
+                    submit(db)
+            except Exception as e:
+                print(f"[ERROR] Could not schedule storage scrub: {e}")
+            finally:
+                db.close()
+
+    threading.Thread(target=loop, name="scrub-schedule", daemon=True).start()
@@ -0,0 +1,430 @@
+"""
+Инвертированный индекс для универсального поиска (/api/search).
+
+Индекс строится один раз при старте приложения из сохраненного нормализованного
+текста (search_text) и затем поддерживается инкрементально из crud_music
+(создание, изменение, удаление).
+Поиск превращается в поиск термов по словарю и пересечение списков ID,
+ORM загружает только найденные строки.
+
+Тексты сущностей берутся из search_text целиком, поэтому поиск шире прежнего
+перебора нескольких колонок: произведение находится и по original_name
+композитора, часть и запись — и по каталожным номерам, году и прозвищу своих
+родителей. Чтобы такие совпадения не вытесняли прямые, результаты
+ранжируются (см. SearchIndex.search): совпадение в собственном тексте
+сущности весит больше совпадения в тексте родителей.
+"""
+import heapq
+import math
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from sqlalchemy.orm import Session
+
+from app import models
+
+COMPOSER = "composer"
+WORK = "work"
+COMPOSITION = "composition"
+RECORDING = "recording"
+KINDS = (COMPOSER, WORK, COMPOSITION, RECORDING)
+
+FUZZY_THRESHOLD = 80
+FUZZY_MIN_TOKEN_LEN = 4
+# Во сколько раз совпадение в собственном тексте сущности весит больше, чем в тексте родителей
+OWN_TEXT_WEIGHT = 2
+_EXPAND_CACHE_SIZE = 4096
+
+
+# --- Тексты сущностей ---
+# Собираются из готовых search_text (см. app.services.search_text):
+# (собственный текст сущности, текст родителей), чтобы часть находилась по
+# произведению, а запись — по части и произведению.
+
+def _join(*texts: Optional[str]) -> str:
+    return " ".join([t for t in texts if t])
+
+
+def composer_text(c: models.music.Composer) -> Tuple[str, str]:
+    return _join(c.search_text), ""
+
+
+def work_text(w: models.music.Work) -> Tuple[str, str]:
+    return _join(w.search_text), _join(w.composer.search_text)  # Ищем и по композитору тоже
+
+
+def composition_text(c: models.music.Composition) -> Tuple[str, str]:
+    return _join(c.search_text), _join(c.work.search_text)  # Контекст произведения
+
+
+def recording_text(r: models.music.Recording) -> Tuple[str, str]:
+    return _join(r.search_text), _join(r.composition.search_text, r.composition.work.search_text)
+
+
+def _trigrams(term: str) -> Set[str]:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def _term_score(token: str, term: str) -> float:
+    """Насколько хорошо терм совпал с токеном запроса: целиком > префикс > подстрока > нечетко."""
+    if term == token:
+        return 3.0
+    if term.startswith(token):
+        return 2.0
+    if token in term:
+        return 1.0
+    return 0.5
+
+
+def _batch_scores(tokens: List[str], choices: List[str], scorer) -> np.ndarray:
+    """Одна пакетная матрица оценок токены x термы на всех ядрах."""
+    return process.cdist(
+        tokens, choices, scorer=scorer, score_cutoff=FUZZY_THRESHOLD, workers=-1
+    )
+
+
+class SearchIndex:
+    """
+    Списки вхождений терм -> ID сущностей (отдельно для каждого типа сущности).
+
+    Семантика совпадает с прежним is_fuzzy_match: токен запроса совпадает,
+    если он является подстрокой текста сущности или (для токенов от 4 символов)
+    нечетко похож на него с порогом 80. Так как токены запроса не содержат
+    пробелов, подстрока всегда лежит внутри одного терма, поэтому токен
+    сначала раскрывается в набор термов словаря, а затем берется объединение
+    их списков вхождений.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.ready = False
+        self._reset()
+
+    def _reset(self):
+        self._docs: Dict[str, Dict[int, Set[str]]] = {kind: {} for kind in KINDS}
+        # Термы собственного текста сущности (подмножество _docs), для ранжирования
+        self._own: Dict[str, Dict[int, Set[str]]] = {kind: {} for kind in KINDS}
+        self._postings: Dict[str, Dict[str, Set[int]]] = {kind: defaultdict(set) for kind in KINDS}
+        # Сколько документов (всех типов) ссылается на терм
+        self._term_refs: Dict[str, int] = defaultdict(int)
+        # Триграммный индекс по словарю для быстрого поиска подстрок
+        self._trigram_terms: Dict[str, Set[str]] = defaultdict(set)
+        self._expand_cache: Dict[str, Set[str]] = {}
+        # Словарь, отсортированный по длине, для пакетного нечеткого этапа
+        self._sorted_vocab: Optional[Tuple[List[str], List[int]]] = None
+
+    # --- Изменение индекса ---
+
+    def add(self, kind: str, obj_id: int, text: str, context: str = ""):
+        """text — собственный текст сущности, context — текст ее родителей."""
+        own = set(text.split())
+        terms = own | set(context.split())
+        with self._lock:
+            self._remove_locked(kind, obj_id)
+            if not terms:
+                return
+            self._docs[kind][obj_id] = terms
+            self._own[kind][obj_id] = own
+            postings = self._postings[kind]
+            for term in terms:
+                postings[term].add(obj_id)
+                if self._term_refs[term] == 0:
+                    for tri in _trigrams(term):
+                        self._trigram_terms[tri].add(term)
+                    self._vocab_changed()
+                self._term_refs[term] += 1
+
+    def remove(self, kind: str, obj_id: int):
+        with self._lock:
+            self._remove_locked(kind, obj_id)
+
+    def _remove_locked(self, kind: str, obj_id: int):
+        terms = self._docs[kind].pop(obj_id, None)
+        self._own[kind].pop(obj_id, None)
+        if not terms:
+            return
+        postings = self._postings[kind]
+        for term in terms:
+            ids = postings.get(term)
+            if ids is not None:
+                ids.discard(obj_id)
+                if not ids:
+                    del postings[term]
+            self._term_refs[term] -= 1
+            if self._term_refs[term] <= 0:
+                del self._term_refs[term]
+                for tri in _trigrams(term):
+                    bucket = self._trigram_terms.get(tri)
+                    if bucket is not None:
+                        bucket.discard(term)
+                        if not bucket:
+                            del self._trigram_terms[tri]
+                self._vocab_changed()
+
+    def _vocab_changed(self):
+        self._expand_cache.clear()
+        self._sorted_vocab = None
+
+    # --- Поиск ---
+
+    def _get_sorted_vocab(self) -> Tuple[List[str], List[int]]:
+        if self._sorted_vocab is None:
+            terms = sorted(self._term_refs, key=len)
+            self._sorted_vocab = (terms, [len(t) for t in terms])
+        return self._sorted_vocab
+
+    def _exact_terms(self, token: str) -> Set[str]:
+        """Термы словаря, содержащие токен как подстроку."""
+        if len(token) >= 3:
+            candidates = None
+            for tri in _trigrams(token):
+                bucket = self._trigram_terms.get(tri, set())
+                candidates = bucket if candidates is None else candidates & bucket
+                if not candidates:
+                    break
+            return {t for t in (candidates or ()) if token in t}
+        return {t for t in self._term_refs if token in t}
+
+    def _fuzzy_terms(self, tokens: List[str], exact: Dict[str, Set[str]]) -> Dict[str, Set[str]]:
+        """
+        Нечеткий этап (для опечаток: сната -> соната) сразу для всех токенов:
+        два пакетных вызова process.cdist вместо вызова на каждую пару.
+
+        Аналог partial_ratio(token, весь_текст) на уровне термов:
+        - термы не короче токена сравниваются через partial_ratio;
+        - для более коротких термов partial_ratio искал бы терм внутри токена
+          ("van" внутри "karajan"), поэтому они сравниваются целиком через ratio.
+          ratio >= 80 возможен только для термов длиной от 2/3 токена,
+          остальные отсекаются по длине и не оцениваются вовсе.
+        Термы, уже найденные точным вхождением, из результата исключаются.
+        """
+        found: Dict[str, Set[str]] = {token: set() for token in tokens}
+        terms, lens = self._get_sorted_vocab()
+        if not tokens or not terms:
+            return found
+
+        # (токен, начало, конец) окон словаря для двух оценщиков
+        partial_windows = [(t, bisect_left(lens, len(t)), len(terms)) for t in tokens]
+        ratio_windows = [
+            (t, bisect_left(lens, math.ceil(len(t) * 2 / 3)), bisect_left(lens, len(t)))
+            for t in tokens
+        ]
+
+        for scorer, windows in ((fuzz.partial_ratio, partial_windows), (fuzz.ratio, ratio_windows)):
+            windows = [w for w in windows if w[1] < w[2]]
+            if not windows:
+                continue
+            lo = min(w[1] for w in windows)
+            hi = max(w[2] for w in windows)
+            scores = _batch_scores([w[0] for w in windows], terms[lo:hi], scorer)
+            for row, (token, start, end) in zip(scores, windows):
+                hits = np.flatnonzero(row[start - lo:end - lo] >= FUZZY_THRESHOLD)
+                for j in hits:
+                    term = terms[start + j]
+                    if term not in exact[token]:
+                        found[token].add(term)
+        return found
+
+    def _expand_tokens(self, tokens: List[str]) -> Dict[str, Set[str]]:
+        """Раскрывает токены запроса в термы словаря (с кэшем по токену)."""
+        result: Dict[str, Set[str]] = {}
+        pending = []
+        for token in dict.fromkeys(tokens):
+            cached = self._expand_cache.get(token)
+            if cached is not None:
+                result[token] = cached
+            else:
+                pending.append(token)
+        if not pending:
+            return result
+
+        # 1. Точное вхождение подстроки (быстрый префильтр по триграммам)
+        exact = {token: self._exact_terms(token) for token in pending}
+
+        # 2. Нечеткий этап только для длинных токенов.
+        # Короткие токены требуют точного совпадения, как и раньше.
+        fuzzy_tokens = [t for t in pending if len(t) >= FUZZY_MIN_TOKEN_LEN]
+        fuzzy = self._fuzzy_terms(fuzzy_tokens, exact)
+
+        if len(self._expand_cache) + len(pending) > _EXPAND_CACHE_SIZE:
+            self._expand_cache.clear()
+        for token in pending:
+            matched = exact[token] | fuzzy.get(token, set())
+            self._expand_cache[token] = matched
+            result[token] = matched
+        return result
+
+    def _match_tokens(self, kind: str, tokens: List[str]) -> Set[int]:
+        postings = self._postings[kind]
+        result: Optional[Set[int]] = None
+        # Начинаем с самых редких токенов, чтобы пересечение быстрее пустело
+        per_token = []
+        expanded = self._expand_tokens(tokens)
+        for token in tokens:
+            ids: Set[int] = set()
+            for term in expanded[token]:
+                ids |= postings.get(term, set())
+            if not ids:
+                return set()
+            per_token.append(ids)
+
+        for ids in sorted(per_token, key=len):
+            result = set(ids) if result is None else result & ids
+            if not result:
+                return set()
+        return result or set()
+
+    def _score(self, kind: str, obj_id: int, tokens: List[str], expanded: Dict[str, Set[str]]) -> float:
+        """Сумма по токенам лучшего совпадения с термом документа (см. _term_score, OWN_TEXT_WEIGHT)."""
+        terms = self._docs[kind][obj_id]
+        own = self._own[kind][obj_id]
+        total = 0.0
+        for token in tokens:
+            total += max(
+                (_term_score(token, term) * (OWN_TEXT_WEIGHT if term in own else 1)
+                 for term in terms if term in expanded[token]),
+                default=0.0,
+            )
+        return total
+
+    def search(self, kind: str, token_variants: List[List[str]], limit: int) -> List[int]:
+        """
+        Ищет сущности, в которых встречаются ВСЕ токены хотя бы одного варианта
+        запроса (оригинал или переключенная раскладка).
+        Возвращает до limit ID, самые релевантные первыми (оценка — лучшая
+        по вариантам, см. _score); при равной оценке — по возрастанию ID.
+        """
+        scores: Dict[int, float] = {}
+        with self._lock:
+            # Префильтр: короткие токены ищутся только точно, и если хоть один
+            # из них не встречается в словаре, вариант запроса не может совпасть
+            variants = [
+                tokens for tokens in token_variants
+                if tokens and all(
+                    self._exact_terms(t) for t in tokens if len(t) < FUZZY_MIN_TOKEN_LEN
+                )
+            ]
+            # Все оставшиеся токены всех вариантов идут в один пакетный нечеткий проход
+            self._expand_tokens([t for tokens in variants for t in tokens])
+            for tokens in variants:
+                expanded = self._expand_tokens(tokens)
+                for obj_id in self._match_tokens(kind, tokens):
+                    score = self._score(kind, obj_id, tokens, expanded)
+                    if score > scores.get(obj_id, -1.0):
+                        scores[obj_id] = score
+        return heapq.nsmallest(limit, scores, key=lambda obj_id: (-scores[obj_id], obj_id))
+
+    # --- Построение ---
+
+    def rebuild(self, db: Session):
+        Composer = models.music.Composer
+        Work = models.music.Work
+        Composition = models.music.Composition
+        Recording = models.music.Recording
+
+        with self._lock:
+            self._reset()
+            # Читаем только готовые строки, без загрузки ORM-объектов
+            for obj_id, text in db.query(Composer.id, Composer.search_text):
+                self.add(COMPOSER, obj_id, _join(text))
+
+            rows = db.query(Work.id, Work.search_text, Composer.search_text).join(Composer)
+            for obj_id, text, *context in rows:
+                self.add(WORK, obj_id, _join(text), _join(*context))
+
+            rows = db.query(Composition.id, Composition.search_text, Work.search_text).join(Work)
+            for obj_id, text, *context in rows:
+                self.add(COMPOSITION, obj_id, _join(text), _join(*context))
+
+            rows = (
+                db.query(Recording.id, Recording.search_text, Composition.search_text, Work.search_text)
+                .join(Composition, Recording.composition_id == Composition.id)
+                .join(Work, Composition.work_id == Work.id)
+            )
+            for obj_id, text, *context in rows:
+                self.add(RECORDING, obj_id, _join(text), _join(*context))
+
+            self.ready = True
+
+
+index = SearchIndex()
+
+
+def build(db: Session):
+    index.rebuild(db)
+
+
+def ensure_built(db: Session):
+    if not index.ready:
+        index.rebuild(db)
+
+
+# --- Инкрементальные обновления (вызываются из crud_music) ---
+
+def index_composer(composer: models.music.Composer, cascade: bool = False):
+    index.add(COMPOSER, composer.id, *composer_text(composer))
+    if cascade:
+        # Имя композитора входит в текст его произведений
+        for w in composer.works:
+            index_work(w)
+
+
+def index_work(work: models.music.Work, cascade: bool = False):
+    index.add(WORK, work.id, *work_text(work))
+    if cascade:
+        # Текст произведения входит в тексты частей и записей
+        for c in work.compositions:
+            index_composition(c, cascade=True)
+
+
+def index_composition(comp: models.music.Composition, cascade: bool = False):
+    index.add(COMPOSITION, comp.id, *composition_text(comp))
+    if cascade:
+        for r in comp.recordings:
+            index_recording(r)
+
+
+def index_recording(rec: models.music.Recording):
+    index.add(RECORDING, rec.id, *recording_text(rec))
+
+
+def collect_ids(obj) -> Dict[str, List[int]]:
+    """
+    Собирает ID сущности и всех ее потомков (до удаления, пока связи доступны).
+    """
+    ids: Dict[str, List[int]] = {kind: [] for kind in KINDS}
+
+    def _rec(r):
+        ids[RECORDING].append(r.id)
+
+    def _comp(c):
+        ids[COMPOSITION].append(c.id)
+        for r in c.recordings:
+            _rec(r)
+
+    def _work(w):
+        ids[WORK].append(w.id)
+        for c in w.compositions:
+            _comp(c)
+
+    if isinstance(obj, models.music.Composer):
+        ids[COMPOSER].append(obj.id)
+        for w in obj.works:
+            _work(w)
+    elif isinstance(obj, models.music.Work):
+        _work(obj)
+    elif isinstance(obj, models.music.Composition):
+        _comp(obj)
+    elif isinstance(obj, models.music.Recording):
+        _rec(obj)
+    return ids
+
+
+def remove_ids(ids: Dict[str, List[int]]):
+    for kind, obj_ids in ids.items():
+        for obj_id in obj_ids:
+            index.remove(kind, obj_id)
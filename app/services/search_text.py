@@ -0,0 +1,78 @@
+"""
+Денормализованный поисковый текст сущностей каталога.
+
+search_text — нормализованный (normalize_text_smart) текст собственных полей
+сущности, search_text_compact — он же без пробелов (kv 525 -> kv525).
+Оба поля заполняются в crud_music при создании/изменении и командой
+python -m app.tools.backfill_search_text, поэтому поиск и проверка дубликатов
+читают готовые строки, а не прогоняют регулярные выражения по всему каталогу.
+"""
+from typing import Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils import normalize_text_smart
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def composer_fields(c: models.music.Composer) -> List[Optional[str]]:
+    return [c.name_ru, c.original_name]
+
+
+def work_fields(w: models.music.Work) -> List[Optional[str]]:
+    return [w.name_ru, w.original_name, w.nickname, w.catalog_number, str(w.publication_year or '')]
+
+
+def composition_fields(c: models.music.Composition) -> List[Optional[str]]:
+    return [c.title_ru, c.title_original, c.catalog_number]
+
+
+def recording_fields(r: models.music.Recording) -> List[Optional[str]]:
+    return [r.performers, r.conductor, r.lead_performer, r.publisher, str(r.recording_year or '')]
+
+
+_FIELDS = {
+    models.music.Composer: composer_fields,
+    models.music.Work: work_fields,
+    models.music.Composition: composition_fields,
+    models.music.Recording: recording_fields,
+}
+
+
+def build(fields: Iterable[Optional[str]]) -> str:
+    return normalize_text_smart(" ".join([f for f in fields if f]))
+
+
+def compact(text: Optional[str]) -> str:
+    return (text or "").replace(" ", "")
+
+
+def fill(obj) -> None:
+    """Пересчитывает search_text и search_text_compact (до commit)."""
+    obj.search_text = build(_FIELDS[type(obj)](obj))
+    obj.search_text_compact = compact(obj.search_text)
+
+
+def backfill(db: Session, only_missing: bool = True) -> int:
+    """
+    Заполняет поисковый текст для всего каталога пачками.
+    Возвращает количество обновленных строк.
+    """
+    updated = 0
+    for model in _FIELDS:
+        last_id = 0
+        while True:
+            query = db.query(model).filter(model.id > last_id)
+            if only_missing:
+                query = query.filter(model.search_text.is_(None))
+            batch = query.order_by(model.id).limit(BACKFILL_BATCH_SIZE).all()
+            if not batch:
+                break
+            for obj in batch:
+                fill(obj)
+            last_id = batch[-1].id
+            db.commit()
+            updated += len(batch)
+    return updated
@@ -0,0 +1,113 @@
+"""
+Хранилище аудиофайлов записей.
+
+Recording.file_path хранится как путь от корня сайта ("/static/music/...");
+бэкенд решает только, где в MUSIC_DIR лежит новый файл:
+- flat: MUSIC_DIR/<id><ext> (как было исходно);
+- cas: MUSIC_DIR/ab/cd/<sha256><ext> — адресация по содержимому (file_hash),
+  каталоги разбиты по первым байтам хэша, поэтому ни в одном из них не бывает
+  сотен тысяч файлов. Одинаковое содержимое всегда ложится в один и тот же файл.
+
+Жестких ссылок для дедупликации нет: Recording.file_hash уникален, загрузка
+того же содержимого отклоняется как дубликат еще до хранилища, поэтому двух
+записей с одним файлом не бывает. Уже существующий файл на месте cas — это
+остаток прерванного импорта с тем же содержимым, он используется повторно.
+
+Бэкенд выбирается переменной окружения AUDIO_STORAGE; перенос уже
+сохраненных файлов — python -m app.tools.migrate_storage.
+"""
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional, Type
+
+from app.core.config import AUDIO_STORAGE
+
+MUSIC_DIR = Path("static/music")
+MUSIC_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def to_file_path(path: Path) -> str:
+    return f"/{path.as_posix()}"
+
+
+def resolve(file_path: str) -> Path:
+    """Recording.file_path -> путь на диске (относительно рабочего каталога)."""
+    return Path(file_path.lstrip("/"))
+
+
+class Storage(ABC):
+    name = ""
+
+    def __init__(self, root: Path = MUSIC_DIR):
+        self.root = root
+
+    @abstractmethod
+    def path_for(self, recording_id: int, file_hash: Optional[str], ext: str) -> Path:
+        """Место нового файла записи в self.root."""
+
+    def resolve(self, file_path: str) -> Path:
+        return resolve(file_path)
+
+    def store(self, src: Path, recording_id: int, file_hash: Optional[str], move: bool = True) -> Path:
+        """
+        Кладет файл на его место и возвращает путь. move=True — атомарный os.replace
+        (src на той же файловой системе), иначе копия через временный файл рядом.
+        """
+        dest = self.path_for(recording_id, file_hash, Path(src).suffix.lower())
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            os.replace(src, dest)
+            return dest
+        temp_path = dest.with_name(f".{uuid.uuid4().hex}{dest.suffix}")
+        try:
+            shutil.copyfile(src, temp_path)
+            os.replace(temp_path, dest)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return dest
+
+
+class FlatStorage(Storage):
+    name = "flat"
+
+    def path_for(self, recording_id: int, file_hash: Optional[str], ext: str) -> Path:
+        return self.root / f"{recording_id}{ext}"
+
+
+class ContentAddressedStorage(Storage):
+    name = "cas"
+
+    def path_for(self, recording_id: int, file_hash: Optional[str], ext: str) -> Path:
+        if not file_hash:
+            raise ValueError("Content-addressed storage requires file_hash")
+        return self.root / file_hash[:2] / file_hash[2:4] / f"{file_hash}{ext}"
+
+    def store(self, src: Path, recording_id: int, file_hash: Optional[str], move: bool = True) -> Path:
+        dest = self.path_for(recording_id, file_hash, Path(src).suffix.lower())
+        if dest.exists():
+            # Остаток прерванного импорта с тем же содержимым: второй копии не делаем
+            if move:
+                Path(src).unlink(missing_ok=True)
+            return dest
+        return super().store(src, recording_id, file_hash, move)
+
+
+BACKENDS: Dict[str, Type[Storage]] = {
+    FlatStorage.name: FlatStorage,
+    ContentAddressedStorage.name: ContentAddressedStorage,
+}
+
+_storage: Optional[Storage] = None
+
+
+def get_storage(name: Optional[str] = None) -> Storage:
+    """Бэкенд по имени; без имени — настроенный в AUDIO_STORAGE (создается один раз)."""
+    global _storage
+    if name is not None:
+        return BACKENDS[name]()
+    if _storage is None:
+        _storage = BACKENDS[AUDIO_STORAGE]()
+    return _storage
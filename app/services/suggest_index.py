@@ -0,0 +1,240 @@
+"""
+Префиксный индекс для подсказок поиска (/api/search/suggest).
+
+Ключи (нормализованные имена композиторов, названия и прозвища произведений,
+каталожные номера) хранятся в отсортированном массиве, префикс ищется двумя
+bisect. Для префиксов с большим диапазоном (одна-две буквы) top-k по
+популярности кэшируется, кэш сбрасывается точечно при изменении сущности.
+Популярность — количество записей (у композитора — по всем произведениям).
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.utils import normalize_text_smart, switch_keyboard_layout
+
+COMPOSER = "composer"
+WORK = "work"
+
+MAX_LIMIT = 20
+# Диапазоны длиннее этого не сканируются на каждый запрос, а кэшируются
+SCAN_LIMIT = 500
+
+_PREFIX_END = "￿"
+
+EntryKey = Tuple[str, int]  # (kind, id)
+
+
+@dataclass
+class Entry:
+    kind: str
+    id: int
+    slug: Optional[str]
+    title: str
+    subtitle: Optional[str]
+    popularity: int
+    keys: Set[str] = field(default_factory=set)
+
+
+def make_keys(texts: List[Optional[str]]) -> Set[str]:
+    """
+    Ключи для префиксного поиска: нормализованный текст с начала каждого слова
+    ("лунная соната" -> "лунная соната", "соната") и вариант без пробелов (kv525).
+    """
+    keys = set()
+    for text in texts:
+        words = normalize_text_smart(text).split()
+        for i in range(len(words)):
+            keys.add(" ".join(words[i:]))
+        if len(words) > 1:
+            keys.add("".join(words))
+    return keys
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.ready = False
+        self._entries: Dict[EntryKey, Entry] = {}
+        self._keys: List[Tuple[str, str, int]] = []  # (ключ, kind, id), отсортирован
+        self._top_cache: Dict[str, List[EntryKey]] = {}
+
+    # --- Изменение ---
+
+    def put(self, entry: Entry):
+        with self._lock:
+            self._remove_locked((entry.kind, entry.id))
+            self._entries[(entry.kind, entry.id)] = entry
+            for key in entry.keys:
+                insort(self._keys, (key, entry.kind, entry.id))
+            self._invalidate(entry.keys)
+
+    def remove(self, kind: str, obj_id: int):
+        with self._lock:
+            self._remove_locked((kind, obj_id))
+
+    def _remove_locked(self, entry_key: EntryKey):
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            item = (key, entry.kind, entry.id)
+            pos = bisect_left(self._keys, item)
+            if pos < len(self._keys) and self._keys[pos] == item:
+                del self._keys[pos]
+        self._invalidate(entry.keys)
+
+    def _invalidate(self, keys: Set[str]):
+        # Закэшированный префикс мог включать ключ, только если он его префикс
+        if not self._top_cache:
+            return
+        for key in keys:
+            for i in range(1, len(key) + 1):
+                self._top_cache.pop(key[:i], None)
+
+    def replace_all(self, entries: List[Entry]):
+        with self._lock:
+            self._entries = {(e.kind, e.id): e for e in entries}
+            self._keys = sorted((key, e.kind, e.id) for e in entries for key in e.keys)
+            self._top_cache = {}
+            self.ready = True
+
+    # --- Поиск ---
+
+    def _top_for_prefix(self, prefix: str) -> List[EntryKey]:
+        cached = self._top_cache.get(prefix)
+        if cached is not None:
+            return cached
+
+        lo = bisect_left(self._keys, (prefix,))
+        hi = bisect_left(self._keys, (prefix + _PREFIX_END,), lo)
+        found = {(kind, obj_id) for _, kind, obj_id in self._keys[lo:hi]}
+        top = heapq.nlargest(
+            MAX_LIMIT, found, key=lambda ek: (self._entries[ek].popularity, -self._entries[ek].id)
+        )
+        if hi - lo > SCAN_LIMIT:
+            self._top_cache[prefix] = top
+        return top
+
+    def suggest(self, q: str, limit: int = 10) -> List[Entry]:
+        prefixes = []
+        for variant in (q, switch_keyboard_layout(q)):
+            norm = normalize_text_smart(variant)
+            for prefix in (norm, norm.replace(" ", "")):
+                if prefix and prefix not in prefixes:
+                    prefixes.append(prefix)
+
+        with self._lock:
+            candidates: Dict[EntryKey, Entry] = {}
+            for prefix in prefixes:
+                for ek in self._top_for_prefix(prefix):
+                    candidates[ek] = self._entries[ek]
+        return heapq.nlargest(
+            min(limit, MAX_LIMIT), candidates.values(), key=lambda e: (e.popularity, -e.id)
+        )
+
+
+index = SuggestIndex()
+
+
+# --- Загрузка из БД ---
+
+def _composer_entries(db: Session, composer_ids: Optional[List[int]] = None) -> List[Entry]:
+    Composer, Work, Composition, Recording = (
+        models.music.Composer, models.music.Work, models.music.Composition, models.music.Recording
+    )
+    query = (
+        db.query(
+            Composer.id, Composer.slug, Composer.name_ru, Composer.name, Composer.original_name,
+            func.count(Recording.id)
+        )
+        .outerjoin(Work, Work.composer_id == Composer.id)
+        .outerjoin(Composition, Composition.work_id == Work.id)
+        .outerjoin(Recording, Recording.composition_id == Composition.id)
+        .group_by(Composer.id)
+    )
+    if composer_ids is not None:
+        query = query.filter(Composer.id.in_(composer_ids))
+    return [
+        Entry(
+            kind=COMPOSER, id=cid, slug=slug, title=name_ru, subtitle=original_name,
+            popularity=count, keys=make_keys([name_ru, name, original_name])
+        )
+        for cid, slug, name_ru, name, original_name, count in query
+    ]
+
+
+def _work_entries(db: Session, work_ids: Optional[List[int]] = None,
+                  composer_id: Optional[int] = None) -> List[Entry]:
+    Composer, Work, Composition, Recording = (
+        models.music.Composer, models.music.Work, models.music.Composition, models.music.Recording
+    )
+    query = (
+        db.query(
+            Work.id, Work.slug, Work.name_ru, Work.nickname, Work.catalog_number, Composer.name_ru,
+            func.count(Recording.id)
+        )
+        .join(Composer, Work.composer_id == Composer.id)
+        .outerjoin(Composition, Composition.work_id == Work.id)
+        .outerjoin(Recording, Recording.composition_id == Composition.id)
+        .filter(Work.name_ru != "Без сборника")
+        .group_by(Work.id)
+    )
+    if work_ids is not None:
+        query = query.filter(Work.id.in_(work_ids))
+    if composer_id is not None:
+        query = query.filter(Work.composer_id == composer_id)
+
+    entries = []
+    for wid, slug, name_ru, nickname, catalog_number, composer_name, count in query:
+        title = f"{name_ru} ({catalog_number})" if catalog_number else name_ru
+        entries.append(Entry(
+            kind=WORK, id=wid, slug=slug, title=title, subtitle=composer_name,
+            popularity=count, keys=make_keys([name_ru, nickname, catalog_number])
+        ))
+    return entries
+
+
+def build(db: Session):
+    index.replace_all(_composer_entries(db) + _work_entries(db))
+
+
+def ensure_built(db: Session):
+    if not index.ready:
+        build(db)
+
+
+# --- Инкрементальные обновления (вызываются из crud_music) ---
+
+def refresh_composer(db: Session, composer_id: int, with_works: bool = False):
+    """Перечитывает композитора (и, при переименовании, подписи его произведений)."""
+    entries = _composer_entries(db, [composer_id])
+    if with_works:
+        entries += _work_entries(db, composer_id=composer_id)
+    for entry in entries:
+        index.put(entry)
+
+
+def refresh_work(db: Session, work_id: int):
+    entries = _work_entries(db, [work_id])
+    if entries:
+        index.put(entries[0])
+    else:
+        index.remove(WORK, work_id)
+
+
+def refresh_popularity(db: Session, work_id: int, composer_id: int):
+    """Количество записей изменилось: пересчитываем произведение и композитора."""
+    refresh_work(db, work_id)
+    refresh_composer(db, composer_id)
+
+
+def remove(kind: str, obj_ids: List[int]):
+    for obj_id in obj_ids:
+        index.remove(kind, obj_id)
@@ -0,0 +1,82 @@
+"""
+Создает уменьшенные копии и LQIP (см. app.services.image_variants) для уже
+загруженных картинок: portrait_url, cover_art_url, cover_image_url, avatar_url.
+
+    python -m app.tools.backfill_image_variants              # только недостающие
+    python -m app.tools.backfill_image_variants --force      # пересоздать все
+    python -m app.tools.backfill_image_variants --workers 4
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.db.session import SessionLocal
+from app.services import image_uploads, image_variants
+
+
+def _collect_urls(force: bool) -> dict:
+    """URL -> нужен ли LQIP (есть строка с этой картинкой без него)."""
+    db = SessionLocal()
+    try:
+        urls = {}
+        for model, column in image_uploads.image_columns():
+            lqip_column = image_uploads.lqip_column(model)
+            columns = [column] if lqip_column is None else [column, lqip_column]
+            for row in db.query(*columns).filter(column.isnot(None)).distinct():
+                need_lqip = lqip_column is not None and (force or not row[1])
+                urls[row[0]] = urls.get(row[0], False) or need_lqip
+    finally:
+        db.close()
+    # Обложки частей обычно совпадают с обложкой произведения: каждый файл один раз
+    return {url: need for url, need in sorted(urls.items()) if image_variants.has_variants(url)}
+
+
+def _generate(url: str, force: bool, need_lqip: bool):
+    """В процессе пула: (число созданных файлов, LQIP или None) или текст ошибки."""
+    try:
+        created = image_variants.generate(url, force=force)
+        return created, image_variants.lqip_for_url(url) if need_lqip else None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def _store_lqip(lqips: dict):
+    db = SessionLocal()
+    try:
+        for model, column in image_uploads.image_columns():
+            lqip_column = image_uploads.lqip_column(model)
+            if lqip_column is None:
+                continue
+            for url, lqip in lqips.items():
+                db.query(model).filter(column == url).update({lqip_column: lqip}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Уменьшенные копии и LQIP картинок каталога")
+    parser.add_argument("--force", action="store_true", help="Пересоздать и существующие копии и LQIP")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    args = parser.parse_args()
+
+    urls = _collect_urls(args.force)
+    created = failed = 0
+    lqips = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = pool.map(_generate, urls, [args.force] * len(urls), urls.values(), chunksize=8)
+        for url, result in zip(urls, results):
+            if isinstance(result, str):
+                failed += 1
+                print(f"[ERROR] {url}: {result}")
+                continue
+            created += result[0]
+            if result[1]:
+                lqips[url] = result[1]
+    if lqips:
+        _store_lqip(lqips)
+    print(f"Checked {len(urls)} images: created {created} variants, {len(lqips)} LQIP, failed {failed}")
+
+
+if __name__ == "__main__":
+    main()
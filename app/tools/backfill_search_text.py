@@ -0,0 +1,27 @@
+"""
+Пересчитывает search_text / search_text_compact для всего каталога.
+
+    python -m app.tools.backfill_search_text             # все строки
+    python -m app.tools.backfill_search_text --missing   # только незаполненные
+"""
+import argparse
+
+from app.db.session import SessionLocal
+from app.services import search_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заполняет поисковый текст каталога")
+    parser.add_argument("--missing", action="store_true", help="Только строки без search_text")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        updated = search_text.backfill(db, only_missing=args.missing)
+    finally:
+        db.close()
+    print(f"Updated search text for {updated} rows")
+
+
+if __name__ == "__main__":
+    main()
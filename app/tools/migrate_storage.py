@@ -0,0 +1,127 @@
+"""
+Переносит файлы записей в раскладку другого бэкенда хранилища и переписывает
+Recording.file_path пачками (см. app.services.storage).
+
+    python -m app.tools.migrate_storage --to cas              # MUSIC_DIR/ab/cd/<sha256><ext>
+    python -m app.tools.migrate_storage --to flat --batch 200
+    python -m app.tools.migrate_storage --to cas --dry-run
+
+Каждая пачка: файлы переносятся (os.replace в пределах MUSIC_DIR), затем
+новые пути коммитятся одной транзакцией. Повторный запуск безопасен: если
+файл уже лежит на новом месте, а старого нет (прерванный прогон), обновляется
+только file_path. После переноса задайте AUDIO_STORAGE и перезапустите сервер.
+"""
+import argparse
+import os
+from pathlib import Path
+
+from app import models
+from app.db.session import SessionLocal
+from app.services import audio_processor, storage
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _library_prefix() -> str:
+    return storage.to_file_path(storage.MUSIC_DIR) + "/"
+
+
+def migrate(target_name: str, batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False) -> dict:
+    target = storage.get_storage(target_name)
+    Recording = models.music.Recording
+    stats = {"moved": 0, "already": 0, "missing": 0, "hashed": 0}
+
+    if not dry_run:
+        _resume_interrupted(target)
+
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            batch = (
+                db.query(Recording)
+                .filter(Recording.id > last_id, Recording.file_path.startswith(_library_prefix()))
+                .order_by(Recording.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            moved = []
+            try:
+                for rec in batch:
+                    src = storage.resolve(rec.file_path)
+                    if not src.is_file():
+                        stats["missing"] += 1
+                        continue
+                    try:
+                        dest = target.path_for(rec.id, rec.file_hash, src.suffix.lower())
+                    except ValueError:
+                        # Старая запись без хэша, а бэкенду он нужен
+                        rec.file_hash = audio_processor.calculate_file_hash(src)
+                        stats["hashed"] += 1
+                        dest = target.path_for(rec.id, rec.file_hash, src.suffix.lower())
+                    if dest == src:
+                        stats["already"] += 1
+                        continue
+                    if not dry_run:
+                        dest.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(src, dest)
+                        moved.append((dest, src))
+                    rec.file_path = storage.to_file_path(dest)
+                    stats["moved"] += 1
+
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+            except Exception:
+                # Пачка не записана в БД: возвращаем ее файлы на старые места
+                db.rollback()
+                for dest, src in moved:
+                    os.replace(dest, src)
+                raise
+            print(f"... up to recording {last_id}: {stats}")
+    finally:
+        db.close()
+    return stats
+
+
+def _resume_interrupted(target: storage.Storage):
+    """Пути в БД, файлы которых уже перенесены прерванным прогоном."""
+    Recording = models.music.Recording
+    db = SessionLocal()
+    try:
+        fixed = 0
+        for rec in db.query(Recording).filter(Recording.file_path.startswith(_library_prefix())):
+            src = storage.resolve(rec.file_path)
+            if src.exists() or not rec.file_hash:
+                continue
+            dest = target.path_for(rec.id, rec.file_hash, Path(rec.file_path).suffix.lower())
+            if dest.is_file():
+                rec.file_path = storage.to_file_path(dest)
+                fixed += 1
+        db.commit()
+        if fixed:
+            print(f"Fixed {fixed} paths left by an interrupted run")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Переносит аудиофайлы в другую раскладку хранилища")
+    parser.add_argument("--to", choices=sorted(storage.BACKENDS), required=True, help="Целевой бэкенд")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH_SIZE, help="Записей в одной транзакции")
+    parser.add_argument("--dry-run", action="store_true", help="Только посчитать, ничего не переносить")
+    args = parser.parse_args()
+
+    stats = migrate(args.to, args.batch, args.dry_run)
+    print(f"Done: {stats}")
+    if not args.dry_run:
+        print(f"Set AUDIO_STORAGE={args.to} and restart the server")
+
+
+if __name__ == "__main__":
+    main()
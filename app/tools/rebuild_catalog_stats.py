@@ -0,0 +1,23 @@
+"""
+Пересчитывает счетчики главной страницы (catalog_stats) по каталогу.
+
+    python -m app.tools.rebuild_catalog_stats
+"""
+from app.db.session import SessionLocal
+from app.services import catalog_stats
+
+
+def main():
+    db = SessionLocal()
+    try:
+        before = catalog_stats.get(db)
+        after = catalog_stats.rebuild(db)
+    finally:
+        db.close()
+    for field in catalog_stats.FIELDS:
+        mark = "" if before[field] == after[field] else f" (was {before[field]})"
+        print(f"{field}: {after[field]}{mark}")
+
+
+if __name__ == "__main__":
+    main()
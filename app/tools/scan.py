@@ -0,0 +1,274 @@
+"""
+Сканирует каталог с аудиофайлами (например, NAS) и заносит их в библиотеку без HTTP.
+
+    python -m app.tools.scan /mnt/masters                      # только отчет
+    python -m app.tools.scan /mnt/masters/mozart --work 12     # + записи (папка = альбом)
+    python -m app.tools.scan /mnt/x/file.flac --composition 7 --performers "..."
+    python -m app.tools.scan /mnt/masters/mozart --work 12 --tags   # исполнители, год, лейбл из тегов
+
+Обход дерева идет параллельно в потоках (os.scandir, stat берется при обходе).
+Манифест (таблица scan_manifest: путь, размер, mtime, хэш) позволяет не хэшировать
+повторно файлы, у которых не изменились размер и mtime, поэтому повторный
+скан большого дерева сводится к обходу и сравнению со словарем.
+Новые и измененные файлы хэшируются и читаются mutagen в пуле процессов.
+
+В манифест попадают только файлы, которые уже есть в библиотеке: импортированные
+этим запуском или совпавшие по хэшу с существующей записью. Поэтому запуск
+"только отчет" ничего не запоминает, и следующий запуск с --work увидит те же
+файлы как new и создаст для них записи.
+
+Отчет: new / changed / duplicate (file_hash уже есть в базе или в этом скане) /
+missing (был в манифесте, но исчез с диска).
+Записи создаются одной транзакцией через crud.music.create_recordings_bulk, файл
+копируется в библиотеку (app.services.storage). Запущенный сервер держит индексы в памяти и увидит
+новые записи после перезапуска.
+"""
+import argparse
+import mimetypes
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, insert
+
+from app import crud, models, schemas
+from app.db.session import SessionLocal
+from app.services import audio_processor, audio_tags, bulk_import
+
+WALK_THREADS = 16
+BATCH_SIZE = 500
+
+NEW = "new"
+CHANGED = "changed"
+DUPLICATE = "duplicate"
+MISSING = "missing"
+UNCHANGED = "unchanged"
+
+
+def _is_audio(name: str) -> bool:
+    content_type = mimetypes.guess_type(name)[0]
+    return bool(content_type) and content_type.startswith("audio/")
+
+
+def _scan_dir(path: str) -> Tuple[List[Tuple[str, int, int]], List[str]]:
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                    elif entry.is_file() and _is_audio(entry.name):
+                        st = entry.stat()
+                        files.append((entry.path, st.st_size, st.st_mtime_ns))
+                except OSError as e:
+                    print(f"[ERROR] {entry.path}: {e}")
+    except OSError as e:
+        print(f"[ERROR] {path}: {e}")
+    return files, dirs
+
+
+def walk(root: str, threads: int = WALK_THREADS) -> Dict[str, Tuple[int, int]]:
+    """Параллельный обход: {путь: (размер, mtime_ns)} для всех аудиофайлов под root."""
+    if os.path.isfile(root):
+        st = os.stat(root)
+        return {root: (st.st_size, st.st_mtime_ns)}
+
+    found = {}
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending = {executor.submit(_scan_dir, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, dirs = future.result()
+                for path, size, mtime_ns in files:
+                    found[path] = (size, mtime_ns)
+                pending.update(executor.submit(_scan_dir, d) for d in dirs)
+    return found
+
+
+def _load_manifest(db, root: str) -> Dict[str, models.ScanManifestEntry]:
+    Entry = models.ScanManifestEntry
+    query = db.query(Entry)
+    if os.path.isdir(root):
+        prefix = root.rstrip(os.sep) + os.sep
+        query = query.filter(Entry.path.startswith(prefix, autoescape=True))
+    else:
+        query = query.filter(Entry.path == root)
+    return {e.path: e for e in query}
+
+
+def _save_manifest(db, rows: List[dict]):
+    """Перезаписывает строки манифеста пачками (delete + executemany insert)."""
+    Entry = models.ScanManifestEntry
+    for i in range(0, len(rows), BATCH_SIZE):
+        batch = rows[i:i + BATCH_SIZE]
+        db.execute(delete(Entry).where(Entry.path.in_([r["path"] for r in batch])))
+        db.execute(insert(Entry), batch)
+    db.commit()
+
+
+def _probe(path: str):
+    """В процессе пула: None, если файл не удалось прочитать."""
+    try:
+        return audio_processor.probe_file(path)
+    except OSError as e:
+        print(f"[ERROR] {path}: {e}")
+        return None
+
+
+def _create_recordings(db, entries: List[dict], args) -> int:
+    """Сопоставляет файлы с частями и создает записи; entry получает recording_id."""
+    values = {"performers": args.performers, "conductor": args.conductor, "recording_year": args.year,
+              "publisher": args.publisher}
+    if args.composition:
+        for entry in entries:
+            entry["composition_id"] = args.composition
+    else:
+        work = crud.music.get_work(db, args.work)
+        # Каждая папка — отдельный альбом: сопоставление по порядку/трекам внутри папки
+        by_dir = defaultdict(list)
+        for entry in entries:
+            by_dir[os.path.dirname(entry["path"])].append(entry)
+        for group in by_dir.values():
+            bulk_import.match_compositions(group, work.compositions, args.match)
+
+    items = []
+    for entry in entries:
+        if entry.get("composition_id") and not entry.get("status"):
+            proposed = audio_tags.propose(entry.get("tags")) if args.tags else {}
+            items.append({**entry, "rec_in": schemas.RecordingCreate(**audio_tags.fill_missing(values, proposed))})
+        elif entry.get("status") == bulk_import.UNMATCHED:
+            print(f"UNMATCHED  {entry['path']}")
+
+    copied = []
+
+    def place_file(recording, item) -> str:
+        final_path = audio_processor.copy_into_library(Path(item["path"]), recording.id, item["file_hash"])
+        copied.append(final_path)
+        return f"/{final_path.as_posix()}"
+
+    try:
+        created = crud.music.create_recordings_bulk(db, items, place_file)
+    except Exception:
+        for final_path in copied:
+            final_path.unlink(missing_ok=True)
+        raise
+    for recording, item in zip(created, items):
+        item["entry"]["recording_id"] = recording.id
+    return len(created)
+
+
+def scan(root: str, args) -> Dict[str, List[str]]:
+    started = time.monotonic()
+    root = os.path.abspath(root)
+    report = {NEW: [], CHANGED: [], DUPLICATE: [], MISSING: [], UNCHANGED: []}
+
+    db = SessionLocal()
+    try:
+        manifest = _load_manifest(db, root)
+        on_disk = walk(root, args.threads)
+        print(f"Walked {len(on_disk)} audio files in {time.monotonic() - started:.1f}s")
+
+        known_hashes = {h for (h,) in db.query(models.music.Recording.file_hash).filter(
+            models.music.Recording.file_hash.isnot(None))}
+
+        report[MISSING] = sorted(set(manifest) - set(on_disk))
+        to_hash = []
+        for path, (size, mtime_ns) in on_disk.items():
+            known = manifest.get(path)
+            if (known is not None and known.size == size and known.mtime_ns == mtime_ns
+                    and known.file_hash in known_hashes):
+                report[UNCHANGED].append(path)
+            else:
+                # Новый, измененный или его запись удалена из библиотеки
+                to_hash.append(path)
+
+        # Хэш + длительность + теги в пуле процессов
+        probes = {}
+        if to_hash:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                chunksize = max(1, len(to_hash) // (args.workers * 4))
+                for path, probe in zip(to_hash, pool.map(_probe, to_hash, chunksize=chunksize)):
+                    if probe is not None:
+                        probes[path] = probe
+
+        # Хэши файлов, оставшихся на своих местах (для дубликатов внутри дерева)
+        seen_hashes = {manifest[p].file_hash for p in report[UNCHANGED]}
+
+        rows, fresh = [], []
+        for path in sorted(probes):
+            probe = probes[path]
+            size, mtime_ns = on_disk[path]
+            previous = manifest.get(path)
+            row = {"path": path, "size": size, "mtime_ns": mtime_ns, "file_hash": probe["file_hash"],
+                   "recording_id": previous.recording_id if previous else None}
+            rows.append(row)
+
+            in_library = previous is not None and previous.file_hash in known_hashes
+            if in_library and previous.file_hash == probe["file_hash"]:
+                report[UNCHANGED].append(path)  # тронут только mtime
+            elif in_library:
+                report[CHANGED].append(path)
+            elif probe["file_hash"] in known_hashes or probe["file_hash"] in seen_hashes:
+                report[DUPLICATE].append(path)
+            else:
+                report[NEW].append(path)
+                fresh.append({"path": path, "name": os.path.basename(path), "entry": row, **probe})
+            seen_hashes.add(probe["file_hash"])
+
+        if fresh and (args.work or args.composition) and not args.dry_run:
+            print(f"Created {_create_recordings(db, fresh, args)} recordings")
+            known_hashes.update(item["file_hash"] for item in fresh if item["entry"]["recording_id"])
+        # Манифест — только файлы из библиотеки (new без импорта и changed проверятся снова)
+        rows = [row for row in rows if row["file_hash"] in known_hashes]
+        if rows and not args.dry_run:
+            _save_manifest(db, rows)
+    finally:
+        db.close()
+
+    print(f"Scanned in {time.monotonic() - started:.1f}s")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сканирует каталог аудиофайлов и заносит их в библиотеку")
+    parser.add_argument("root", help="Каталог (или файл) для сканирования")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--work", type=int, help="Создать записи для частей произведения (по порядку/трекам)")
+    target.add_argument("--composition", type=int, help="Создать записи для одной части")
+    parser.add_argument("--match", choices=[bulk_import.AUTO, bulk_import.ORDER, bulk_import.TRACK],
+                        default=bulk_import.AUTO)
+    parser.add_argument("--performers")
+    parser.add_argument("--conductor")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--publisher")
+    parser.add_argument("--tags", action="store_true", help="Заполнить пустые поля записей из тегов файлов")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Процессы для хэширования")
+    parser.add_argument("--threads", type=int, default=WALK_THREADS, help="Потоки для обхода каталогов")
+    parser.add_argument("--dry-run", action="store_true", help="Ничего не записывать в базу")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Печатать и новые файлы")
+    args = parser.parse_args()
+
+    if args.work:
+        db = SessionLocal()
+        try:
+            if not crud.music.get_work(db, args.work):
+                parser.error(f"Work {args.work} not found")
+        finally:
+            db.close()
+
+    report = scan(args.root, args)
+    for status in (CHANGED, DUPLICATE, MISSING) + ((NEW,) if args.verbose else ()):
+        for path in report[status]:
+            print(f"{status.upper():<10} {path}")
+    print(", ".join(f"{status}: {len(paths)}" for status, paths in report.items()))
+
+
+if __name__ == "__main__":
+    main()
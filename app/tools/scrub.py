@@ -0,0 +1,42 @@
+"""
+Проверяет хранилище: пропавшие и поврежденные аудиофайлы, битые ссылки на
+картинки, осиротевшие файлы (см. app.services.scrubber).
+
+    python -m app.tools.scrub                      # продолжит прерванный прогон
+    python -m app.tools.scrub --restart            # с начала
+    python -m app.tools.scrub --quarantine         # осиротевшие файлы -> карантин
+    python -m app.tools.scrub --max-mb-per-sec 20 --workers 2
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.config import SCRUB_MAX_MB_PER_SEC
+from app.services import scrubber
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка целостности хранилища")
+    parser.add_argument("--quarantine", action="store_true", help="Перенести осиротевшие файлы в карантин")
+    parser.add_argument("--restart", action="store_true", help="Не продолжать с контрольной точки")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--max-mb-per-sec", type=float, default=SCRUB_MAX_MB_PER_SEC,
+                        help="Общий лимит чтения (0 = без лимита)")
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        summary = scrubber.scrub(
+            pool, args.workers, args.max_mb_per_sec, quarantine=args.quarantine, restart=args.restart,
+            progress=lambda value: print(f"... {value:.0%}"),
+        )
+    for key in (scrubber.MISSING, scrubber.CORRUPT, scrubber.ORPHANED):
+        for item in summary[f"{key}_files"]:
+            print(f"{key.upper():<10} {json.dumps(item, ensure_ascii=False)}")
+    print(f"Checked {summary['checked']} recordings: missing {summary[scrubber.MISSING]}, "
+          f"corrupt {summary[scrubber.CORRUPT]}, orphaned {summary[scrubber.ORPHANED]}")
+    print(f"Full report: {scrubber.REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,20 @@
 from slugify import slugify
 from sqlalchemy.orm import Session
-from typing import Type
+from typing import Type, Optional, Tuple
 import uuid
 import os
+import re
 import shutil
 from pathlib import Path
-from fastapi import UploadFile
 from PIL import Image, ImageOps
 
+from app.core.config import IMAGE_MAX_PIXELS
+from app.services import image_variants
+
 COVERS_DIR = Path("static/covers")
 COVERS_DIR.mkdir(parents=True, exist_ok=True)
+# Папки картинок в COVERS_DIR (recordings — обложки из аудио, см. audio_processor)
+IMAGE_SUBFOLDERS = ("composers", "works", "compositions", "recordings", "playlists", "avatars", "blog", "blog_images")
 
 def generate_unique_slug(db: Session, model: Type, base_text: str, old_slug: str = None) -> str:
     """
@@ -31,34 +36,79 @@ def generate_unique_slug(db: Session, model: Type, base_text: str, old_slug: str
     return slug
 
 
-def save_upload_file(upload_file: UploadFile, subfolder: str, prefix: str) -> str:
-    """
-    Сохраняет файл с сжатием и изменением размера (через Pillow).
-    """
+class ImageRejected(ValueError):
+    """Картинка отклонена до декодирования (не картинка, слишком много пикселей)."""
+
+
+# Защита от "бомб": Pillow сам откажется открывать картинки больше 2x этого порога
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+MAX_IMAGE_SIZE = (1200, 1200)
 
+
+def new_image_path(subfolder: str, prefix: str) -> Tuple[Path, str]:
+    """Путь и URL для новой картинки в static/covers/<subfolder>."""
     folder = COVERS_DIR / subfolder
     folder.mkdir(parents=True, exist_ok=True)
-
     filename = f"{prefix}_{uuid.uuid4()}.jpg"
-    file_path = folder / filename
+    return folder / filename, f"/static/covers/{subfolder}/{filename}"
+
 
+def open_image(src) -> Image.Image:
+    """Открывает картинку (читается только заголовок) и проверяет бюджет пикселей."""
     try:
-        image = Image.open(upload_file.file)
+        image = Image.open(src)
+    except Image.UnidentifiedImageError:
+        raise ImageRejected("Not an image file")
+    except Image.DecompressionBombError:
+        raise ImageRejected("Image is too large")
+    if image.width * image.height > IMAGE_MAX_PIXELS:
+        image.close()
+        raise ImageRejected(f"Image is too large: {image.width}x{image.height}")
+    return image
+
+
+def process_image(src, file_path: Path, url: str) -> str:
+    """
+    Сжатие и изменение размера (через Pillow), уменьшенные копии для srcset
+    (см. app.services.image_variants). Выполняется и в пуле процессов.
+    Возвращает LQIP картинки.
+    """
+    with open_image(src) as image:
+        # JPEG декодируется сразу в уменьшенном масштабе, а не в полном размере
+        image.draft("RGB", MAX_IMAGE_SIZE)
         image = ImageOps.exif_transpose(image)
-        if image.mode in ("RGBA", "P"):
+        if image.mode not in ("RGB", "L"):
             image = image.convert("RGB")
 
-        max_size = (1200, 1200)
-        image.thumbnail(max_size, Image.Resampling.LANCZOS)
-        image.save(file_path, format="JPEG", quality=80, optimize=True)
+        image.thumbnail(MAX_IMAGE_SIZE, Image.Resampling.LANCZOS)
+        temp_path = file_path.with_name(f".{uuid.uuid4().hex}")
+        image.save(temp_path, format="JPEG", quality=80, optimize=True)
+        os.replace(temp_path, file_path)
 
+    try:
+        image_variants.generate(url, image)
+    except Exception as e:
+        print(f"Error creating image variants: {e}")
+    return image_variants.lqip(image)
+
+
+def save_image_file(fileobj, subfolder: str, prefix: str) -> str:
+    """
+    Синхронно сохраняет уже открытый файл (например, обложку, извлеченную из тегов
+    аудио, в фоновой задаче). Загрузки из запросов идут через app.services.image_uploads.
+    """
+    file_path, url = new_image_path(subfolder, prefix)
+    try:
+        process_image(fileobj, file_path, url)
+    except ImageRejected:
+        raise
     except Exception as e:
         print(f"Error compressing image: {e}")
-        upload_file.file.seek(0)
+        fileobj.seek(0)
         with file_path.open("wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
-
-    return f"/static/covers/{subfolder}/{filename}"
+            shutil.copyfileobj(fileobj, buffer)
+    return url
 
 
 def delete_file_by_url(url: str):
@@ -66,6 +116,7 @@ def delete_file_by_url(url: str):
     if not url: return
 
     clean_path = url.lstrip("/")
+    image_variants.delete(url)
 
     try:
         if os.path.exists(clean_path):
@@ -88,4 +139,22 @@ def switch_keyboard_layout(text: str) -> str:
     if any("а" <= char.lower() <= "я" for char in text):
         return text.translate(trans_table_ru_to_en)
     else:
-        return text.translate(trans_table_en_to_ru)
\ No newline at end of file
+        return text.translate(trans_table_en_to_ru)
+
+
+def normalize_text_smart(text: Optional[str]) -> str:
+    """
+    1. Приводит к нижнему регистру.
+    2. Вставляет пробелы между буквами и цифрами (kv525 -> kv 525).
+    3. Удаляет лишние спецсимволы.
+    """
+    if not text:
+        return ""
+    text = text.lower()
+    # Вставляем пробел между буквой и цифрой (kv525 -> kv 525)
+    text = re.sub(r'([a-zа-яё])(\d)', r'\1 \2', text)
+    # Вставляем пробел между цифрой и буквой (525kv -> 525 kv)
+    text = re.sub(r'(\d)([a-zа-яё])', r'\1 \2', text)
+    # Заменяем все не-буквы и не-цифры на пробелы
+    text = re.sub(r'[^\w\d]+', ' ', text)
+    return text.strip()
@@ -1742,6 +1742,10 @@ function addEventListeners() {
         "source_url",
         document.getElementById("add-recording-source-url").value || ""
       );
+      fd.append(
+        "extract_tags",
+        document.getElementById("add-recording-extract-tags").checked
+      );
       fd.append("file", file);
 
       handleCreateEntity(
@@ -3149,6 +3153,15 @@ function handleSelectionToggle(row) {
   );
 }
 
+async function waitForJob(jobId, intervalMs = 1000) {
+  for (;;) {
+    const job = await apiRequest(`/api/jobs/${jobId}`);
+    if (job.status === "done") return job;
+    if (job.status === "failed") throw new Error(job.error || "Ошибка обработки");
+    await new Promise((r) => setTimeout(r, intervalMs));
+  }
+}
+
 async function handleCreateEntity(btn, url, data, modalId, successMsg) {
   if (btn.disabled) return;
   const txt = btn.textContent;
@@ -3156,7 +3169,12 @@ async function handleCreateEntity(btn, url, data, modalId, successMsg) {
   btn.textContent = "Сохранение...";
   btn.classList.add("opacity-50");
   try {
-    await apiRequest(url, "POST", data);
+    const res = await apiRequest(url, "POST", data);
+    // Загрузка аудио обрабатывается в фоне: сервер вернул задачу, ждем ее завершения
+    if (res && res.status && res.kind && res.id) {
+      btn.textContent = "Обработка...";
+      await waitForJob(res.id);
+    }
     ui.showNotification(successMsg, "success");
     document.getElementById(modalId).classList.add("hidden");
     loadCurrentView();
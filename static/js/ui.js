@@ -300,6 +300,18 @@ function getLocalizedText(entity, field, lang) {
   return entity[ruField] || "";
 }
 
+// srcset/sizes для <img> по полю *_srcset из API (уменьшенные копии в WebP)
+function srcsetAttrs(srcset, sizes) {
+  if (!srcset) return "";
+  return `srcset="${srcset.webp}" sizes="${sizes}"`;
+}
+
+// Размытое превью (*_lqip из API) фоном <img>, пока грузится сама картинка
+function lqipStyle(lqip) {
+  if (!lqip) return "";
+  return `style="background-image: url('${lqip}'); background-size: cover;"`;
+}
+
 function getElements() {
   return {
     authView: document.getElementById("auth-view"),
@@ -524,7 +536,7 @@ export function renderDashboard(data, lang = "ru") {
               c.id
             }" data-navigo class="snap-start shrink-0 w-72 md:w-80 group bg-white rounded-xl overflow-hidden shadow-sm hover:shadow-xl transition-all duration-300 border border-gray-100 flex flex-col h-auto hover:-translate-y-1">
                 <div class="relative aspect-video overflow-hidden bg-gray-100">
-                    <img src="${cover}" class="w-full h-full object-cover group-hover:scale-110 transition-transform duration-700" loading="lazy">
+                    <img src="${cover}" ${srcsetAttrs(c.cover_image_srcset, "(min-width: 768px) 320px, 288px")} ${lqipStyle(c.cover_image_lqip)} class="w-full h-full object-cover group-hover:scale-110 transition-transform duration-700" loading="lazy">
                     <div class="absolute inset-0 bg-black/40 opacity-0 group-hover:opacity-100 transition-opacity flex items-center justify-center backdrop-blur-[2px]">
                         <button onclick="event.preventDefault(); event.stopPropagation(); window.playPlaylistFromCard('${
                           c.id
@@ -666,7 +678,7 @@ export function renderDashboard(data, lang = "ru") {
               item.slug || item.id
             }" data-navigo class="snap-start shrink-0 w-44 md:w-56 group bg-white rounded-xl overflow-hidden shadow-sm hover:shadow-xl transition-all duration-300 border border-gray-100 flex flex-col hover:-translate-y-1 h-auto">
                 <div class="relative aspect-square overflow-hidden bg-gray-100">
-                    <img src="${cover}" class="w-full h-full object-cover group-hover:scale-110 transition-transform duration-700" loading="lazy">
+                    <img src="${cover}" ${srcsetAttrs(item.cover_art_srcset, "(min-width: 768px) 224px, 176px")} ${lqipStyle(item.cover_art_lqip)} class="w-full h-full object-cover group-hover:scale-110 transition-transform duration-700" loading="lazy">
                     <div class="absolute inset-0 bg-black/40 opacity-0 group-hover:opacity-100 transition-opacity flex items-center justify-center backdrop-blur-[2px]">
                         <div class="w-12 h-12 bg-white rounded-full flex items-center justify-center text-cyan-600 shadow-lg transform scale-0 group-hover:scale-100 transition-transform duration-300">
                             <i data-lucide="play" class="w-5 h-5 ml-1 fill-current"></i>
@@ -1450,7 +1462,7 @@ export function renderWorkList(works, composer, lang = "ru") {
                class="bg-white rounded-xl overflow-hidden border border-gray-100 hover:border-cyan-400 hover:shadow-lg transition-all group flex flex-col h-full"
                title="${w.original_name || ""}">
                 <div class="aspect-square bg-gray-100 relative overflow-hidden">
-                    <img src="${cover}" class="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500" loading="lazy" alt="Обложка ${getLocalizedText(
+                    <img src="${cover}" ${srcsetAttrs(w.cover_art_srcset, "(min-width: 768px) 25vw, 50vw")} ${lqipStyle(w.cover_art_lqip)} class="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500" loading="lazy" alt="Обложка ${getLocalizedText(
             w,
             "name",
             lang
@@ -5487,7 +5499,7 @@ export function renderLibraryContent(data, type = "list", favs, reset = false) {
           return `
               <div class="group relative bg-white rounded-2xl shadow-sm border border-gray-100 hover:shadow-xl hover:-translate-y-1 transition-all duration-300 flex flex-col h-full overflow-hidden">
                   <div class="relative aspect-square overflow-hidden bg-gray-100">
-                      <img src="${cover}" class="w-full h-full object-cover transition-transform duration-700 group-hover:scale-105" loading="lazy">
+                      <img src="${cover}" ${srcsetAttrs(work.cover_art_srcset, "(min-width: 768px) 25vw, 50vw")} ${lqipStyle(work.cover_art_lqip)} class="w-full h-full object-cover transition-transform duration-700 group-hover:scale-105" loading="lazy">
                       <div class="absolute inset-0 bg-black/40 flex items-center justify-center backdrop-blur-[2px]">
     <button class="grid-work-play-btn w-12 h-12 bg-white/80 hover:bg-white text-cyan-600 rounded-full flex items-center justify-center shadow-lg transform hover:scale-110 transition-all"
             title="Выбрать исполнение"
@@ -0,0 +1,118 @@
+"""
+Общие фикстуры тестов.
+
+База — временный SQLite-файл со схемой из миграций (alembic upgrade head),
+поэтому FTS-таблицы и триггеры те же, что в рабочей базе. Рабочий каталог
+переносится во временную папку до импорта app: static/ и data/ задаются
+относительными путями.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+WORK_DIR = tempfile.mkdtemp(prefix="music-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{WORK_DIR}/test.db"
+os.environ.setdefault("SECRET_KEY", "test")
+sys.path.insert(0, str(REPO_ROOT))
+os.chdir(WORK_DIR)
+
+import pytest  # noqa: E402
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+
+
+def _migrate():
+    cfg = Config()
+    cfg.set_main_option("script_location", str(REPO_ROOT / "alembic"))
+    cfg.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"])
+    command.upgrade(cfg, "head")
+
+
+_migrate()
+
+from app import models  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.services import result_cache, search_text  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
+        # Кэш ответов не должен переживать тест
+        result_cache.bump_generation()
+
+
+@pytest.fixture
+def catalog(db):
+    """Небольшой каталог: три композитора, произведения с частями и записями."""
+    music = models.music
+    mozart = music.Composer(name="Mozart", name_ru="Моцарт", original_name="Wolfgang Amadeus Mozart",
+                            year_born=1756, year_died=1791, slug="mozart")
+    beethoven = music.Composer(name="Beethoven", name_ru="Бетховен", original_name="Ludwig van Beethoven",
+                               year_born=1770, year_died=1827, slug="beethoven")
+    bach = music.Composer(name="Bach", name_ru="Бах", original_name="Johann Sebastian Bach",
+                          year_born=1685, year_died=1750, slug="bach")
+    db.add_all([mozart, beethoven, bach])
+    db.flush()
+
+    works = {
+        "serenade": music.Work(name_ru="Маленькая ночная серенада", catalog_number="KV 525",
+                               composer_id=mozart.id, slug="serenade"),
+        "moonlight": music.Work(name_ru="Соната для фортепиано №14", nickname="Лунная",
+                                catalog_number="Op. 27 No. 2", composer_id=beethoven.id, slug="moonlight"),
+        "toccata": music.Work(name_ru="Токката и фуга ре минор", catalog_number="BWV 565",
+                              composer_id=bach.id, slug="toccata"),
+        "no_collection": music.Work(name_ru="Без сборника", composer_id=bach.id, slug="bach-no-collection"),
+    }
+    db.add_all(works.values())
+    db.flush()
+
+    parts = {
+        "serenade": ["Allegro", "Romanze"],
+        "moonlight": ["Adagio sostenuto", "Allegretto", "Presto agitato"],
+        "toccata": ["Токката", "Фуга"],
+    }
+    compositions = []
+    for key, titles in parts.items():
+        for i, title in enumerate(titles, 1):
+            compositions.append(music.Composition(title_ru=title, work_id=works[key].id, sort_order=i,
+                                                  slug=f"{key}-{i}"))
+    db.add_all(compositions)
+    db.flush()
+
+    for i, composition in enumerate(compositions):
+        db.add(music.Recording(performers="Daniel Barenboim" if i % 2 else "Berliner Philharmoniker",
+                               duration=100 + i, file_path=f"/static/music/test_{i}.mp3",
+                               file_hash=f"hash{i}", composition_id=composition.id))
+    # Поисковый текст, как его заполняет crud_music
+    for obj in list(db.new) + [mozart, beethoven, bach, *works.values(), *compositions]:
+        search_text.fill(obj)
+    db.commit()
+    return {"composers": [mozart, beethoven, bach], "works": works, "compositions": compositions}
+
+
+@pytest.fixture
+def client():
+    """TestClient без startup-хуков (пулы и фоновые потоки не запускаются), с правами админа."""
+    from fastapi.testclient import TestClient
+
+    from app.api import deps
+    from app.main import app
+
+    app.dependency_overrides[deps.get_current_active_admin] = lambda: None
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
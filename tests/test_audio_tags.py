@@ -0,0 +1,40 @@
+import os
+import time
+
+import pytest
+
+from app.services import audio_tags
+
+KEEP = "a" * 64
+DROP = "b" * 64
+FRESH = "c" * 64
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_tags, "TAGS_CACHE_DIR", tmp_path)
+    return tmp_path
+
+
+def _entry(file_hash: str, age: float):
+    paths = [audio_tags._cache_base(file_hash).with_suffix(suffix) for suffix in (".json", ".cover")]
+    for path in paths:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"{}")
+        os.utime(path, (time.time() - age, time.time() - age))
+    return paths
+
+
+def test_prune_cache_removes_entries_without_recording(cache_dir):
+    kept = _entry(KEEP, age=7200)
+    dropped = _entry(DROP, age=7200)
+    fresh = _entry(FRESH, age=10)
+
+    assert audio_tags.prune_cache({KEEP}, min_age_seconds=3600) == 2
+    assert all(p.exists() for p in kept + fresh)
+    assert not any(p.exists() for p in dropped)
+
+
+def test_prune_cache_without_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_tags, "TAGS_CACHE_DIR", tmp_path / "missing")
+    assert audio_tags.prune_cache(set()) == 0
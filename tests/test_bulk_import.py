@@ -0,0 +1,87 @@
+import io
+import zipfile
+
+from app.services import audio_processor, bulk_import
+
+
+def _zip(files: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_import_over_total_size_is_rejected(db, catalog, client, monkeypatch):
+    monkeypatch.setattr(bulk_import, "MAX_IMPORT_BYTES", 1000)
+    work = catalog["works"]["serenade"]
+    before = set(audio_processor.INCOMING_DIR.iterdir())
+
+    # Каждый файл меньше лимита, вместе — больше
+    files = [
+        ("files", ("a.zip", _zip({"01.mp3": b"x" * 600}), "application/zip")),
+        ("files", ("02.mp3", b"y" * 600, "audio/mpeg")),
+    ]
+    response = client.post(f"/api/recordings/works/{work.id}/import", files=files)
+    assert response.status_code == 413
+    assert set(audio_processor.INCOMING_DIR.iterdir()) == before
+
+
+def test_archive_over_size_is_rejected(db, catalog, client, monkeypatch):
+    monkeypatch.setattr(bulk_import, "MAX_IMPORT_BYTES", 1000)
+    work = catalog["works"]["serenade"]
+    files = [("files", ("a.zip", _zip({"01.mp3": b"x" * 1200}), "application/zip"))]
+    response = client.post(f"/api/recordings/works/{work.id}/import", files=files)
+    assert response.status_code == 413
+
+
+class _Part:
+    def __init__(self, id, sort_order):
+        self.id = id
+        self.sort_order = sort_order
+
+
+def _entry(name, track=None, disc=None, total=None):
+    tags = {}
+    if track is not None:
+        tags["tracknumber"] = f"{track}/{total}" if total else str(track)
+    if disc is not None:
+        tags["discnumber"] = str(disc)
+    return {"name": name, "tags": tags}
+
+
+PARTS = [_Part(10, 1), _Part(11, 2), _Part(12, 3), _Part(13, 4)]
+
+
+def test_match_by_natural_order():
+    entries = [_entry("10.flac"), _entry("2.flac"), _entry("1.flac")]
+    assert bulk_import.match_compositions(entries, PARTS, bulk_import.AUTO) == bulk_import.ORDER
+    assert [e["composition_id"] for e in entries] == [12, 11, 10]
+
+
+def test_match_by_track_numbers():
+    entries = [_entry("a.flac", track=2), _entry("b.flac", track=1)]
+    assert bulk_import.match_compositions(entries, PARTS, bulk_import.AUTO) == bulk_import.TRACK
+    assert [e["composition_id"] for e in entries] == [11, 10]
+
+
+def test_match_across_discs():
+    entries = [_entry("d2t1.flac", track=1, disc=2), _entry("d1t2.flac", track=2, disc=1, total=2),
+               _entry("d1t1.flac", track=1, disc=1, total=2), _entry("d2t2.flac", track=2, disc=2)]
+    assert bulk_import.match_compositions(entries, PARTS, bulk_import.TRACK) == bulk_import.TRACK
+    assert [e["composition_id"] for e in entries] == [12, 11, 10, 13]
+
+
+def test_duplicate_track_numbers_fall_back_to_order():
+    entries = [_entry("b.flac", track=1), _entry("a.flac", track=1)]
+    assert bulk_import.match_compositions(entries, PARTS, bulk_import.AUTO) == bulk_import.ORDER
+    assert [e["composition_id"] for e in entries] == [11, 10]
+
+
+def test_extra_files_are_unmatched_and_whole_work_part_is_skipped():
+    parts = [_Part(1, 0), _Part(2, 1)]
+    entries = [_entry("1.flac"), _entry("2.flac"), {"name": "x.txt", "status": bulk_import.SKIPPED}]
+    bulk_import.match_compositions(entries, parts, bulk_import.ORDER)
+    assert entries[0]["composition_id"] == 2
+    assert entries[1]["status"] == bulk_import.UNMATCHED
+    assert "composition_id" not in entries[2]
@@ -0,0 +1,80 @@
+from sqlalchemy import select
+
+from app import models
+from app.services import catalog_fts
+
+
+def _match(db, q, target):
+    subquery = catalog_fts.match_subquery(q, target)
+    return [row.id for row in db.execute(select(subquery.c.id, subquery.c.score).order_by(subquery.c.score))]
+
+
+def test_available_after_migrations(db):
+    assert catalog_fts.is_available(db)
+
+
+def test_query_variants():
+    variants = catalog_fts.query_variants("KV525")
+    assert ["kv525"] in variants and ["kv", "525"] in variants
+    assert ["kv525"] in catalog_fts.query_variants("kv 525")
+    # Запрос в неправильной раскладке
+    assert ["моцарт"] in catalog_fts.query_variants("vjwfhn")
+
+
+def test_work_matches_own_fields_and_parents(db, catalog):
+    works = catalog["works"]
+    assert _match(db, "лунная", catalog_fts.WORK) == [works["moonlight"].id]
+    # По композитору и по части
+    assert set(_match(db, "бах", catalog_fts.WORK)) == {works["toccata"].id, works["no_collection"].id}
+    assert _match(db, "romanze", catalog_fts.WORK) == [works["serenade"].id]
+
+
+def test_prefix_and_compact_catalog_number(db, catalog):
+    works = catalog["works"]
+    assert _match(db, "серен", catalog_fts.WORK) == [works["serenade"].id]
+    assert _match(db, "kv525", catalog_fts.WORK) == [works["serenade"].id]
+    assert _match(db, "bwv 565", catalog_fts.WORK) == [works["toccata"].id]
+
+
+def test_every_token_must_match(db, catalog):
+    assert _match(db, "моцарт фуга", catalog_fts.WORK) == []
+
+
+def test_recording_matches_through_work(db, catalog):
+    moonlight = catalog["works"]["moonlight"]
+    found = _match(db, "barenboim лунная", catalog_fts.RECORDING)
+    recordings = db.query(models.music.Recording).filter(models.music.Recording.id.in_(found)).all()
+    assert recordings
+    assert all(r.composition.work_id == moonlight.id and "Barenboim" in r.performers for r in recordings)
+
+
+def test_library_search_falls_back_to_substring(db, catalog):
+    from app import crud
+    works = catalog["works"]
+    # Префиксный FTS: "очная" — середина слова "ночная"
+    assert _match(db, "очная", catalog_fts.WORK) == []
+    page = crud.music.get_library_works(db, q="очная")
+    assert [w.id for w in page["items"]] == [works["serenade"].id]
+    # Найденное FTS идет как раньше, по релевантности
+    page = crud.music.get_library_works(db, q="серенада")
+    assert [w.id for w in page["items"]] == [works["serenade"].id]
+    assert crud.music.get_library_works(db, q="несуществующее")["total"] == 0
+
+
+def test_recording_list_falls_back_to_substring(db, catalog, client):
+    response = client.get("/api/recordings/", params={"q": "renboim"})
+    assert response.status_code == 200
+    performers = {r["performers"] for r in response.json()["recordings"]}
+    assert performers == {"Daniel Barenboim"}
+
+
+def test_availability_is_rechecked(db, monkeypatch):
+    monkeypatch.setattr(catalog_fts, "_available", False)
+    monkeypatch.setattr(catalog_fts, "_checked_at", None)
+    monkeypatch.setattr(catalog_fts, "FTS_TABLES", ("missing_fts",))
+    assert not catalog_fts.is_available(db)
+    monkeypatch.setattr(catalog_fts, "FTS_TABLES", ("works_fts",))
+    # Отрицательный результат запомнен до RECHECK_SECONDS
+    assert not catalog_fts.is_available(db)
+    monkeypatch.setattr(catalog_fts, "_checked_at", catalog_fts._checked_at - catalog_fts.RECHECK_SECONDS)
+    assert catalog_fts.is_available(db)
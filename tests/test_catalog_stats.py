@@ -0,0 +1,66 @@
+from app import crud, models, schemas
+from app.services import catalog_stats
+
+
+def _assert_matches_rebuild(db):
+    counters = catalog_stats.get(db)
+    assert counters == catalog_stats.rebuild(db)
+    return counters
+
+
+def test_first_get_computes_counters(db, catalog):
+    counters = _assert_matches_rebuild(db)
+    # "Без сборника" в число произведений не входит
+    assert counters["works"] == 3
+    assert counters["compositions"] == 7
+    assert counters["recordings"] == 7
+    assert counters["duration"] == sum(100 + i for i in range(7))
+
+
+def test_adjust_follows_crud_changes(db, catalog):
+    catalog_stats.rebuild(db)
+    bach = catalog["composers"][2]
+
+    work = crud.music.create_work_for_composer(db, schemas.music.WorkCreate(name_ru="Месса си минор"), bach.id)
+    composition = crud.music.create_composition_for_work(
+        db, schemas.music.CompositionCreate(title_ru="Kyrie", sort_order=1), work.id)
+    recording = crud.music.create_recording_for_composition(
+        db, schemas.RecordingCreate(performers="Gardiner"), composition.id, 600, "/static/music/kyrie.mp3", "kyrie")
+    counters = _assert_matches_rebuild(db)
+    assert counters["works"] == 4 and counters["recordings"] == 8
+
+    crud.music.delete_recording(db, recording.id)
+    _assert_matches_rebuild(db)
+
+    crud.music.delete_work(db, catalog["works"]["moonlight"].id)
+    counters = _assert_matches_rebuild(db)
+    assert counters["works"] == 3 and counters["compositions"] == 5
+
+    crud.music.delete_composer(db, bach.id)
+    counters = _assert_matches_rebuild(db)
+    assert counters == {"recordings": 2, "compositions": 2, "works": 1, "composers": 2, "duration": 201}
+
+
+def test_no_collection_work_is_not_counted(db, catalog):
+    catalog_stats.rebuild(db)
+    mozart = catalog["composers"][0]
+    crud.music.create_work_for_composer(
+        db, schemas.music.WorkCreate(name_ru=catalog_stats.NO_COLLECTION_NAME), mozart.id)
+    assert _assert_matches_rebuild(db)["works"] == 3
+
+
+def test_adjust_rolls_back_with_transaction(db, catalog):
+    before = catalog_stats.rebuild(db)
+    catalog_stats.adjust(db, recordings=5, duration=100)
+    db.rollback()
+    assert catalog_stats.get(db) == before
+
+
+def test_adjust_creates_missing_row(db, catalog):
+    db.query(models.CatalogStats).delete()
+    db.commit()
+    catalog_stats.adjust(db, recordings=0, composers=0)  # нулевые дельты ничего не делают
+    assert db.query(models.CatalogStats).count() == 0
+    catalog_stats.adjust(db, composers=1)
+    db.commit()
+    assert catalog_stats.get(db)["composers"] == 3
@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from app import crud, schemas
+from app.services import dashboard_cache, random_works
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(dashboard_cache, "_snapshot", None)
+    random_works.index.ready = False
+
+
+def _summary():
+    return json.loads(dashboard_cache.get().body)
+
+
+def test_first_request_builds_from_current_catalog(db, catalog):
+    summary = _summary()
+    assert summary["stats"]["total_works"] == 3
+    assert len(summary["recently_added_works"]) == 3
+
+
+def test_edit_is_visible_on_next_request(db, catalog):
+    before = _summary()
+    spotlight = [w["id"] for w in before["random_works"]]
+
+    bach = catalog["composers"][2]
+    work = crud.music.create_work_for_composer(db, schemas.music.WorkCreate(name_ru="Месса си минор"), bach.id)
+
+    after = _summary()
+    assert after["stats"]["total_works"] == before["stats"]["total_works"] + 1
+    assert after["recently_added_works"][0]["id"] == work.id
+    # "В центре внимания" после правки не перевыбирается
+    assert [w["id"] for w in after["random_works"]] == spotlight
+
+
+def test_unchanged_catalog_reuses_snapshot(db, catalog):
+    assert dashboard_cache.get() is dashboard_cache.get()
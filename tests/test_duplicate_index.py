@@ -0,0 +1,37 @@
+from app.services import duplicate_index
+
+
+def test_normalize_for_comparison():
+    assert duplicate_index.normalize_for_comparison("Ёлка (ред. 1890), Op. 5") == "елка op 5"
+    assert duplicate_index.normalize_for_comparison(None) == ""
+
+
+def test_work_matches_by_nickname(db, catalog, client):
+    beethoven = catalog["composers"][1]
+    response = client.get("/api/search/check-duplicates",
+                          params={"entity_type": "work", "query": "Лунная соната", "composer_id": beethoven.id})
+    assert response.status_code == 200
+    matches = response.json()
+    assert [m["id"] for m in matches] == [catalog["works"]["moonlight"].id]
+    assert matches[0]["score"] == 100
+
+
+def test_parenthesized_text_and_yo_are_ignored(db, catalog, client):
+    mozart = catalog["composers"][0]
+    response = client.get("/api/search/check-duplicates", params={
+        "entity_type": "work", "query": "Малeнькая ночная серенада (KV 525)", "composer_id": mozart.id})
+    assert [m["slug"] for m in response.json()] == ["serenade"]
+
+    matches = duplicate_index.find_duplicates(db, duplicate_index.COMPOSER, ["Бах (Иоганн Себастьян)", "Моцарт"])
+    assert [m["name_ru"] for m in matches[0]] == ["Бах"]
+    assert [m["name_ru"] for m in matches[1]] == ["Моцарт"]
+
+
+def test_composer_matches_original_name(db, catalog, client):
+    response = client.post("/api/search/check-duplicates/bulk", json={
+        "entity_type": "composer", "names": ["Ludwig van Beethoven", "Шостакович"]})
+    assert response.status_code == 200
+    result = response.json()
+    assert [m["name_ru"] for m in result[0]["matches"]] == ["Бетховен"]
+    assert result[0]["matches"][0]["score"] >= duplicate_index.SIMILARITY_THRESHOLD
+    assert result[1]["matches"] == []
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from app import utils
+from app.services import image_resize
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_resize, "CACHE_DIR", tmp_path)
+    return tmp_path
+
+
+def _touch(path, name, data=b"x" * 100):
+    path = path / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_source_path_only_serves_image_folders():
+    image = _touch(utils.COVERS_DIR, "works/work_1.jpg")
+    _touch(utils.COVERS_DIR, ".incoming/upload")
+    _touch(utils.COVERS_DIR, "works/.tmp")
+    _touch(utils.COVERS_DIR, "other/file.jpg")
+
+    assert image_resize.source_path("works/work_1.jpg") == image.resolve()
+    assert image_resize.source_path(".incoming/upload") is None
+    assert image_resize.source_path("works/.tmp") is None
+    assert image_resize.source_path("other/file.jpg") is None
+    assert image_resize.source_path("works/../.incoming/upload") is None
+    assert image_resize.source_path("../../conftest.py") is None
+
+
+def test_trim_cache_removes_least_recently_read(cache_dir):
+    paths = [_touch(cache_dir, f"ab/{i}.jpg") for i in range(5)]
+    for i, path in enumerate(paths):
+        os.utime(path, (1000 + i, 1000 + i))
+
+    assert image_resize.trim_cache(max_bytes=350) == 2
+    assert [p.exists() for p in paths] == [False, False, True, True, True]
+    assert image_resize._cache_bytes == 300
+
+
+def test_trim_cache_keeps_cache_under_limit(cache_dir):
+    paths = [_touch(cache_dir, f"ab/{i}.jpg") for i in range(3)]
+    assert image_resize.trim_cache(max_bytes=1000) == 0
+    assert all(p.exists() for p in paths)
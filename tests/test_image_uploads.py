@@ -0,0 +1,113 @@
+import io
+import json
+import time
+from pathlib import Path
+
+import pytest
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from app import models, utils
+from app.services import image_uploads, jobs
+
+
+def _jpeg(size=(64, 48)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="cover.jpg")
+
+
+def _file(url: str) -> Path:
+    return Path(url.lstrip("/"))
+
+
+@pytest.fixture
+def composer(db):
+    file_path, url = utils.new_image_path("composers", "comp_old")
+    file_path.write_bytes(_jpeg())
+    composer = models.music.Composer(name="Mozart", name_ru="Моцарт", slug="mozart", portrait_url=url)
+    db.add(composer)
+    db.commit()
+    return composer
+
+
+def _payload(composer, data: bytes) -> dict:
+    image_uploads.INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = image_uploads.INCOMING_DIR / "upload"
+    temp_path.write_bytes(data)
+    file_path, url = utils.new_image_path("composers", f"comp_{composer.id}")
+    return {"target": "composer", "target_id": composer.id,
+            "temp_path": str(temp_path), "file_path": str(file_path), "url": url}
+
+
+def test_old_image_is_replaced_only_when_new_one_is_ready(db, composer):
+    old_url = composer.portrait_url
+    payload = _payload(composer, _jpeg())
+
+    result = image_uploads._process_upload("job", payload)
+    db.refresh(composer)
+    assert composer.portrait_url == old_url and _file(old_url).is_file()
+
+    image_uploads._finish_image_upload(db, "job", payload, result)
+    db.refresh(composer)
+    assert composer.portrait_url == payload["url"]
+    assert _file(payload["url"]).is_file()
+    assert not _file(old_url).exists()
+
+
+def test_undecodable_image_falls_back_to_raw_upload(db, composer):
+    data = _jpeg((400, 300))[:600]  # заголовок цел, данные обрезаны
+    payload = _payload(composer, data)
+
+    result = image_uploads._process_upload("job", payload)
+    image_uploads._finish_image_upload(db, "job", payload, result)
+
+    db.refresh(composer)
+    assert composer.portrait_url == payload["url"]
+    assert _file(payload["url"]).read_bytes() == data
+
+
+def test_rejected_image_keeps_old_image(db, composer, monkeypatch):
+    old_url = composer.portrait_url
+    payload = _payload(composer, _jpeg())
+    monkeypatch.setattr(utils, "IMAGE_MAX_PIXELS", 100)
+
+    with pytest.raises(jobs.JobError):
+        image_uploads._process_upload("job", payload)
+    db.refresh(composer)
+    assert composer.portrait_url == old_url and _file(old_url).is_file()
+
+
+def test_deleted_target_drops_new_file(db, composer):
+    payload = _payload(composer, _jpeg())
+    result = image_uploads._process_upload("job", payload)
+    db.delete(composer)
+    db.commit()
+
+    with pytest.raises(jobs.JobError):
+        image_uploads._finish_image_upload(db, "job", payload, result)
+    assert not _file(payload["url"]).exists()
+
+
+def test_upload_job_runs_in_image_pool(db, composer):
+    job = image_uploads.save_upload_file(db, _upload(_jpeg()), "composer", composer.id)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        db.expire_all()
+        job = db.get(models.Job, job.id)
+        if job.status in (jobs.DONE, jobs.FAILED):
+            break
+        time.sleep(0.1)
+
+    assert job.status == jobs.DONE, job.error
+    db.refresh(composer)
+    assert composer.portrait_url.startswith(f"/static/covers/composers/comp_{composer.id}_")
+    # cleanup идет сразу после смены статуса
+    temp_path = Path(json.loads(job.payload)["temp_path"])
+    while temp_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not temp_path.exists()
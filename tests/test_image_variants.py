@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+from app import models, schemas
+from app.services import image_variants
+
+URL = "/static/covers/works/work_1_test.jpg"
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    image_variants._ready.clear()
+    image_variants._missing.clear()
+    yield
+    image_variants.delete(URL)
+
+
+def _make_marker():
+    marker = Path(image_variants.variant_url(URL, image_variants.MARKER_WIDTH, image_variants.MARKER_EXT).lstrip("/"))
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_bytes(b"x")
+
+
+def test_missing_variants_are_rechecked_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(image_variants.time, "monotonic", lambda: now[0])
+
+    assert not image_variants.variants_ready(URL)
+    _make_marker()
+    assert not image_variants.variants_ready(URL)  # отрицательный ответ еще в кэше
+
+    now[0] += image_variants.MISSING_TTL_SECONDS
+    assert image_variants.variants_ready(URL)
+    assert URL not in image_variants._missing
+
+
+def test_schema_computes_srcset_from_url():
+    _make_marker()
+    work = models.music.Work(id=1, name_ru="Серенада", composer_id=1, cover_art_url=URL)
+    composer = models.music.Composer(id=1, name="Mozart", portrait_url=None)
+    work.composer = composer
+
+    data = schemas.dashboard.DashWork.model_validate(work).model_dump()
+    assert data["cover_art_srcset"]["src"] == URL
+    assert data["cover_art_srcset"]["webp"].startswith(image_variants.variant_url(URL, image_variants.WIDTHS[0], "webp"))
+    assert data["composer"]["portrait_srcset"] is None
@@ -0,0 +1,102 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.services import media_stream
+
+DATA = bytes(range(256)) * 40  # 10240 байт
+ETAG = '"abc123"'
+
+
+@pytest.fixture
+def media_client(tmp_path):
+    path = tmp_path / "track.mp3"
+    path.write_bytes(DATA)
+
+    async def endpoint(request):
+        return media_stream.MediaFileResponse(path, etag=ETAG)
+
+    return TestClient(Starlette(routes=[Route("/media", endpoint, methods=["GET", "HEAD"])]))
+
+
+def test_full_response(media_client):
+    response = media_client.get("/media")
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["etag"] == ETAG
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "audio/mpeg"
+
+
+def test_single_range(media_client):
+    response = media_client.get("/media", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == DATA[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(DATA)}"
+    assert response.headers["content-length"] == "100"
+
+
+def test_suffix_and_open_ranges(media_client):
+    assert media_client.get("/media", headers={"Range": "bytes=-10"}).content == DATA[-10:]
+    assert media_client.get("/media", headers={"Range": "bytes=10000-"}).content == DATA[10000:]
+    # Конец за пределами файла обрезается
+    assert media_client.get("/media", headers={"Range": "bytes=10200-99999"}).content == DATA[10200:]
+
+
+def test_multiple_ranges(media_client):
+    response = media_client.get("/media", headers={"Range": "bytes=0-9, 5-19, 100-109"})
+    assert response.status_code == 206
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1].encode()
+    assert int(response.headers["content-length"]) == len(response.content)
+
+    parts = response.content.split(b"--" + boundary)
+    assert parts[0] == b"" and parts[-1] == b"--\r\n"
+    bodies = [part.split(b"\r\n\r\n", 1)[1].removesuffix(b"\r\n") for part in parts[1:-1]]
+    # Пересекающиеся 0-9 и 5-19 слиты
+    assert bodies == [DATA[0:20], DATA[100:110]]
+    assert b"Content-Range: bytes 0-19/10240" in parts[1]
+
+
+def test_unsatisfiable_range(media_client):
+    response = media_client.get("/media", headers={"Range": "bytes=20000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+def test_malformed_range_returns_whole_file(media_client):
+    response = media_client.get("/media", headers={"Range": "bytes=abc"})
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_if_range_mismatch_returns_whole_file(media_client):
+    response = media_client.get("/media", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert response.status_code == 200
+    response = media_client.get("/media", headers={"Range": "bytes=0-9", "If-Range": ETAG})
+    assert response.status_code == 206
+
+
+def test_if_none_match(media_client):
+    response = media_client.get("/media", headers={"If-None-Match": f'W/{ETAG}, "x"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == ETAG
+    assert media_client.get("/media", headers={"If-None-Match": '"x"'}).status_code == 200
+
+
+def test_head(media_client):
+    response = media_client.head("/media", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.headers["content-length"] == "10"
+    assert response.content == b""
+
+
+def test_missing_file(tmp_path):
+    async def endpoint(request):
+        return media_stream.MediaFileResponse(tmp_path / "nope.mp3")
+
+    client = TestClient(Starlette(routes=[Route("/media", endpoint)]))
+    assert client.get("/media").status_code == 404
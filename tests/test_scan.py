@@ -0,0 +1,76 @@
+import io
+import math
+import struct
+import wave
+from argparse import Namespace
+
+from app import models
+from app.tools import scan
+
+
+def _write_wav(path, freq: int, seconds: float = 0.5):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"".join(struct.pack("<h", int(1000 * math.sin(i * freq / 8000)))
+                               for i in range(int(8000 * seconds))))
+    path.write_bytes(buf.getvalue())
+
+
+def _args(**overrides) -> Namespace:
+    values = dict(work=None, composition=None, match="auto", performers=None, conductor=None, year=None,
+                  publisher=None, tags=False, workers=1, threads=2, dry_run=False, verbose=False)
+    values.update(overrides)
+    return Namespace(**values)
+
+
+def _album(tmp_path):
+    album = tmp_path / "album"
+    album.mkdir()
+    _write_wav(album / "01.wav", 440)
+    _write_wav(album / "02.wav", 523)
+    return album
+
+
+def test_report_only_run_does_not_hide_files_from_import(db, catalog, tmp_path):
+    album = _album(tmp_path)
+    work = catalog["works"]["serenade"]
+
+    report = scan.scan(str(album), _args())
+    assert len(report[scan.NEW]) == 2
+    assert db.query(models.ScanManifestEntry).count() == 0
+
+    report = scan.scan(str(album), _args(work=work.id))
+    assert len(report[scan.NEW]) == 2
+    recordings = db.query(models.music.Recording).filter(
+        models.music.Recording.file_hash.notin_([f"hash{i}" for i in range(10)])).all()
+    assert sorted(r.composition.title_ru for r in recordings) == ["Allegro", "Romanze"]
+    assert db.query(models.ScanManifestEntry).count() == 2
+
+    report = scan.scan(str(album), _args(work=work.id))
+    assert len(report[scan.UNCHANGED]) == 2
+    assert not report[scan.NEW]
+
+
+def test_changed_and_missing(db, catalog, tmp_path):
+    album = _album(tmp_path)
+    scan.scan(str(album), _args(work=catalog["works"]["serenade"].id))
+
+    _write_wav(album / "01.wav", 880)
+    (album / "02.wav").unlink()
+    report = scan.scan(str(album), _args())
+    assert report[scan.CHANGED] == [str(album / "01.wav")]
+    assert report[scan.MISSING] == [str(album / "02.wav")]
+
+
+def test_duplicate_of_existing_recording(db, catalog, tmp_path):
+    album = _album(tmp_path)
+    scan.scan(str(album), _args(work=catalog["works"]["serenade"].id))
+
+    copy = tmp_path / "copy"
+    copy.mkdir()
+    (copy / "a.wav").write_bytes((album / "01.wav").read_bytes())
+    report = scan.scan(str(copy), _args())
+    assert report[scan.DUPLICATE] == [str(copy / "a.wav")]
@@ -0,0 +1,64 @@
+from app.services import search_index
+from app.services.search_index import COMPOSER, RECORDING, WORK, SearchIndex
+
+
+def _search(index, kind, query, limit=20):
+    return index.search(kind, [query.split()], limit=limit)
+
+
+def test_all_tokens_must_match():
+    index = SearchIndex()
+    index.add(WORK, 1, "соната для фортепиано 14", "бетховен")
+    index.add(WORK, 2, "соната для скрипки 5", "бетховен")
+    assert _search(index, WORK, "соната 14") == [1]
+    assert sorted(_search(index, WORK, "соната бетховен")) == [1, 2]
+    assert _search(index, WORK, "соната моцарт") == []
+
+
+def test_substring_and_fuzzy_match():
+    index = SearchIndex()
+    index.add(WORK, 1, "лунная соната")
+    assert _search(index, WORK, "нат") == [1]    # подстрока внутри терма
+    assert _search(index, WORK, "сната") == [1]  # опечатка
+    assert _search(index, WORK, "сн") == []      # короткие токены — только точно
+
+
+def test_own_text_ranks_above_context_and_limit_keeps_best():
+    index = SearchIndex()
+    # Старые ID совпадают только через родителя, новый — собственным текстом
+    for obj_id in range(1, 6):
+        index.add(RECORDING, obj_id, "berliner philharmoniker", "karajan")
+    index.add(RECORDING, 10, "karajan", "bach")
+    assert _search(index, RECORDING, "karajan", limit=1) == [10]
+
+
+def test_exact_term_ranks_above_prefix_and_fuzzy():
+    index = SearchIndex()
+    index.add(COMPOSER, 1, "bachmann")
+    index.add(COMPOSER, 2, "bach")
+    index.add(COMPOSER, 3, "bahc")
+    assert _search(index, COMPOSER, "bach") == [2, 1, 3]
+    # Равная оценка — по возрастанию ID
+    index.add(COMPOSER, 4, "bach")
+    assert _search(index, COMPOSER, "bach") == [2, 4, 1, 3]
+
+
+def test_remove_and_readd():
+    index = SearchIndex()
+    index.add(WORK, 1, "реквием")
+    index.remove(WORK, 1)
+    assert _search(index, WORK, "реквием") == []
+    index.add(WORK, 1, "реквием ре минор")
+    assert _search(index, WORK, "минор") == [1]
+
+
+def test_rebuild_from_catalog(db, catalog):
+    search_index.build(db)
+    works = catalog["works"]
+    # "ночная" тоже нечетко похожа на "лунная", но прямое совпадение — первым
+    assert _search(search_index.index, WORK, "лунная")[0] == works["moonlight"].id
+    # Произведение находится и по композитору (контекст)
+    assert _search(search_index.index, WORK, "бах токката") == [works["toccata"].id]
+    # Запись — по части и по исполнителю
+    recordings = _search(search_index.index, RECORDING, "barenboim romanze")
+    assert len(recordings) == 1